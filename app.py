@@ -2,8 +2,25 @@ import os
 from flask import Flask, render_template
 from flask_login import LoginManager
 from flask_migrate import Migrate
+from sqlalchemy.orm import joinedload
 from models import db, User
 from services.email_service import email_service
+from services.spatial_index import shop_kdtree
+from services.geocode_cache import geocode_cache
+from services.geocoder_client import geocoder_client
+from services.gazetteer import gazetteer
+from services.cluster_index import shop_clusters
+from services.catalog_version import catalog_version
+from services.response_cache import response_cache
+from services.sync_service import sync_service
+from services.index_advisor import index_advisor
+from services.sql_instrumentation import sql_instrumentation
+from services.db_tuning import db_tuning
+from services.read_replica import replica_router
+from services.search_index import search_index
+from services.fulltext import fulltext_search
+from services.facet_index import facet_index
+from services.ranking import shop_ranker
 from config import config
 
 
@@ -17,8 +34,24 @@ def create_app(config_name=None):
     
     # Initialize extensions
     db.init_app(app)
+    db_tuning.init_app(app)
+    replica_router.init_app(app)
     migrate = Migrate(app, db)
     email_service.init_app(app)
+    shop_kdtree.init_app(app)
+    shop_clusters.init_app(app)
+    search_index.init_app(app)
+    fulltext_search.init_app(app)
+    facet_index.init_app(app)
+    shop_ranker.init_app(app)
+    geocode_cache.init_app(app)
+    geocoder_client.init_app(app)
+    gazetteer.init_app(app)
+    catalog_version.init_app(app)
+    response_cache.init_app(app)
+    sync_service.init_app(app)
+    index_advisor.init_app(app)
+    sql_instrumentation.init_app(app)
     
     # Login manager setup
     login_manager = LoginManager()
@@ -28,7 +61,8 @@ def create_app(config_name=None):
     
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        # Every page checks current_user.shop for the navigation menu
+        return db.session.get(User, int(user_id), options=[joinedload(User.shop)])
     
     # Create upload directory if it doesn't exist
     upload_path = os.path.join(app.root_path, app.config['UPLOAD_FOLDER'])
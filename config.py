@@ -30,10 +30,68 @@ class Config:
     # Application settings
     ITEMS_PER_PAGE = 20
     
+    # Search ranking blend; each signal is scaled to 0..1 before weighting
+    SEARCH_RANK_WEIGHTS = {'text': 0.5, 'distance': 0.3, 'rating': 0.15, 'open': 0.05}
+    SEARCH_DISTANCE_SCALE = 5.0  # miles at which the distance signal halves
+    
+    # Geocoding settings (Nominatim allows at most 1 request per second)
+    GEOCODER_BASE_URL = os.environ.get('GEOCODER_BASE_URL', 'https://nominatim.openstreetmap.org')
+    GEOCODER_RATE_LIMIT = float(os.environ.get('GEOCODER_RATE_LIMIT', 1.0))
+    GEOCODER_TIMEOUT = 10
+    
+    # Response cache settings (set RESPONSE_CACHE_SHARED_URL to a redis:// URL to share it across workers)
+    RESPONSE_CACHE_ENABLED = True
+    RESPONSE_CACHE_SIZE = 512
+    RESPONSE_CACHE_TTL = 300
+    RESPONSE_CACHE_SHARED_URL = os.environ.get('RESPONSE_CACHE_SHARED_URL')
+    
+    # Per-request SQL instrumentation: Server-Timing header, JSON log line and N+1 warnings
+    SQL_INSTRUMENTATION_ENABLED = True
+    SQL_INSTRUMENTATION_SAMPLE_RATE = float(os.environ.get('SQL_INSTRUMENTATION_SAMPLE_RATE', 1.0))
+    SQL_N_PLUS_ONE_THRESHOLD = 5
+    
+    # SQLite connection PRAGMAs, applied on connect (WAL lets reads run during writes)
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = 'NORMAL'
+    SQLITE_MMAP_SIZE = 256 * 1024 * 1024  # bytes
+    SQLITE_CACHE_SIZE = -64000  # negative values are KiB, so 64 MB per connection
+    SQLITE_BUSY_TIMEOUT = 5000  # ms a writer waits for the lock before "database is locked"
+    
+    # Connection pool for server databases (PostgreSQL, MySQL); SQLite keeps SQLAlchemy's defaults
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = 30
+    DB_POOL_RECYCLE = 1800  # seconds, below typical server idle timeouts
+    
+    # Read replicas (comma-separated URLs); read-only GET pages query them instead of the primary
+    SQLALCHEMY_BINDS = {f'replica_{index}': url for index, url in
+                        enumerate(filter(None, os.environ.get('DATABASE_REPLICA_URLS', '').split(',')))}
+    READ_REPLICA_STICKY_SECONDS = 10  # reads stay on the primary this long after a browser's own write
+    
     @staticmethod
     def init_app(app):
         """Initialize application with configuration."""
-        pass
+        # Explicit pools for the primary and every bind on a server database
+        pool_options = {
+            'pool_size': app.config['DB_POOL_SIZE'],
+            'max_overflow': app.config['DB_MAX_OVERFLOW'],
+            'pool_timeout': app.config['DB_POOL_TIMEOUT'],
+            'pool_recycle': app.config['DB_POOL_RECYCLE'],
+            'pool_pre_ping': True,
+        }
+        
+        def is_server(url):
+            return bool(url) and not str(url).startswith('sqlite')
+        
+        if is_server(app.config.get('SQLALCHEMY_DATABASE_URI')):
+            app.config['SQLALCHEMY_ENGINE_OPTIONS'] = dict(pool_options, **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+        
+        # SQLALCHEMY_ENGINE_OPTIONS only reaches the primary, so binds carry their own
+        binds = {}
+        for key, value in app.config.get('SQLALCHEMY_BINDS', {}).items():
+            options = value if isinstance(value, dict) else {'url': value}
+            binds[key] = dict(pool_options, **options) if is_server(options.get('url')) else value
+        app.config['SQLALCHEMY_BINDS'] = binds
 
 
 class DevelopmentConfig(Config):
@@ -55,6 +113,9 @@ class ProductionConfig(Config):
     # Security settings for production
     SESSION_COOKIE_SECURE = True
     
+    # Instrument a sample of requests
+    SQL_INSTRUMENTATION_SAMPLE_RATE = float(os.environ.get('SQL_INSTRUMENTATION_SAMPLE_RATE', 0.05))
+    
     @classmethod
     def init_app(cls, app):
         """Initialize production configuration."""
@@ -75,6 +136,7 @@ class TestingConfig(Config):
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
     MAIL_SUPPRESS_SEND = True
+    RESPONSE_CACHE_ENABLED = False
 
 
 config = {
@@ -137,6 +137,13 @@ class SearchForm(FlaskForm):
         ('2', '2+ Stars'),
         ('1', '1+ Stars')
     ])
+    open_only = BooleanField('Open now')
+    sort = SelectField('Sort By', validators=[Optional()], choices=[
+        ('', 'Best Match'),
+        ('distance', 'Distance'),
+        ('rating', 'Rating'),
+        ('relevance', 'Relevance')
+    ])
 
 
 class ProfileForm(FlaskForm):
@@ -90,9 +90,18 @@ def run_migrations_online():
                 directives[:] = []
                 logger.info('No changes in schema detected.')
 
+    # the full-text index is an FTS5 virtual table (plus its shadow tables)
+    # managed by services.fulltext, not by the models; the reviews backup
+    # holds rows a migration removed
+    def include_object(object, name, type_, reflected, compare_to):
+        return not (type_ == 'table' and (name.startswith('search_fts') or
+                                          name == 'reviews_duplicates_backup'))
+
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    if conf_args.get("include_object") is None:
+        conf_args["include_object"] = include_object
 
     connectable = get_engine()
 
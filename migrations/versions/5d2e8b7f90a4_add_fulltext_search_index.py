@@ -0,0 +1,44 @@
+"""Add full-text search index
+
+Revision ID: 5d2e8b7f90a4
+Revises: feb55c599130
+Create Date: 2026-10-18 12:41:07.318224
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d2e8b7f90a4'
+down_revision = 'feb55c599130'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # FTS5 virtual table maintained by services.fulltext; other databases use its LIKE backend
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    op.execute(
+        "CREATE VIRTUAL TABLE search_fts USING fts5("
+        "shop_id UNINDEXED, title, body, category, "
+        "tokenize = 'porter unicode61 remove_diacritics 2')"
+    )
+    # Row ids encode the document kind: shops are even, products odd
+    op.execute(
+        "INSERT INTO search_fts (rowid, shop_id, title, body, category) "
+        "SELECT id * 2, id, name, COALESCE(description, ''), '' FROM shops"
+    )
+    op.execute(
+        "INSERT INTO search_fts (rowid, shop_id, title, body, category) "
+        "SELECT id * 2 + 1, shop_id, name, COALESCE(description, ''), REPLACE(category, '_', ' ') FROM products"
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    op.execute("DROP TABLE IF EXISTS search_fts")
@@ -2,8 +2,9 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
+from services.read_replica import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 
 class User(UserMixin, db.Model):
@@ -34,6 +35,12 @@ class User(UserMixin, db.Model):
 
 class Shop(db.Model):
     __tablename__ = 'shops'
+    __table_args__ = (
+        db.Index('ix_shops_latitude_longitude', 'latitude', 'longitude'),
+        # Newest shops first on the index page; is_active is left out so it
+        # never competes with the latitude range of the bounding box prefilter
+        db.Index('ix_shops_created_at_id', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(200), nullable=False)
@@ -59,7 +66,11 @@ class Shop(db.Model):
     payment_paypal = db.Column(db.String(100))
     payment_zelle = db.Column(db.String(100))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    
+    # Denormalized review aggregates, maintained by Shop.add_rating
+    rating_sum = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    review_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     products = db.relationship('Product', backref='shop', lazy=True, cascade='all, delete-orphan')
@@ -67,13 +78,30 @@ class Shop(db.Model):
     
     @property
     def average_rating(self):
-        if not self.reviews:
+        if not self.review_count:
             return 0
-        return sum(review.rating for review in self.reviews) / len(self.reviews)
+        return self.rating_sum / self.review_count
+    
+    @classmethod
+    def average_rating_expression(cls):
+        """SQL equivalent of average_rating, for queries that select columns rather than shops."""
+        return db.case((cls.review_count > 0, cls.rating_sum * 1.0 / cls.review_count), else_=0)
     
     @property
     def total_reviews(self):
-        return len(self.reviews)
+        return self.review_count or 0
+    
+    @classmethod
+    def add_rating(cls, shop_id, rating):
+        """Fold a new review into the stored aggregates with an atomic SQL increment.
+        
+        Call in the same transaction that inserts the review.
+        """
+        cls.query.filter_by(id=shop_id).update({
+            cls.rating_sum: cls.rating_sum + rating,
+            cls.review_count: cls.review_count + 1,
+            cls.updated_at: datetime.utcnow(),
+        }, synchronize_session=False)
     
     def __repr__(self):
         return f'<Shop {self.name}>'
@@ -81,6 +109,9 @@ class Shop(db.Model):
 
 class Product(db.Model):
     __tablename__ = 'products'
+    __table_args__ = (
+        db.Index('ix_products_shop_id_is_available', 'shop_id', 'is_available'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(200), nullable=False)
@@ -93,7 +124,7 @@ class Product(db.Model):
     is_available = db.Column(db.Boolean, default=True)
     stock_quantity = db.Column(db.Integer)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
     shop_id = db.Column(db.Integer, db.ForeignKey('shops.id'), nullable=False)
     
@@ -130,6 +161,11 @@ class Product(db.Model):
 
 class Review(db.Model):
     __tablename__ = 'reviews'
+    __table_args__ = (
+        db.Index('ix_reviews_shop_id_created_at', 'shop_id', 'created_at'),
+        # One review per buyer per shop
+        db.Index('ix_reviews_buyer_id_shop_id', 'buyer_id', 'shop_id', unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     rating = db.Column(db.Integer, nullable=False)
@@ -155,5 +191,34 @@ class Location(db.Model):
     latitude = db.Column(db.Float, nullable=False)
     longitude = db.Column(db.Float, nullable=False)
     
+    # Geocoding cache entries; rows without a lookup key are plain locations
+    lookup_key = db.Column(db.String(320), unique=True, index=True)
+    is_negative = db.Column(db.Boolean, default=False)
+    cached_at = db.Column(db.DateTime)
+    
+    def __repr__(self):
+        return f'<Location {self.city}, {self.state}>'
+
+class CatalogState(db.Model):
+    __tablename__ = 'catalog_state'
+    
+    # Single row holding the catalog version, bumped by services.catalog_version
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<CatalogState {self.version}>'
+
+
+class DeletionLog(db.Model):
+    __tablename__ = 'deletion_log'
+    
+    # Tombstones for deleted shops and products, read by the /api/sync delta feed
+    id = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(20), nullable=False)
+    entity_id = db.Column(db.Integer, nullable=False)
+    deleted_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    
     def __repr__(self):
-        return f'<Location {self.city}, {self.state}>'
\ No newline at end of file
+        return f'<DeletionLog {self.entity} {self.entity_id}>'
@@ -1,13 +1,52 @@
-from flask import Blueprint, jsonify, request
-from models import Shop
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
+from sqlalchemy.orm import load_only
+from models import db, Shop, Product
 from services.location_service import location_service
+from services.spatial_index import shop_kdtree
+from services.cluster_index import shop_clusters
+from services.catalog_version import catalog_version
+from services.response_cache import response_cache, ALL_SHOPS_TAG
+from services.read_replica import replica_router
+from services.sync_service import sync_service
+from services.search_index import search_index
+from services.pagination import encode_cursor, decode_cursor
+from services.marker_codec import encode_markers, MIMETYPE as MARKERS_MIMETYPE
 
 api_bp = Blueprint('api', __name__)
 
-@api_bp.route('/api/shops')
-def api_shops():
-    shops = Shop.query.filter_by(is_active=True).all()
-    return jsonify([{
+NEARBY_DEFAULT_K = 20
+NEARBY_MAX_K = 100
+SHOPS_MAX_LIMIT = 500
+STREAM_BATCH_SIZE = 500
+SEARCH_DEFAULT_LIMIT = 10
+SEARCH_MAX_LIMIT = 50
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+# Columns _serialize_shop reads
+NEARBY_SHOP_COLUMNS = (Shop.id, Shop.name, Shop.latitude, Shop.longitude, Shop.address,
+                       Shop.rating_sum, Shop.review_count, Shop.is_open)
+
+DEFAULT_SHOP_FIELDS = ('id', 'name', 'latitude', 'longitude', 'address', 'rating', 'is_open')
+
+def _shop_field_columns():
+    """Map the field names clients may request to the SQL expressions that produce them."""
+    rating = Shop.average_rating_expression()
+    return {
+        'id': Shop.id,
+        'name': Shop.name,
+        'description': Shop.description,
+        'address': Shop.address,
+        'latitude': Shop.latitude,
+        'longitude': Shop.longitude,
+        'phone': Shop.phone,
+        'website': Shop.website,
+        'banner_image': Shop.banner_image,
+        'is_open': Shop.is_open,
+        'rating': rating,
+    }
+
+def _serialize_shop(shop):
+    return {
         'id': shop.id,
         'name': shop.name,
         'latitude': shop.latitude,
@@ -15,7 +54,219 @@ def api_shops():
         'address': shop.address,
         'rating': shop.average_rating,
         'is_open': shop.is_open
-    } for shop in shops])
+    }
+
+def _parse_bbox(value):
+    """Parse a west,south,east,north bounding box; raises ValueError if it is invalid."""
+    west, south, east, north = (float(part) for part in value.split(','))
+    if not (location_service.validate_coordinates(south, west) and
+            location_service.validate_coordinates(north, east)) or south > north:
+        raise ValueError('Invalid bbox')
+    return west, south, east, north
+
+def _filter_shops(query):
+    """Apply the /api/shops filter arguments to a query; raises ValueError for bad input."""
+    if request.args.get('bbox'):
+        try:
+            west, south, east, north = _parse_bbox(request.args['bbox'])
+        except ValueError:
+            raise ValueError('bbox must be west,south,east,north')
+        query = query.filter(Shop.latitude.between(south, north))
+        if west <= east:
+            query = query.filter(Shop.longitude.between(west, east))
+        else:
+            query = query.filter((Shop.longitude >= west) | (Shop.longitude <= east))
+    
+    if request.args.get('ids'):
+        try:
+            ids = [int(shop_id) for shop_id in request.args['ids'].split(',')]
+        except ValueError:
+            raise ValueError('ids must be comma separated integers')
+        query = query.filter(Shop.id.in_(ids[:SHOPS_MAX_LIMIT]))
+    
+    if request.args.get('open_only', '').lower() in ['true', 'on', '1']:
+        query = query.filter(Shop.is_open.is_(True))
+    
+    if request.args.get('category'):
+        query = query.filter(Shop.products.any(Product.category == request.args['category']))
+    
+    if request.args.get('search'):
+        search = request.args['search'].strip().lower()
+        query = query.filter(db.func.lower(Shop.name).contains(search, autoescape=True))
+    
+    return query
+
+def _wants_ndjson():
+    """Return True if the client asked for newline-delimited JSON, by ?stream=1 or the Accept header."""
+    if request.args.get('stream', '').lower() in ['true', 'on', '1']:
+        return True
+    return request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+def _iter_ndjson(query):
+    """Serialize query rows one per line, fetching them from the database in batches."""
+    for row in query.yield_per(STREAM_BATCH_SIZE):
+        yield current_app.json.dumps(dict(row._mapping)) + '\n'
+
+def _shops_cache_tags():
+    """Tag /api/shops responses by the regions or category they list."""
+    if request.args.get('bbox'):
+        try:
+            return response_cache.region_tags(*_parse_bbox(request.args['bbox']))
+        except ValueError:
+            return [ALL_SHOPS_TAG]
+    if request.args.get('category'):
+        return [response_cache.category_tag(request.args['category'])]
+    return [ALL_SHOPS_TAG]
+
+@api_bp.route('/api/shops')
+@replica_router.read_only
+@catalog_version.conditional(variant=lambda: 'ndjson' if _wants_ndjson() else '')
+@response_cache.cached(_shops_cache_tags, unless=_wants_ndjson)
+def api_shops():
+    columns = _shop_field_columns()
+    
+    fields = DEFAULT_SHOP_FIELDS
+    if request.args.get('fields'):
+        fields = tuple(dict.fromkeys(field.strip() for field in request.args['fields'].split(',') if field.strip()))
+        unknown = [field for field in fields if field not in columns]
+        if unknown:
+            return jsonify({'error': f"Unknown fields: {', '.join(unknown)}"}), 400
+    # The id is the pagination key, so it is always returned
+    fields = ('id',) + tuple(field for field in fields if field != 'id')
+    
+    # Select only the requested columns instead of hydrating Shop objects
+    query = db.session.query(*[columns[field].label(field) for field in fields]).filter(Shop.is_active.is_(True))
+    
+    try:
+        query = _filter_shops(query)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    limit = request.args.get('limit', type=int)
+    if limit is None and not _wants_ndjson():
+        # Streams are fetched in batches; plain JSON is built in memory, so it is always paged
+        limit = SHOPS_MAX_LIMIT
+    query = query.order_by(Shop.id)
+    if request.args.get('cursor'):
+        try:
+            last_id, = decode_cursor(request.args['cursor'])
+            query = query.filter(Shop.id > int(last_id))
+        except (ValueError, TypeError):
+            return jsonify({'error': 'Invalid cursor'}), 400
+    if limit is not None:
+        limit = min(max(limit, 1), SHOPS_MAX_LIMIT)
+        query = query.limit(limit)
+    
+    if _wants_ndjson():
+        # Headers are sent before the last row is known, so streams carry no X-Next-Cursor
+        response = Response(stream_with_context(_iter_ndjson(query)), mimetype=NDJSON_MIMETYPE)
+        response.vary.add('Accept')
+        return response
+    
+    rows = query.all()
+    response = jsonify([dict(row._mapping) for row in rows])
+    response.vary.add('Accept')
+    
+    # The body stays a plain list for existing clients; the next page is a header
+    if limit is not None and len(rows) == limit:
+        response.headers['X-Next-Cursor'] = encode_cursor([rows[-1].id])
+    return response
+
+@api_bp.route('/api/shops/markers')
+@replica_router.read_only
+@catalog_version.conditional()
+@response_cache.cached(_shops_cache_tags)
+def api_shop_markers():
+    """Binary columnar marker feed for the map; takes the same filters as /api/shops."""
+    columns = _shop_field_columns()
+    query = db.session.query(Shop.id, Shop.latitude, Shop.longitude, columns['rating'], Shop.is_open) \
+        .filter(Shop.is_active.is_(True))
+    try:
+        query = _filter_shops(query)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return Response(encode_markers(query.order_by(Shop.id).yield_per(STREAM_BATCH_SIZE)),
+                    mimetype=MARKERS_MIMETYPE)
+
+@api_bp.route('/api/shops/nearby')
+def api_shops_nearby():
+    lat = request.args.get('lat', type=float)
+    lng = request.args.get('lng', type=float)
+    if lat is None or lng is None or not location_service.validate_coordinates(lat, lng):
+        return jsonify({'error': 'Valid lat and lng parameters required'}), 400
+    
+    k = min(max(request.args.get('k', NEARBY_DEFAULT_K, type=int), 1), NEARBY_MAX_K)
+    
+    after = None
+    if request.args.get('cursor'):
+        try:
+            chord, shop_id = decode_cursor(request.args['cursor'])
+            after = (float(chord), int(shop_id))
+        except (ValueError, TypeError):
+            return jsonify({'error': 'Invalid cursor'}), 400
+    
+    matches = shop_kdtree.nearest(lat, lng, k, after=after)
+    shops_by_id = {
+        shop.id: shop
+        for shop in Shop.query.filter(Shop.id.in_([shop_id for shop_id, _ in matches]))
+        .options(load_only(*NEARBY_SHOP_COLUMNS))
+    }
+    
+    results = []
+    for shop_id, chord in matches:
+        shop = shops_by_id.get(shop_id)
+        if shop is None:
+            continue
+        shop_data = _serialize_shop(shop)
+        shop_data['distance'] = round(shop_kdtree.chord_to_km(chord), 3)
+        results.append(shop_data)
+    
+    next_cursor = None
+    if len(matches) == k:
+        next_cursor = encode_cursor([matches[-1][1], matches[-1][0]])
+    
+    return jsonify({'shops': results, 'next_cursor': next_cursor})
+
+@api_bp.route('/api/shops/clusters')
+def api_shop_clusters():
+    try:
+        west, south, east, north = _parse_bbox(request.args.get('bbox', ''))
+    except ValueError:
+        return jsonify({'error': 'bbox parameter required as west,south,east,north'}), 400
+    
+    zoom = request.args.get('zoom', type=int)
+    if zoom is None:
+        return jsonify({'error': 'zoom parameter required'}), 400
+    zoom = max(0, min(shop_clusters.MAX_ZOOM, zoom))
+    
+    return jsonify({
+        'zoom': zoom,
+        'clusters': shop_clusters.query(west, south, east, north, zoom)
+    })
+
+@api_bp.route('/api/search')
+def api_search():
+    limit = min(max(request.args.get('limit', SEARCH_DEFAULT_LIMIT, type=int), 1), SEARCH_MAX_LIMIT)
+    return jsonify(search_index.search(request.args.get('q', ''), limit))
+
+@api_bp.route('/api/sync')
+def api_sync():
+    since, cursor = None, None
+    if request.args.get('since'):
+        try:
+            since, cursor = sync_service.decode_token(request.args['since'])
+        except ValueError:
+            return jsonify({'error': 'Invalid since token'}), 400
+    
+    return jsonify(sync_service.changes(since, cursor))
+
+@api_bp.route('/api/cache/stats')
+def api_cache_stats():
+    # Internal counters of this worker, only for local debugging
+    if not current_app.debug:
+        return jsonify({'error': 'Not found'}), 404
+    return jsonify(response_cache.stats())
 
 @api_bp.route('/api/geocode')
 def api_geocode():
@@ -1,32 +1,120 @@
-from flask import Blueprint, render_template, request, session, redirect, url_for
-from models import Shop, Product
+from flask import Blueprint, abort, current_app, render_template, request, session, redirect, url_for
+from sqlalchemy.orm import selectinload
+from models import db, Shop, Product
 from forms import SearchForm
+from services.location_service import location_service
+from services.catalog_version import catalog_version
+from services.fulltext import fulltext_search
+from services.facet_index import facet_index
+from services.ranking import shop_ranker
+from services.pagination import decode_cursor, keyset_paginate
+from services.response_cache import response_cache, ALL_SHOPS_TAG
+from services.read_replica import replica_router
 
 main_bp = Blueprint('main', __name__)
 
+SEARCH_MAX_TEXT_MATCHES = 500
+
 @main_bp.route('/')
+@replica_router.read_only
+@catalog_version.conditional(per_user=True)
+@response_cache.cached(lambda: [ALL_SHOPS_TAG])
 def index():
+    try:
+        page = keyset_paginate(Shop.query.filter_by(is_active=True), (Shop.created_at, Shop.id),
+                               cursor=request.args.get('cursor'),
+                               limit=current_app.config['ITEMS_PER_PAGE'], descending=True)
+    except ValueError:
+        abort(400)
+    
+    # Infinite scroll asks for just the next batch of list items
+    if request.args.get('partial'):
+        return render_template('partials/shop_list_items.html', shops=page.items, next_cursor=page.next_cursor)
+    
     search_form = SearchForm()
-    shops = Shop.query.filter_by(is_active=True).all()
-    return render_template('index.html', shops=shops, search_form=search_form)
+    return render_template('index.html', shops=page.items, next_cursor=page.next_cursor, search_form=search_form)
 
 @main_bp.route('/search')
+@replica_router.read_only
+# Facet counts span every category, so any shop write can change the page
+@response_cache.cached(lambda: [ALL_SHOPS_TAG])
 def search():
-    form = SearchForm()
-    shops = []
+    # Search is a GET form, so bind the query string and skip CSRF
+    form = SearchForm(request.args, meta={'csrf': False})
+    results = None
+    snippets = {}
+    facets = None
+    
+    after = None
+    if request.args.get('cursor'):
+        try:
+            score, shop_id = decode_cursor(request.args['cursor'])
+            after = (float(score), int(shop_id))
+        except (ValueError, TypeError):
+            abort(400)
     
     if form.validate():
-        query = Shop.query.filter_by(is_active=True)
+        # Rank on light column rows; only the page being shown is loaded as Shop objects
+        query = db.session.query(
+            Shop.id, Shop.latitude, Shop.longitude, Shop.is_open,
+            Shop.average_rating_expression().label('average_rating'),
+        ).filter(Shop.is_active.is_(True))
         
+        text_scores = None
         if form.query.data:
-            query = query.filter(Shop.name.contains(form.query.data))
+            # Full-text match on shop and product text
+            hits = fulltext_search.search(form.query.data, SEARCH_MAX_TEXT_MATCHES)
+            text_scores = {hit.shop_id: hit.score for hit in hits}
+            snippets = {hit.shop_id: hit.snippet for hit in hits}
+            query = query.filter(Shop.id.in_(text_scores))
+        
+        lat = request.args.get('lat', type=float)
+        lng = request.args.get('lng', type=float)
+        has_location = lat is not None and lng is not None and location_service.validate_coordinates(lat, lng)
+        distances = None
+        if form.max_distance.data and has_location:
+            # Bounding box in SQL first, exact distance only on the candidates
+            max_distance = float(form.max_distance.data)
+            query = location_service.nearby_shops_query(lat, lng, max_distance, 'miles', query)
+            nearby = location_service.get_nearby_shops(lat, lng, query.all(), max_distance, 'miles')
+            candidates = [item['shop'] for item in nearby]
+            distances = {item['shop'].id: item['distance'] for item in nearby}
+        else:
+            candidates = query.all()
+            if has_location:
+                located = [row for row in candidates if row.latitude and row.longitude]
+                computed = location_service.calculate_distances(
+                    lat, lng, [row.latitude for row in located], [row.longitude for row in located], 'miles'
+                )
+                distances = {row.id: float(distance) for row, distance in zip(located, computed)}
         
-        if form.category.data:
-            query = query.join(Product).filter(Product.category == form.category.data)
+        # Category, rating and open filters are facets over the query and area matches
+        facets = facet_index.facets(
+            [row.id for row in candidates],
+            category=form.category.data or None,
+            min_rating=int(form.min_rating.data) if form.min_rating.data else None,
+            open_only=form.open_only.data,
+        )
+        candidates = [row for row in candidates if row.id in facets['shop_ids']]
         
-        shops = query.all()
+        results = shop_ranker.rank(
+            candidates,
+            per_page=current_app.config['ITEMS_PER_PAGE'],
+            after=after,
+            text_scores=text_scores,
+            distances=distances,
+            sort=form.sort.data or None,
+        )
+        # Result cards show a product count per shop
+        shops_by_id = {shop.id: shop for shop in
+                       Shop.query.filter(Shop.id.in_([item.shop.id for item in results.items]))
+                       .options(selectinload(Shop.products).load_only(Product.id))}
+        results = results._replace(items=[item._replace(shop=shops_by_id[item.shop.id])
+                                          for item in results.items if item.shop.id in shops_by_id])
     
-    return render_template('search.html', form=form, shops=shops)
+    if request.args.get('partial'):
+        return render_template('partials/search_results.html', results=results, snippets=snippets)
+    return render_template('search.html', form=form, results=results, snippets=snippets, facets=facets)
 
 @main_bp.route('/map')
 def map_view():
@@ -1,15 +1,40 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, abort, current_app, render_template, request, redirect, url_for, flash
 from flask_login import login_required, current_user
-from models import db, Shop, Product, Review
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+from models import db, User, Shop, Product, Review
 from forms import ShopForm, ProductForm, ReviewForm
 from services.file_service import file_service
+from services.spatial_index import shop_kdtree
+from services.catalog_version import catalog_version
+from services.response_cache import response_cache
+from services.read_replica import replica_router
+from services.search_index import search_index
+from services.pagination import keyset_paginate
 
 shop_bp = Blueprint('shop', __name__)
 
+# Upper bound on products rendered on a shop page
+SHOP_MAX_PRODUCTS = 200
+
+def _sync_shop_indexes(shop, previous_tags=()):
+    """Keep the in-memory shop indexes and cached responses current after a committed shop write.
+    
+    previous_tags are the shop's cache tags from before the write, so pages
+    listing it under an old location or category are dropped too.
+    """
+    shop_kdtree.sync_shop(shop)
+    search_index.sync_shop(shop)
+    response_cache.invalidate(*previous_tags, *response_cache.shop_tags(shop))
+
 @shop_bp.route('/profile')
 @login_required
 def profile():
-    return render_template('profile.html', user=current_user)
+    # The review list names each shop, so load just the names alongside
+    reviews = Review.query.filter_by(buyer_id=current_user.id) \
+        .options(joinedload(Review.shop).load_only(Shop.name)) \
+        .order_by(Review.created_at.desc()).all()
+    return render_template('profile.html', user=current_user, reviews=reviews)
 
 @shop_bp.route('/shop/create', methods=['GET', 'POST'])
 @login_required
@@ -50,6 +75,7 @@ def create_shop():
         
         db.session.add(shop)
         db.session.commit()
+        _sync_shop_indexes(shop)
         
         flash('Shop created successfully!')
         return redirect(url_for('shop.view_shop', shop_id=shop.id))
@@ -57,15 +83,32 @@ def create_shop():
     return render_template('create_shop.html', form=form)
 
 @shop_bp.route('/shop/<int:shop_id>')
+@replica_router.read_only
+@catalog_version.conditional(per_user=True)
+@response_cache.cached(lambda shop_id: [response_cache.shop_tag(shop_id)])
 def view_shop(shop_id):
     shop = Shop.query.get_or_404(shop_id)
-    products = Product.query.filter_by(shop_id=shop_id, is_available=True).all()
-    reviews = Review.query.filter_by(shop_id=shop_id).order_by(Review.created_at.desc()).all()
+    try:
+        # Each review shows its author's username
+        reviews_query = Review.query.filter_by(shop_id=shop_id) \
+            .options(joinedload(Review.buyer).load_only(User.username))
+        reviews = keyset_paginate(reviews_query, (Review.created_at, Review.id),
+                                  cursor=request.args.get('cursor'),
+                                  limit=current_app.config['ITEMS_PER_PAGE'], descending=True)
+    except ValueError:
+        abort(400)
+    
+    # Infinite scroll asks for just the next batch of reviews
+    if request.args.get('partial'):
+        return render_template('partials/review_items.html', shop=shop, reviews=reviews.items,
+                               next_cursor=reviews.next_cursor)
     
+    products = Product.query.filter_by(shop_id=shop_id, is_available=True) \
+        .order_by(Product.id).limit(SHOP_MAX_PRODUCTS).all()
     review_form = ReviewForm() if current_user.is_authenticated else None
     
     return render_template('shop.html', shop=shop, products=products, 
-                         reviews=reviews, review_form=review_form)
+                         reviews=reviews.items, next_cursor=reviews.next_cursor, review_form=review_form)
 
 @shop_bp.route('/shop/<int:shop_id>/edit', methods=['GET', 'POST'])
 @login_required
@@ -91,8 +134,10 @@ def edit_shop(shop_id):
                     flash(f'Banner upload failed: {str(e)}')
                     return render_template('edit_shop.html', form=form, shop=shop)
         
+        previous_tags = response_cache.shop_tags(shop)
         form.populate_obj(shop)
         db.session.commit()
+        _sync_shop_indexes(shop, previous_tags)
         flash('Shop updated successfully!')
         return redirect(url_for('shop.view_shop', shop_id=shop_id))
     
@@ -134,6 +179,7 @@ def add_product(shop_id):
         
         db.session.add(product)
         db.session.commit()
+        _sync_shop_indexes(shop)
         
         flash('Product added successfully!')
         return redirect(url_for('shop.view_shop', shop_id=shop_id))
@@ -143,15 +189,17 @@ def add_product(shop_id):
 @shop_bp.route('/product/<int:product_id>/edit', methods=['GET', 'POST'])
 @login_required
 def edit_product(product_id):
-    product = Product.query.get_or_404(product_id)
+    product = Product.query.options(joinedload(Product.shop)).get_or_404(product_id)
     if product.shop.user_id != current_user.id:
         flash('You can only edit your own products.')
         return redirect(url_for('shop.view_shop', shop_id=product.shop_id))
     
     form = ProductForm(obj=product)
     if form.validate_on_submit():
+        previous_tags = response_cache.shop_tags(product.shop)
         form.populate_obj(product)
         db.session.commit()
+        _sync_shop_indexes(product.shop, previous_tags)
         flash('Product updated successfully!')
         return redirect(url_for('shop.view_shop', shop_id=product.shop_id))
     
@@ -160,14 +208,17 @@ def edit_product(product_id):
 @shop_bp.route('/product/<int:product_id>/delete', methods=['POST'])
 @login_required
 def delete_product(product_id):
-    product = Product.query.get_or_404(product_id)
+    product = Product.query.options(joinedload(Product.shop)).get_or_404(product_id)
     if product.shop.user_id != current_user.id:
         flash('You can only delete your own products.')
         return redirect(url_for('shop.view_shop', shop_id=product.shop_id))
     
+    shop = product.shop
     shop_id = product.shop_id
+    previous_tags = response_cache.shop_tags(shop)
     db.session.delete(product)
     db.session.commit()
+    _sync_shop_indexes(shop, previous_tags)
     
     flash('Product deleted successfully!')
     return redirect(url_for('shop.view_shop', shop_id=shop_id))
@@ -196,7 +247,17 @@ def add_review(shop_id):
         )
         
         db.session.add(review)
+        try:
+            db.session.flush()
+        except IntegrityError:
+            # A concurrent request got its review in first
+            db.session.rollback()
+            flash('You have already reviewed this shop.')
+            return redirect(url_for('shop.view_shop', shop_id=shop_id))
+        Shop.add_rating(shop_id, review.rating)
         db.session.commit()
+        search_index.sync_shop(shop)
+        response_cache.invalidate(*response_cache.shop_tags(shop))
         
         flash('Review added successfully!')
     
@@ -0,0 +1,140 @@
+from datetime import datetime
+from functools import wraps
+from typing import Callable, Optional, Tuple
+
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+from sqlalchemy import event
+
+
+class CatalogVersion:
+    """Monotonic version number for the shop catalog, used for conditional GETs.
+
+    Any flush that writes a Shop, Product or Review bumps a single row in the
+    catalog_state table inside the same transaction, so the version only moves
+    when the write commits and every worker sees the same value. Views wrapped
+    with conditional() derive a strong ETag and Last-Modified from it and
+    answer a matching If-None-Match with 304 before running the view.
+    Last-Modified only has one-second precision, so it is left out while
+    the last write's second is still current; otherwise a second write in
+    that same second would look unmodified to If-Modified-Since.
+    """
+
+    STATE_ID = 1
+
+    def __init__(self, app=None):
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Register the session hooks that bump the version."""
+        from models import db
+
+        for identifier, listener in (('after_flush', self._after_flush),
+                                     ('do_orm_execute', self._after_bulk_write)):
+            if not event.contains(db.session, identifier, listener):
+                event.listen(db.session, identifier, listener)
+
+    @staticmethod
+    def _tracked_models():
+        from models import Shop, Product, Review
+        return Shop, Product, Review
+
+    def _after_flush(self, session, flush_context):
+        tracked = self._tracked_models()
+        changed = any(isinstance(obj, tracked) for obj in session.new) or \
+            any(isinstance(obj, tracked) for obj in session.deleted) or \
+            any(isinstance(obj, tracked) and session.is_modified(obj) for obj in session.dirty)
+        if changed:
+            self.bump(session)
+
+    def _after_bulk_write(self, orm_execute_state):
+        # query.update()/delete() never reach the flush, e.g. Shop.add_rating
+        if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+            return
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and issubclass(mapper.class_, self._tracked_models()):
+            self.bump(orm_execute_state.session)
+
+    def bump(self, session):
+        """Increment the version in the session's current transaction."""
+        from models import db, CatalogState
+
+        table = CatalogState.__table__
+        now = datetime.utcnow()
+        connection = session.connection()
+        result = connection.execute(
+            db.update(table)
+            .where(table.c.id == self.STATE_ID)
+            .values(version=table.c.version + 1, updated_at=now)
+        )
+        if result.rowcount == 0:
+            connection.execute(db.insert(table).values(id=self.STATE_ID, version=1, updated_at=now))
+
+    def get(self) -> Tuple[int, Optional[datetime]]:
+        """Return the committed (version, last modified time)."""
+        from models import db, CatalogState
+
+        row = db.session.execute(
+            db.select(CatalogState.version, CatalogState.updated_at)
+            .where(CatalogState.id == self.STATE_ID)
+        ).first()
+        if row is None:
+            return 0, None
+        return row.version, row.updated_at
+
+    def conditional(self, per_user: bool = False, variant: Optional[Callable[[], str]] = None):
+        """Decorate a GET view whose output only depends on the catalog and the request URL.
+
+        Set per_user for pages that also render the logged-in user's controls;
+        their ETag then includes the user id and the response is private.
+        variant names the representation chosen by request headers, e.g. from
+        content negotiation, and is added to the ETag as well.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                version, modified = self.get()
+                etag = str(version)
+                if per_user:
+                    etag = f"{etag}-{current_user.get_id() or 0}"
+                representation = variant() if variant is not None else ''
+                if representation:
+                    etag = f"{etag}-{representation}"
+                if modified is not None:
+                    modified = modified.replace(microsecond=0)
+                    if modified >= datetime.utcnow().replace(microsecond=0):
+                        modified = None
+
+                # A pending flash message has to be rendered, so never short-circuit then
+                if not (per_user and session.get('_flashes')) and self._not_modified(etag, modified):
+                    response = current_app.response_class(status=304)
+                else:
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+
+                response.set_etag(etag)
+                if modified is not None:
+                    response.last_modified = modified
+                response.cache_control.no_cache = True
+                if per_user:
+                    response.cache_control.private = True
+                    response.vary.add('Cookie')
+                return response
+            return wrapper
+        return decorator
+
+    @staticmethod
+    def _not_modified(etag: str, modified: Optional[datetime]) -> bool:
+        if request.method not in ('GET', 'HEAD'):
+            return False
+        if request.if_none_match:
+            return request.if_none_match.contains(etag)
+        if request.if_modified_since and modified is not None:
+            return modified <= request.if_modified_since.replace(tzinfo=None)
+        return False
+
+
+# Global catalog version instance
+catalog_version = CatalogVersion()
@@ -0,0 +1,189 @@
+import math
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+MAX_LATITUDE = 85.05112878  # Web Mercator limit
+
+
+class _Cluster:
+    __slots__ = ('count', 'lat_sum', 'lon_sum', 'categories', 'shop_ids')
+
+    def __init__(self):
+        self.count = 0
+        self.lat_sum = 0.0
+        self.lon_sum = 0.0
+        self.categories = Counter()
+        self.shop_ids = set()
+
+
+class ClusterIndex:
+    """Hierarchical grid of shop marker clusters, one level per map zoom.
+
+    Cells are laid out in Web Mercator space so a cell covers roughly the
+    same number of screen pixels at every zoom. Each cell at zoom z splits
+    into four cells at z + 1, so a shop's cell at every level is derived from
+    its finest cell by bit shifts. The grids are rebuilt once the catalog
+    version moves past the one they were built at, so every worker picks up
+    writes made anywhere.
+    """
+
+    MAX_ZOOM = 18
+    CELL_PIXELS = 64
+    TILE_PIXELS = 256
+
+    def __init__(self):
+        self._levels: List[Dict[Tuple[int, int], _Cluster]] = [{} for _ in range(self.MAX_ZOOM + 1)]
+        self._lock = threading.RLock()
+        self._built = False
+        self._version = None
+
+    def init_app(self, app):
+        """Reset the clusters for a new application; they are rebuilt lazily on first query."""
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._levels = [{} for _ in range(self.MAX_ZOOM + 1)]
+            self._built = False
+            self._version = None
+
+    @classmethod
+    def cells_per_side(cls, zoom: int) -> int:
+        return (1 << zoom) * cls.TILE_PIXELS // cls.CELL_PIXELS
+
+    @staticmethod
+    def _project(lat: float, lon: float) -> Tuple[float, float]:
+        """Project to Web Mercator coordinates in [0, 1)."""
+        lat = max(-MAX_LATITUDE, min(MAX_LATITUDE, lat))
+        x = (lon + 180.0) / 360.0
+        sin_lat = math.sin(math.radians(lat))
+        y = 0.5 - math.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)
+        return min(max(x, 0.0), 1.0 - 1e-12), min(max(y, 0.0), 1.0 - 1e-12)
+
+    def _cell(self, lat: float, lon: float, zoom: int) -> Tuple[int, int]:
+        x, y = self._project(lat, lon)
+        n = self.cells_per_side(zoom)
+        return int(x * n), int(y * n)
+
+    def _add(self, shop_id: int, lat: float, lon: float, category: Optional[str]):
+        finest_x, finest_y = self._cell(lat, lon, self.MAX_ZOOM)
+        for zoom in range(self.MAX_ZOOM, -1, -1):
+            shift = self.MAX_ZOOM - zoom
+            key = (finest_x >> shift, finest_y >> shift)
+            level = self._levels[zoom]
+            cluster = level.get(key)
+            if cluster is None:
+                cluster = level[key] = _Cluster()
+
+            cluster.count += 1
+            cluster.lat_sum += lat
+            cluster.lon_sum += lon
+            if category:
+                cluster.categories[category] += 1
+            cluster.shop_ids.add(shop_id)
+
+    def build(self, shops):
+        """Replace the clusters with an iterable of (shop_id, lat, lon, category)."""
+        with self._lock:
+            self._levels = [{} for _ in range(self.MAX_ZOOM + 1)]
+            for shop_id, lat, lon, category in shops:
+                self._add(shop_id, lat, lon, category)
+            self._built = True
+
+    @staticmethod
+    def dominant_categories(shop_ids=None) -> Dict[int, str]:
+        """Return each shop's most common available product category."""
+        from models import db, Product
+
+        query = (db.session.query(Product.shop_id, Product.category, db.func.count(Product.id))
+                 .filter(Product.is_available.is_(True))
+                 .group_by(Product.shop_id, Product.category))
+        if shop_ids is not None:
+            query = query.filter(Product.shop_id.in_(shop_ids))
+
+        best: Dict[int, Tuple[int, str]] = {}
+        for shop_id, category, count in query:
+            current = best.get(shop_id)
+            if current is None or (count, category) > current:
+                best[shop_id] = (count, category)
+        return {shop_id: category for shop_id, (_, category) in best.items()}
+
+    def _current(self, version: int) -> bool:
+        # A lagging replica may report an older version than the clusters were built at
+        return self._built and version <= self._version
+
+    def ensure_built(self):
+        """Build the clusters from active shops if missing or out of date."""
+        from models import Shop
+        from services.catalog_version import catalog_version
+
+        # Read the version before the rows, so a write in between only causes another rebuild
+        version, _ = catalog_version.get()
+        if self._current(version):
+            return
+
+        with self._lock:
+            if self._current(version):
+                return
+            categories = self.dominant_categories()
+            rows = (Shop.query
+                    .filter_by(is_active=True)
+                    .with_entities(Shop.id, Shop.latitude, Shop.longitude)
+                    .all())
+            self.build((row.id, row.latitude, row.longitude, categories.get(row.id)) for row in rows
+                       if row.latitude is not None and row.longitude is not None)
+            self._version = version
+
+    def _x_ranges(self, west: float, east: float):
+        if west <= east:
+            return [(self._project(0, west)[0], self._project(0, east)[0])]
+        # The viewport crosses the antimeridian
+        return [(self._project(0, west)[0], 1.0 - 1e-12), (0.0, self._project(0, east)[0])]
+
+    def query(self, west: float, south: float, east: float, north: float, zoom: int) -> List[Dict]:
+        """Return the clusters at a zoom level whose cells intersect the bounding box."""
+        from models import Product
+
+        self.ensure_built()
+
+        zoom = max(0, min(self.MAX_ZOOM, zoom))
+        n = self.cells_per_side(zoom)
+        min_y = int(self._project(north, 0)[1] * n)
+        max_y = int(self._project(south, 0)[1] * n)
+        x_ranges = [(int(start * n), int(end * n)) for start, end in self._x_ranges(west, east)]
+        icons = Product.get_category_icons()
+
+        with self._lock:
+            level = self._levels[zoom]
+            span = sum(end - start + 1 for start, end in x_ranges) * (max_y - min_y + 1)
+            if span <= len(level):
+                keys = [(x, y) for start, end in x_ranges for x in range(start, end + 1)
+                        for y in range(min_y, max_y + 1)]
+                cells = [(key, level[key]) for key in keys if key in level]
+            else:
+                cells = [(key, cluster) for key, cluster in level.items()
+                         if min_y <= key[1] <= max_y and
+                         any(start <= key[0] <= end for start, end in x_ranges)]
+
+            clusters = []
+            for _, cluster in cells:
+                category = None
+                if cluster.categories:
+                    category = max(cluster.categories.items(), key=lambda item: (item[1], item[0]))[0]
+                data = {
+                    'count': cluster.count,
+                    'latitude': cluster.lat_sum / cluster.count,
+                    'longitude': cluster.lon_sum / cluster.count,
+                    'category': category,
+                    'icon': icons.get(category, 'fas fa-store') if category else 'fas fa-store',
+                }
+                if cluster.count == 1:
+                    data['shop_id'] = next(iter(cluster.shop_ids))
+                clusters.append(data)
+
+        return clusters
+
+
+# Global shop marker cluster instance
+shop_clusters = ClusterIndex()
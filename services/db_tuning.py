@@ -0,0 +1,227 @@
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import List, Mapping, NamedTuple, Sequence, Tuple
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import event
+
+sqlite_cli = AppGroup('sqlite', help='Inspect and benchmark SQLite connection settings.')
+
+# PRAGMA values cannot be bound as parameters, so they are checked before formatting
+PRAGMA_VALUE_RE = re.compile(r'^-?\w+$')
+
+BENCH_SHOPS = 5000
+
+
+class BenchResult(NamedTuple):
+    reads: int
+    writes: int
+    busy: int
+    seconds: float
+    read_p99_ms: float
+    read_max_ms: float
+
+    @property
+    def reads_per_second(self) -> float:
+        return self.reads / self.seconds
+
+    @property
+    def writes_per_second(self) -> float:
+        return self.writes / self.seconds
+
+
+class DatabaseTuning:
+    """Applies SQLITE_* settings as PRAGMAs on every new SQLite connection.
+
+    WAL lets readers keep reading while a writer commits, where the default
+    rollback journal locks the whole file. synchronous=NORMAL only syncs at
+    checkpoints in WAL mode, which is still safe against corruption, and a
+    busy timeout makes a second writer wait instead of failing with
+    "database is locked". In-memory databases have no journal file or
+    mapping, so they only get the cache and timeout settings. Pool sizes
+    for server databases are set by Config.init_app.
+    """
+
+    def __init__(self, app=None):
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Register connect listeners on the app's SQLite engines and the CLI commands.
+
+        Must run after db.init_app so the engines exist.
+        """
+        from models import db
+
+        app.cli.add_command(sqlite_cli)
+        with app.app_context():
+            engines = list(db.engines.values())
+        for engine in engines:
+            if engine.dialect.name != 'sqlite':
+                continue
+            pragmas = self.pragmas(app.config, memory=self.is_memory(engine.url.database))
+            event.listen(engine, 'connect', lambda connection, record, pragmas=pragmas: self.apply(connection, pragmas))
+
+    @staticmethod
+    def is_memory(database) -> bool:
+        return not database or database == ':memory:' or 'mode=memory' in database
+
+    @staticmethod
+    def pragmas(config: Mapping, memory: bool = False) -> List[Tuple[str, object]]:
+        """PRAGMA name/value pairs for the configured settings, busy timeout first."""
+        settings = [
+            ('busy_timeout', config.get('SQLITE_BUSY_TIMEOUT')),
+            ('journal_mode', None if memory else config.get('SQLITE_JOURNAL_MODE')),
+            ('synchronous', None if memory else config.get('SQLITE_SYNCHRONOUS')),
+            ('cache_size', config.get('SQLITE_CACHE_SIZE')),
+            ('mmap_size', None if memory else config.get('SQLITE_MMAP_SIZE')),
+        ]
+        pragmas = []
+        for name, value in settings:
+            if value is None:
+                continue
+            if not PRAGMA_VALUE_RE.match(str(value)):
+                raise ValueError(f'Invalid value for PRAGMA {name}: {value!r}')
+            pragmas.append((name, value))
+        return pragmas
+
+    @staticmethod
+    def apply(dbapi_connection, pragmas: Sequence[Tuple[str, object]]):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas:
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def current(connection) -> dict:
+        """Effective values of the tuned PRAGMAs on a SQLAlchemy connection."""
+        return {name: connection.exec_driver_sql(f'PRAGMA {name}').scalar()
+                for name in ('journal_mode', 'synchronous', 'cache_size', 'mmap_size', 'busy_timeout')}
+
+    def benchmark(self, path: str, pragmas: Sequence[Tuple[str, object]], readers: int = 4,
+                  writers: int = 1, seconds: float = 5.0) -> BenchResult:
+        """Run reader and writer threads against a fresh shops table in path.
+
+        Readers run the home page query; writers update and insert shops in
+        small transactions, like sellers editing their listings.
+        """
+        setup = sqlite3.connect(path)
+        self.apply(setup, pragmas)
+        setup.executescript("""
+            CREATE TABLE shops (id INTEGER PRIMARY KEY, name TEXT, is_active INTEGER,
+                                average_rating REAL, created_at REAL);
+            CREATE INDEX ix_shops_created_at ON shops (created_at);
+        """)
+        setup.executemany('INSERT INTO shops (name, is_active, average_rating, created_at) VALUES (?, 1, 4.0, ?)',
+                          ((f'Shop {index}', float(index)) for index in range(BENCH_SHOPS)))
+        setup.commit()
+        setup.close()
+
+        stop = threading.Event()
+        lock = threading.Lock()
+        totals = {'reads': 0, 'writes': 0, 'busy': 0}
+        latencies: List[float] = []
+
+        def connect():
+            # The driver's own 5 second timeout would hide the busy_timeout setting
+            connection = sqlite3.connect(path, timeout=0, check_same_thread=False)
+            self.apply(connection, pragmas)
+            return connection
+
+        def read():
+            connection, done, busy, timings = connect(), 0, 0, []
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    connection.execute('SELECT id, name, average_rating FROM shops WHERE is_active = 1 '
+                                       'ORDER BY created_at DESC, id DESC LIMIT 20').fetchall()
+                except sqlite3.OperationalError:
+                    busy += 1
+                    continue
+                timings.append(time.perf_counter() - started)
+                done += 1
+            connection.close()
+            with lock:
+                totals['reads'] += done
+                totals['busy'] += busy
+                latencies.extend(timings)
+
+        def write(worker):
+            connection, done, busy, counter = connect(), 0, 0, 0
+            while not stop.is_set():
+                counter += 1
+                try:
+                    with connection:
+                        connection.execute('UPDATE shops SET average_rating = ? WHERE id = ?',
+                                           (counter % 5 + 1, counter % BENCH_SHOPS + 1))
+                        connection.execute('INSERT INTO shops (name, is_active, average_rating, created_at) '
+                                           'VALUES (?, 1, 0, ?)', (f'New {worker}-{counter}', time.time()))
+                except sqlite3.OperationalError:
+                    busy += 1
+                    continue
+                done += 1
+            connection.close()
+            with lock:
+                totals['writes'] += done
+                totals['busy'] += busy
+
+        threads = [threading.Thread(target=read) for _ in range(readers)]
+        threads += [threading.Thread(target=write, args=(worker,)) for worker in range(writers)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        p99 = latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0.0
+        slowest = latencies[-1] * 1000 if latencies else 0.0
+        return BenchResult(totals['reads'], totals['writes'], totals['busy'], elapsed, p99, slowest)
+
+
+# Global database tuning instance
+db_tuning = DatabaseTuning()
+
+
+@sqlite_cli.command('pragmas')
+def show_pragmas_command():
+    """Print the PRAGMAs in effect on a connection to the app database."""
+    from models import db
+
+    with db.engine.connect() as connection:
+        if connection.dialect.name != 'sqlite':
+            raise click.ClickException('The database is not SQLite')
+        for name, value in DatabaseTuning.current(connection).items():
+            click.echo(f'{name} = {value}')
+
+
+@sqlite_cli.command('bench')
+@click.option('--readers', default=4, show_default=True, help='Reader threads.')
+@click.option('--writers', default=1, show_default=True, help='Writer threads.')
+@click.option('--seconds', default=5.0, show_default=True, help='Duration of each run.')
+def bench_command(readers, writers, seconds):
+    """Compare concurrent reads and writes on SQLite defaults against the configured settings."""
+    from flask import current_app
+
+    runs = [
+        ('default', [('busy_timeout', current_app.config.get('SQLITE_BUSY_TIMEOUT') or 0)]),
+        ('configured', DatabaseTuning.pragmas(current_app.config)),
+    ]
+    click.echo(f'{readers} readers, {writers} writers, {seconds:g}s per run')
+    for label, pragmas in runs:
+        with tempfile.TemporaryDirectory() as directory:
+            result = db_tuning.benchmark(os.path.join(directory, 'bench.db'), pragmas,
+                                         readers=readers, writers=writers, seconds=seconds)
+        settings = ', '.join(f'{name}={value}' for name, value in pragmas)
+        click.echo(f'{label:<11} {result.reads_per_second:9.0f} reads/s  {result.writes_per_second:7.0f} writes/s  '
+                   f'read p99 {result.read_p99_ms:6.2f} ms, max {result.read_max_ms:7.2f} ms  {result.busy} busy errors  ({settings})')
@@ -0,0 +1,165 @@
+import threading
+from typing import Dict, Iterable, Iterator, Optional
+
+RATING_BUCKETS = (4, 3, 2, 1)
+
+
+def to_bitmap(shop_ids: Iterable[int]) -> int:
+    """Pack shop ids into an int whose bit n is set when shop n is present."""
+    ids = list(shop_ids)
+    if not ids:
+        return 0
+    # Setting bits in a bytearray keeps this linear; OR-ing ints one id at a time is quadratic
+    data = bytearray(max(ids) // 8 + 1)
+    for shop_id in ids:
+        data[shop_id >> 3] |= 1 << (shop_id & 7)
+    return int.from_bytes(data, 'little')
+
+
+def bitmap_ids(bitmap: int) -> Iterator[int]:
+    """Yield the shop ids in a bitmap in ascending order."""
+    data = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, 'little')
+    for index, byte in enumerate(data):
+        while byte:
+            low = byte & -byte
+            yield index * 8 + low.bit_length() - 1
+            byte ^= low
+
+
+class FacetIndex:
+    """Precomputed facet bitmaps for the search page.
+
+    Every active shop has a category bitmask (bit i set when it sells a
+    product in category i), and each category, the open shops and each
+    rating bucket has a bitmap of shop ids. Counting a facet over a result
+    set is then an AND and a popcount rather than a GROUP BY over products.
+    Built lazily from the database, and rebuilt once the catalog version
+    moves past the one it was built at, so writes made by other workers,
+    the CLI or scripts show up on the next search.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.clear()
+
+    def init_app(self, app):
+        """Reset the index for a new application; it is rebuilt lazily on first use."""
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._category_bits: Dict[str, int] = {}
+            self._shop_categories: Dict[int, int] = {}
+            self._category_shops: Dict[str, int] = {}
+            self._shops = 0
+            self._open = 0
+            self._rating: Dict[int, int] = {bucket: 0 for bucket in RATING_BUCKETS}
+            self._built = False
+            self._version = None
+
+    def _category_bit(self, category: str) -> int:
+        if category not in self._category_bits:
+            self._category_bits[category] = 1 << len(self._category_bits)
+        return self._category_bits[category]
+
+    def _mask(self, categories: Iterable[str]) -> int:
+        mask = 0
+        for category in categories:
+            if category:
+                mask |= self._category_bit(category)
+        return mask
+
+    def _current(self, version: int) -> bool:
+        # A lagging replica may report an older version than the index was built at
+        return self._built and version <= self._version
+
+    def ensure_built(self):
+        """Build the bitmaps from active shops and their products if missing or out of date."""
+        from models import db, Shop, Product
+        from services.catalog_version import catalog_version
+
+        # Read the version before the rows, so a write in between only causes another rebuild
+        version, _ = catalog_version.get()
+        if self._current(version):
+            return
+
+        with self._lock:
+            if self._current(version):
+                return
+            self.clear()
+            shops = db.session.query(Shop.id, Shop.is_open, Shop.rating_sum, Shop.review_count) \
+                .filter(Shop.is_active.is_(True)).all()
+            categories: Dict[int, set] = {}
+            rows = db.session.query(Product.shop_id, Product.category).distinct() \
+                .join(Shop).filter(Shop.is_active.is_(True))
+            for shop_id, category in rows:
+                categories.setdefault(shop_id, set()).add(category)
+
+            members: Dict[str, list] = {}
+            for shop_id, _, _, _ in shops:
+                mask = self._mask(categories.get(shop_id, ()))
+                self._shop_categories[shop_id] = mask
+                for category in categories.get(shop_id, ()):
+                    if category:
+                        members.setdefault(category, []).append(shop_id)
+
+            self._category_shops = {category: to_bitmap(ids) for category, ids in members.items()}
+            self._shops = to_bitmap(shop_id for shop_id, _, _, _ in shops)
+            self._open = to_bitmap(shop_id for shop_id, is_open, _, _ in shops if is_open)
+            for bucket in RATING_BUCKETS:
+                self._rating[bucket] = to_bitmap(
+                    shop_id for shop_id, _, rating_sum, review_count in shops
+                    if review_count and rating_sum / review_count >= bucket
+                )
+            self._version = version
+            self._built = True
+
+    def shop_categories(self, shop_id: int) -> set:
+        """Decode a shop's category bitmask."""
+        self.ensure_built()
+        with self._lock:
+            mask = self._shop_categories.get(shop_id, 0)
+            return {category for category, bit in self._category_bits.items() if mask & bit}
+
+    def facets(self, shop_ids: Iterable[int], category: Optional[str] = None,
+               min_rating: Optional[int] = None, open_only: bool = False) -> dict:
+        """Apply the facet selections to a set of matched shops and count every facet.
+
+        Each facet is counted with the other selections applied but not its
+        own, so the counts show what picking a different value would return.
+        Returns the selected shop ids and the counts.
+        """
+        self.ensure_built()
+
+        with self._lock:
+            matched = to_bitmap(shop_ids) & self._shops
+            by_category = self._category_shops.get(category, 0) if category else -1
+            by_rating = self._rating[min_rating] if min_rating in self._rating else -1
+            by_open = self._open if open_only else -1
+
+            within = matched & by_rating & by_open
+            categories = {}
+            for name, members in self._category_shops.items():
+                count = (within & members).bit_count()
+                if count:
+                    categories[name] = count
+
+            within = matched & by_category & by_open
+            ratings = {bucket: (within & self._rating[bucket]).bit_count() for bucket in RATING_BUCKETS}
+
+            within = matched & by_category & by_rating
+            open_count = (within & self._open).bit_count()
+            availability = {'open': open_count, 'closed': within.bit_count() - open_count}
+
+            selected = matched & by_category & by_rating & by_open
+            return {
+                'shop_ids': set(bitmap_ids(selected)),
+                'total': selected.bit_count(),
+                'categories': categories,
+                'ratings': ratings,
+                'availability': availability,
+            }
+
+
+# Global facet index instance
+facet_index = FacetIndex()
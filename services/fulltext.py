@@ -0,0 +1,316 @@
+import re
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from markupsafe import Markup, escape
+from sqlalchemy import event, text
+from sqlalchemy.exc import OperationalError
+
+FTS_TABLE = 'search_fts'
+WORD_RE = re.compile(r'[^\W_]+')
+
+# Private-use delimiters for highlighted terms, swapped for <mark> after escaping
+MARK_START = '\x02'
+MARK_END = '\x03'
+
+
+class SearchHit(NamedTuple):
+    shop_id: int
+    score: float
+    snippet: Optional[Markup]
+
+
+def highlight(raw: Optional[str]) -> Optional[Markup]:
+    """Escape a snippet and turn the match delimiters into <mark> tags."""
+    if not raw:
+        return None
+    html = str(escape(raw))
+    return Markup(html.replace(MARK_START, '<mark>').replace(MARK_END, '</mark>'))
+
+
+class FullTextBackend:
+    """Interface of a full-text index over shop and product text.
+
+    Documents are identified by kind ('shop' or 'product') and id and always
+    carry the shop they belong to, so hits can be grouped into shops.
+    """
+
+    name = 'base'
+
+    def exists(self, connection) -> bool:
+        """Whether the index is ready to be queried and updated on this connection's database."""
+        return True
+
+    def ensure(self, connection) -> bool:
+        """Create the index if needed. Returns True if it was just created."""
+        return False
+
+    def upsert(self, connection, documents: Iterable[dict]):
+        pass
+
+    def delete(self, connection, keys: Iterable[tuple]):
+        pass
+
+    def search(self, connection, terms: List[str], limit: int) -> List[SearchHit]:
+        raise NotImplementedError
+
+
+class SQLiteFTS5Backend(FullTextBackend):
+    """SQLite FTS5 index with BM25 ranking and highlighted snippets.
+
+    Shops and products share one table; the rowid encodes the kind and id so
+    updates and deletes are primary-key operations.
+    """
+
+    name = 'fts5'
+    # bm25 weights per column: shop_id, title, body, category
+    WEIGHTS = (0.0, 10.0, 3.0, 5.0)
+
+    @staticmethod
+    def rowid(kind: str, ref_id: int) -> int:
+        return ref_id * 2 + (1 if kind == 'product' else 0)
+
+    def exists(self, connection) -> bool:
+        return connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': FTS_TABLE}
+        ).first() is not None
+
+    def ensure(self, connection) -> bool:
+        if self.exists(connection):
+            return False
+        connection.execute(text(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+            "shop_id UNINDEXED, title, body, category, "
+            "tokenize = 'porter unicode61 remove_diacritics 2')"
+        ))
+        return True
+
+    def upsert(self, connection, documents: Iterable[dict]):
+        rows = [dict(document, rowid=self.rowid(document['kind'], document['id'])) for document in documents]
+        if not rows:
+            return
+        connection.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :rowid"), rows)
+        connection.execute(text(
+            f"INSERT INTO {FTS_TABLE} (rowid, shop_id, title, body, category) "
+            "VALUES (:rowid, :shop_id, :title, :body, :category)"
+        ), rows)
+
+    def delete(self, connection, keys: Iterable[tuple]):
+        rows = [{'rowid': self.rowid(kind, ref_id)} for kind, ref_id in keys]
+        if rows:
+            connection.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :rowid"), rows)
+
+    @staticmethod
+    def match_expression(terms: List[str]) -> str:
+        """Quote every term so user input is never parsed as FTS5 syntax; the last one is a prefix."""
+        quoted = ['"' + term.replace('"', '""') + '"' for term in terms]
+        quoted[-1] += '*'
+        return ' '.join(quoted)
+
+    def search(self, connection, terms: List[str], limit: int) -> List[SearchHit]:
+        weights = ', '.join(str(weight) for weight in self.WEIGHTS)
+        rows = connection.execute(text(
+            f"SELECT shop_id, bm25({FTS_TABLE}, {weights}) AS score, "
+            f"snippet({FTS_TABLE}, -1, :mark_start, :mark_end, '…', 12) AS snippet "
+            f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match ORDER BY score LIMIT :limit"
+        ), {
+            'match': self.match_expression(terms),
+            'mark_start': MARK_START,
+            'mark_end': MARK_END,
+            # A shop can match through several products, so over-fetch before grouping
+            'limit': limit * 4,
+        })
+
+        hits: Dict[int, SearchHit] = {}
+        for shop_id, score, snippet in rows:
+            if shop_id not in hits:
+                # bm25() is lower for better matches; flip it so higher is better
+                hits[shop_id] = SearchHit(int(shop_id), -score, highlight(snippet))
+        return list(hits.values())[:limit]
+
+
+class LikeBackend(FullTextBackend):
+    """Portable fallback for databases without a configured full-text engine.
+
+    Matches every term as a substring of the same columns and scores by the
+    weight of the columns that matched. It scans the tables, so production
+    databases other than SQLite should get a native backend.
+    """
+
+    name = 'like'
+    WEIGHTS = {'title': 10.0, 'body': 3.0, 'category': 5.0}
+
+    def search(self, connection, terms: List[str], limit: int) -> List[SearchHit]:
+        from models import db, Shop, Product
+
+        def matches(column, term):
+            return db.func.lower(db.func.coalesce(column, '')).contains(term, autoescape=True)
+
+        sources = (
+            ('shop', Shop.id, {'title': Shop.name, 'body': Shop.description, 'category': None}),
+            ('product', Product.shop_id, {'title': Product.name, 'body': Product.description,
+                                          'category': Product.category}),
+        )
+        hits: Dict[int, SearchHit] = {}
+        for kind, shop_id_column, columns in sources:
+            present = {field: column for field, column in columns.items() if column is not None}
+            query = db.select(shop_id_column, *present.values())
+            for term in terms:
+                query = query.where(db.or_(*(matches(column, term) for column in present.values())))
+            for row in connection.execute(query):
+                values = dict(zip(present, row[1:]))
+                score = 0.0
+                snippet = None
+                for field, value in values.items():
+                    lowered = (value or '').lower()
+                    matched = [term for term in terms if term in lowered]
+                    score += self.WEIGHTS[field] * len(matched)
+                    if matched and snippet is None:
+                        snippet = self._snippet(value, matched[0])
+                if row[0] not in hits or hits[row[0]].score < score:
+                    hits[row[0]] = SearchHit(row[0], score, snippet)
+
+        return sorted(hits.values(), key=lambda hit: (-hit.score, hit.shop_id))[:limit]
+
+    @staticmethod
+    def _snippet(value: str, term: str, context: int = 40) -> Markup:
+        start = value.lower().index(term)
+        end = start + len(term)
+        before = value[max(0, start - context):start]
+        after = value[end:end + context]
+        raw = ('…' if start > context else '') + before + MARK_START + value[start:end] + MARK_END + after + \
+            ('…' if end + context < len(value) else '')
+        return highlight(raw)
+
+
+class FullTextSearch:
+    """Full-text search over shop name/description and product name/description/category.
+
+    The backend is chosen per database: FTS5 on SQLite, the LIKE fallback
+    elsewhere, or whatever FULLTEXT_BACKEND names. Session hooks keep the
+    index in step with Shop and Product writes inside the same transaction.
+    The index itself is only created on the primary database, by its
+    migration, by db.create_all() or by rebuild(); searching never writes,
+    so it is safe on a read replica and falls back to LIKE on a database
+    whose index does not exist yet.
+    """
+
+    BACKENDS = {'fts5': SQLiteFTS5Backend, 'like': LikeBackend}
+    DIALECT_BACKENDS = {'sqlite': 'fts5'}
+
+    def __init__(self, app=None):
+        self.backend_name = None
+        self._backends = {}
+        self._lock = threading.Lock()
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Register the session and schema hooks and forget any per-database state."""
+        from models import db
+
+        self.backend_name = app.config.get('FULLTEXT_BACKEND')
+        with self._lock:
+            self._backends = {}
+        if not event.contains(db.session, 'after_flush', self._after_flush):
+            event.listen(db.session, 'after_flush', self._after_flush)
+        if not event.contains(db.metadata, 'after_create', self._after_create):
+            event.listen(db.metadata, 'after_create', self._after_create)
+
+    def _configured(self, dialect_name: str) -> FullTextBackend:
+        name = self.backend_name or self.DIALECT_BACKENDS.get(dialect_name, 'like')
+        return self.BACKENDS[name]()
+
+    def _backend(self, connection) -> FullTextBackend:
+        """Return the backend for a connection's engine, or LIKE while its index does not exist."""
+        engine = connection.engine
+        backend = self._backends.get(engine)
+        if backend is not None:
+            return backend
+
+        backend = self._configured(engine.dialect.name)
+        try:
+            ready = backend.exists(connection)
+        except OperationalError:
+            ready = False
+        if not ready:
+            # Not remembered, so the index is picked up once it is created
+            return LikeBackend()
+        with self._lock:
+            self._backends[engine] = backend
+        return backend
+
+    def _after_create(self, target, connection, **kwargs):
+        # db.create_all() only runs against the primary
+        backend = self._configured(connection.dialect.name)
+        try:
+            if backend.ensure(connection):
+                self._backfill(connection, backend)
+        except OperationalError:
+            # SQLite built without FTS5; search uses LIKE
+            pass
+
+    @staticmethod
+    def shop_document(shop) -> dict:
+        return {'kind': 'shop', 'id': shop.id, 'shop_id': shop.id, 'title': shop.name,
+                'body': shop.description or '', 'category': ''}
+
+    @staticmethod
+    def product_document(product) -> dict:
+        return {'kind': 'product', 'id': product.id, 'shop_id': product.shop_id, 'title': product.name,
+                'body': product.description or '', 'category': (product.category or '').replace('_', ' ')}
+
+    def _backfill(self, connection, backend: FullTextBackend):
+        from models import Shop, Product
+
+        shops = connection.execute(Shop.__table__.select())
+        backend.upsert(connection, [self.shop_document(shop) for shop in shops])
+        products = connection.execute(Product.__table__.select())
+        backend.upsert(connection, [self.product_document(product) for product in products])
+
+    def rebuild(self):
+        """Create the index on the primary if needed and re-index every shop and product."""
+        from models import db
+
+        connection = db.session.connection()
+        backend = self._configured(connection.dialect.name)
+        backend.ensure(connection)
+        self._backfill(connection, backend)
+        db.session.commit()
+
+    def _after_flush(self, session, flush_context):
+        from models import Shop, Product
+
+        documents = []
+        for obj in list(session.new) + list(session.dirty):
+            if isinstance(obj, Shop) and (obj in session.new or session.is_modified(obj)):
+                documents.append(self.shop_document(obj))
+            elif isinstance(obj, Product) and (obj in session.new or session.is_modified(obj)):
+                documents.append(self.product_document(obj))
+        deleted = [('shop' if isinstance(obj, Shop) else 'product', obj.id)
+                   for obj in session.deleted if isinstance(obj, (Shop, Product))]
+        if not documents and not deleted:
+            return
+
+        connection = session.connection()
+        backend = self._backend(connection)
+        backend.delete(connection, deleted)
+        backend.upsert(connection, documents)
+
+    @staticmethod
+    def tokenize(query: str) -> List[str]:
+        return WORD_RE.findall((query or '').casefold())
+
+    def search(self, query: str, limit: int = 100) -> List[SearchHit]:
+        """Return shops matching every word of the query, best first, with a highlighted snippet."""
+        from models import db
+
+        terms = self.tokenize(query)
+        if not terms:
+            return []
+        connection = db.session.connection()
+        return self._backend(connection).search(connection, terms, limit)
+
+
+# Global full-text search instance
+fulltext_search = FullTextSearch()
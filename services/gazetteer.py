@@ -0,0 +1,201 @@
+import csv
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import click
+from flask.cli import AppGroup
+
+from services.geocode_cache import GeocodeCache
+from services.location_service import LocationService
+
+ZIP_RE = re.compile(r'\b(\d{5})(?:-\d{4})?\b')
+COUNTRY_SUFFIXES = ('united states of america', 'united states', 'usa', 'us')
+
+gazetteer_cli = AppGroup('gazetteer', help='Manage the offline geocoding gazetteer.')
+
+
+class Gazetteer:
+    """Offline geocoder over town and ZIP code centroids stored in the locations table.
+
+    Rows are bulk-loaded from a CSV file and indexed in memory by ZIP code
+    and by "city state" name so common lookups never need the network. A
+    town with several ZIP codes resolves to the centroid of their rows.
+    """
+
+    BATCH_SIZE = 1000
+    # Rows under one name spread wider than this are different towns
+    TOWN_RADIUS_KM = 30
+
+    def __init__(self, app=None):
+        self._places: Dict[str, List[Tuple[str, float, float]]] = {}
+        self._zips: Dict[str, List[Tuple[str, float, float]]] = {}
+        self._lock = threading.Lock()
+        self._built = False
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Initialize gazetteer with Flask app."""
+        self.clear()
+        app.cli.add_command(gazetteer_cli)
+
+    def clear(self):
+        with self._lock:
+            self._places = {}
+            self._zips = {}
+            self._built = False
+
+    @staticmethod
+    def place_key(city: str, state: str = '') -> str:
+        """Build the index key for a place name."""
+        return ' '.join(GeocodeCache.normalize_address(f"{city} {state}").replace(',', ' ').split())
+
+    def _index(self, city, state, zip_code, lat, lon):
+        entry = (self.place_key(state or ''), lat, lon)
+        if zip_code:
+            self._zips.setdefault(zip_code[:5], []).append(entry)
+        if city:
+            keys = {self.place_key(city, state), self.place_key(city)}
+            for key in keys:
+                self._places.setdefault(key, []).append(entry)
+
+    def ensure_built(self):
+        """Build the in-memory index from gazetteer rows if needed."""
+        if self._built:
+            return
+
+        from models import db, Location
+
+        with self._lock:
+            if self._built:
+                return
+            # Geocoding may run while the caller has pending changes; leave them unflushed
+            with db.session.no_autoflush:
+                rows = (Location.query
+                        .filter(Location.lookup_key.is_(None))
+                        .with_entities(Location.city, Location.state, Location.zip_code,
+                                       Location.latitude, Location.longitude)
+                        .all())
+            for row in rows:
+                self._index(row.city, row.state, row.zip_code, row.latitude, row.longitude)
+            self._built = True
+
+    def load_csv(self, path: str, replace: bool = False) -> int:
+        """Bulk-load a city/state/zip/lat/lon CSV into the locations table. Returns the row count."""
+        with open(path, newline='', encoding='utf-8') as csv_file:
+            return self.load_rows(csv.DictReader(csv_file), replace=replace)
+
+    def load_rows(self, rows: Iterable[Dict[str, str]], replace: bool = False) -> int:
+        """Bulk-insert gazetteer rows in batches and refresh the in-memory index."""
+        from models import db, Location
+
+        if replace:
+            Location.query.filter(Location.lookup_key.is_(None)).delete(synchronize_session=False)
+
+        count = 0
+        batch = []
+        for row in rows:
+            city = (row.get('city') or '').strip()
+            state = (row.get('state') or '').strip()
+            zip_code = (row.get('zip') or row.get('zip_code') or '').strip()
+            batch.append({
+                'address': ', '.join(part for part in (city, f"{state} {zip_code}".strip()) if part),
+                'city': city,
+                'state': state,
+                'zip_code': zip_code,
+                'country': (row.get('country') or 'United States').strip(),
+                'latitude': float(row.get('lat') or row.get('latitude')),
+                'longitude': float(row.get('lon') or row.get('longitude')),
+            })
+            if len(batch) >= self.BATCH_SIZE:
+                db.session.execute(db.insert(Location), batch)
+                count += len(batch)
+                batch = []
+
+        if batch:
+            db.session.execute(db.insert(Location), batch)
+            count += len(batch)
+
+        db.session.commit()
+        self.clear()
+        return count
+
+    @staticmethod
+    def _split(address: str) -> Tuple[List[str], Optional[str]]:
+        """Return the normalized address parts without a trailing country, and any ZIP code."""
+        parts = GeocodeCache.normalize_address(address).split(', ')
+        while parts and parts[-1] in COUNTRY_SUFFIXES:
+            parts.pop()
+
+        match = ZIP_RE.search(parts[-1]) if parts else None
+        return parts, match.group(1) if match else None
+
+    def _resolve(self, entries: Sequence[Tuple[str, float, float]]) -> Optional[Tuple[float, float]]:
+        """Reduce the rows under one key to a point, or None if they name more than one place."""
+        if not entries or len({state for state, _, _ in entries}) > 1:
+            return None
+        if len(entries) == 1:
+            return entries[0][1:]
+
+        lat = sum(row_lat for _, row_lat, _ in entries) / len(entries)
+        lon = sum(row_lon for _, _, row_lon in entries) / len(entries)
+        if any(LocationService.calculate_distance(lat, lon, row_lat, row_lon) > self.TOWN_RADIUS_KM
+               for _, row_lat, row_lon in entries):
+            return None
+        return lat, lon
+
+    def _place(self, parts: Sequence[str]) -> Optional[Tuple[float, float]]:
+        return self._resolve(self._places.get(self.place_key(' '.join(parts)), ()))
+
+    def _zip(self, zip_code: Optional[str]) -> Optional[Tuple[float, float]]:
+        return self._resolve(self._zips.get(zip_code, ())) if zip_code else None
+
+    def lookup(self, address: str, exact: bool = True) -> Optional[Tuple[float, float]]:
+        """Geocode a town or ZIP code offline.
+
+        With exact=True the whole address must name a place ("Springfield, IL",
+        "62701", "Springfield, IL 62701"); a ZIP code wins over the town name
+        since it is the smaller area. Otherwise the ZIP code or trailing
+        city/state of a longer street address is used as an approximation.
+        """
+        self.ensure_built()
+
+        parts, zip_code = self._split(address)
+        if not parts:
+            return None
+
+        # Drop the ZIP code from the last part, leaving "city, state"
+        place_parts = list(parts)
+        if zip_code:
+            place_parts[-1] = ZIP_RE.sub('', place_parts[-1]).strip()
+            if not place_parts[-1]:
+                place_parts.pop()
+
+        if exact and len(place_parts) > 2:
+            return None
+
+        found = self._zip(zip_code)
+        if found:
+            return found
+        if exact:
+            return self._place(place_parts) if place_parts else None
+
+        for start in range(max(0, len(place_parts) - 2), len(place_parts)):
+            found = self._place(place_parts[start:])
+            if found:
+                return found
+        return None
+
+
+# Global gazetteer instance
+gazetteer = Gazetteer()
+
+
+@gazetteer_cli.command('load')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--replace', is_flag=True, help='Delete previously loaded gazetteer rows first.')
+def load_gazetteer_command(path, replace):
+    """Load a city,state,zip,lat,lon CSV into the locations table."""
+    count = gazetteer.load_csv(path, replace=replace)
+    click.echo(f"Loaded {count} gazetteer locations.")
@@ -0,0 +1,180 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy.exc import SQLAlchemyError
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after a time-to-live."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: 'OrderedDict[str, Tuple[float, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """Return (hit, value) for a key, evicting it if it has expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return False, None
+
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return False, None
+
+            self._data.move_to_end(key)
+            return True, value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """Store a value, evicting the least recently used entry when full."""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class GeocodeCache:
+    """Two-tier geocoding cache: an in-process LRU in front of the locations table.
+
+    Forward lookups are keyed on a normalized address and reverse lookups on
+    rounded coordinates. Misses are cached too, for a shorter time, so
+    unknown addresses do not keep consuming the upstream rate budget.
+    """
+
+    DEFAULT_SIZE = 2048
+    DEFAULT_TTL = 30 * 24 * 3600  # 30 days
+    DEFAULT_NEGATIVE_TTL = 24 * 3600  # 1 day
+    DEFAULT_REVERSE_PRECISION = 4  # about 11m
+
+    def __init__(self, app=None):
+        self.ttl = self.DEFAULT_TTL
+        self.negative_ttl = self.DEFAULT_NEGATIVE_TTL
+        self.reverse_precision = self.DEFAULT_REVERSE_PRECISION
+        self.memory = TTLCache(self.DEFAULT_SIZE, self.DEFAULT_TTL)
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Initialize geocode cache with Flask app."""
+        self.ttl = app.config.get('GEOCODE_CACHE_TTL', self.DEFAULT_TTL)
+        self.negative_ttl = app.config.get('GEOCODE_NEGATIVE_TTL', self.DEFAULT_NEGATIVE_TTL)
+        self.reverse_precision = app.config.get('GEOCODE_REVERSE_PRECISION', self.DEFAULT_REVERSE_PRECISION)
+        self.memory = TTLCache(app.config.get('GEOCODE_CACHE_SIZE', self.DEFAULT_SIZE), self.ttl)
+
+    @staticmethod
+    def normalize_address(address: str) -> str:
+        """Normalize an address so trivially different spellings share a key."""
+        address = address.lower().replace('.', ' ')
+        address = re.sub(r'[^\w,#-]+', ' ', address)
+        parts = [' '.join(part.split()) for part in address.split(',')]
+        return ', '.join(part for part in parts if part)
+
+    def address_key(self, address: str) -> str:
+        return f"fwd:{self.normalize_address(address)}"
+
+    def reverse_key(self, lat: float, lon: float) -> str:
+        precision = self.reverse_precision
+        return f"rev:{round(lat, precision):.{precision}f},{round(lon, precision):.{precision}f}"
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """Return (hit, value); value is None for a cached miss."""
+        hit, value = self.memory.get(key)
+        if hit:
+            return True, value
+
+        from models import db, Location
+
+        table = Location.__table__
+        try:
+            # Own connection, so a lookup never flushes the caller's pending changes
+            with db.engine.connect() as connection:
+                row = connection.execute(db.select(table).where(table.c.lookup_key == key)).first()
+        except SQLAlchemyError as e:
+            current_app.logger.error(f"Geocode cache lookup failed: {str(e)}")
+            return False, None
+
+        if row is None or row.cached_at is None:
+            return False, None
+
+        ttl = self.negative_ttl if row.is_negative else self.ttl
+        age = (datetime.utcnow() - row.cached_at).total_seconds()
+        if age > ttl:
+            return False, None
+
+        value = None if row.is_negative else self._row_value(key, row)
+        self.memory.set(key, value, ttl - age)
+        return True, value
+
+    @staticmethod
+    def _row_value(key: str, row):
+        if key.startswith('rev:'):
+            return row.address
+        return row.latitude, row.longitude
+
+    def set(self, key: str, value: Any, details: Optional[dict] = None):
+        """Store a lookup result in both tiers. A value of None records a miss.
+
+        The row is written in its own transaction, so geocoding in the middle
+        of a request neither commits nor rolls back the request's changes. On
+        SQLite that transaction waits for any write the caller has already
+        flushed, so geocode before flushing.
+        """
+        from models import db, Location
+
+        is_negative = value is None
+        self.memory.set(key, value, self.negative_ttl if is_negative else None)
+
+        details = details or {}
+        if key.startswith('rev:'):
+            lat, lon = (float(part) for part in key[4:].split(','))
+            address = value or ''
+        else:
+            lat, lon = value if value else (0.0, 0.0)
+            address = details.get('address') or key[4:]
+
+        values = {
+            'address': address[:300],
+            'city': (details.get('city') or '')[:100],
+            'state': (details.get('state') or '')[:50],
+            'zip_code': (details.get('zip_code') or '')[:20],
+            'latitude': lat,
+            'longitude': lon,
+            'is_negative': is_negative,
+            'cached_at': datetime.utcnow(),
+        }
+        if details.get('country'):
+            values['country'] = details['country']
+
+        table = Location.__table__
+        try:
+            with db.engine.begin() as connection:
+                result = connection.execute(db.update(table).where(table.c.lookup_key == key).values(values))
+                if result.rowcount == 0:
+                    connection.execute(db.insert(table).values(lookup_key=key, **values))
+        except SQLAlchemyError as e:
+            current_app.logger.error(f"Geocode cache write failed: {str(e)}")
+
+    def clear(self):
+        """Clear the in-process tier."""
+        self.memory.clear()
+
+
+# Global geocode cache instance
+geocode_cache = GeocodeCache()
@@ -0,0 +1,227 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class GeocoderUnavailable(requests.exceptions.RequestException):
+    """Raised when the geocoder refuses a call without contacting the upstream."""
+
+
+class TokenBucket:
+    """Thread-safe token bucket rate limiter.
+
+    Callers reserve a token and then sleep until it becomes available, so
+    concurrent threads are spaced out instead of bursting.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """Take one token, waiting at most timeout seconds. Returns False if that is not enough."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            wait = 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+            if timeout is not None and wait > timeout:
+                return False
+            # Reserve the token now; a negative balance queues later callers behind us
+            self._tokens -= 1
+
+        if wait > 0:
+            time.sleep(wait)
+        return True
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one execution."""
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+        else:
+            try:
+                call.result = fn()
+            except Exception as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+
+class CircuitBreaker:
+    """Fail fast after repeated upstream failures or slow responses.
+
+    After failure_threshold consecutive failures the circuit opens and calls
+    are rejected for reset_timeout seconds, then a single trial call is let
+    through. Calls slower than slow_call_threshold count as failures.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30, slow_call_threshold: float = 5):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.slow_call_threshold = slow_call_threshold
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Return True if a call may go upstream now."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def release(self):
+        """Give back a trial slot for a call that never reached the upstream."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record(self, success: bool, duration: float = 0.0):
+        """Record the outcome of a call that was allowed through."""
+        if duration > self.slow_call_threshold:
+            success = False
+
+        with self._lock:
+            self._trial_in_flight = False
+            if success:
+                self._failures = 0
+                self.state = self.CLOSED
+                return
+
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+class GeocoderClient:
+    """HTTP client for Nominatim with connection pooling and upstream protection.
+
+    A shared requests.Session reuses connections, a token bucket enforces the
+    upstream rate policy across threads, identical in-flight requests are
+    coalesced, and a circuit breaker fails fast while the upstream is down.
+    """
+
+    DEFAULT_BASE_URL = 'https://nominatim.openstreetmap.org'
+    DEFAULT_USER_AGENT = 'LocalBasket/1.0 (local-produce-app)'
+
+    def __init__(self, app=None):
+        self.base_url = self.DEFAULT_BASE_URL
+        self.timeout = 10
+        self.max_queue_wait = 5
+        self._configure(rate=1.0, pool_size=10, user_agent=self.DEFAULT_USER_AGENT,
+                        failure_threshold=5, reset_timeout=30, slow_call_threshold=5)
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Initialize geocoder client with Flask app."""
+        self.base_url = app.config.get('GEOCODER_BASE_URL', self.DEFAULT_BASE_URL).rstrip('/')
+        self.timeout = app.config.get('GEOCODER_TIMEOUT', 10)
+        self.max_queue_wait = app.config.get('GEOCODER_MAX_QUEUE_WAIT', 5)
+        self._configure(
+            rate=app.config.get('GEOCODER_RATE_LIMIT', 1.0),
+            pool_size=app.config.get('GEOCODER_POOL_SIZE', 10),
+            user_agent=app.config.get('GEOCODER_USER_AGENT', self.DEFAULT_USER_AGENT),
+            failure_threshold=app.config.get('GEOCODER_FAILURE_THRESHOLD', 5),
+            reset_timeout=app.config.get('GEOCODER_RESET_TIMEOUT', 30),
+            slow_call_threshold=app.config.get('GEOCODER_SLOW_CALL_THRESHOLD', 5),
+        )
+
+    def _configure(self, rate, pool_size, user_agent, failure_threshold, reset_timeout, slow_call_threshold):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers['User-Agent'] = user_agent
+
+        self.session = session
+        self.rate_limiter = TokenBucket(rate)
+        self.single_flight = SingleFlight()
+        self.circuit_breaker = CircuitBreaker(failure_threshold, reset_timeout, slow_call_threshold)
+
+    def search(self, address: str) -> Any:
+        """Forward geocode an address, returning the decoded JSON result list."""
+        return self._get('/search', {'q': address, 'format': 'json', 'limit': 1, 'addressdetails': 1})
+
+    def reverse(self, lat: float, lon: float) -> Any:
+        """Reverse geocode coordinates, returning the decoded JSON result."""
+        return self._get('/reverse', {'lat': lat, 'lon': lon, 'format': 'json', 'addressdetails': 1})
+
+    def _get(self, path: str, params: Dict[str, Any]) -> Any:
+        key = path + '?' + '&'.join(f"{name}={params[name]}" for name in sorted(params))
+        return self.single_flight.do(key, lambda: self._fetch(path, params))
+
+    def _fetch(self, path: str, params: Dict[str, Any]) -> Any:
+        if not self.circuit_breaker.allow():
+            raise GeocoderUnavailable('Geocoder circuit is open')
+
+        if not self.rate_limiter.acquire(timeout=self.max_queue_wait):
+            self.circuit_breaker.release()
+            raise GeocoderUnavailable('Geocoder rate limit exceeded')
+
+        started = time.monotonic()
+        try:
+            response = self.session.get(self.base_url + path, params=params, timeout=self.timeout)
+            response.raise_for_status()
+            data = response.json()
+        except (requests.exceptions.RequestException, ValueError):
+            self.circuit_breaker.record(False, time.monotonic() - started)
+            raise
+
+        self.circuit_breaker.record(True, time.monotonic() - started)
+        return data
+
+
+# Global geocoder client instance
+geocoder_client = GeocoderClient()
@@ -0,0 +1,187 @@
+import re
+from datetime import datetime
+from typing import Callable, List, NamedTuple, Sequence
+
+import click
+from flask.cli import AppGroup
+
+index_cli = AppGroup('indexes', help='Check that hot queries are served by indexes.')
+
+# "SCAN shops" is a full table scan; "SCAN shops USING INDEX ..." walks an index in order
+FULL_SCAN_RE = re.compile(r'^SCAN (\w+)$')
+# Sorting or de-duplicating rows the index could not deliver in order
+TEMP_BTREE_RE = re.compile(r'^USE TEMP B-TREE')
+INDEX_USED_RE = re.compile(r'\bUSING (?:COVERING )?INDEX (\w+)|\bUSING (INTEGER PRIMARY KEY)')
+
+PRIMARY_KEY = 'INTEGER PRIMARY KEY'
+
+
+class CatalogueQuery(NamedTuple):
+    name: str
+    build: Callable
+    # Indexes the plan has to use; PRIMARY_KEY stands for a rowid lookup or range
+    expected_indexes: Sequence[str] = ()
+    # Tables this query is expected to read in full, such as full catalog exports
+    allowed_scans: Sequence[str] = ()
+    allow_temp_btree: bool = False
+
+
+class Finding(NamedTuple):
+    query: str
+    problem: str
+    plan: List[str]
+
+
+def query_catalogue() -> List[CatalogueQuery]:
+    """Representative statements for the queries the routes and services run per request."""
+    from models import db, Shop, Product, Review, User, DeletionLog, Location
+    from services.pagination import seek_condition
+
+    since = datetime(2024, 1, 1)
+    newest_first = (Shop.created_at.desc(), Shop.id.desc())
+    return [
+        CatalogueQuery('index: active shops, newest first', lambda: (
+            db.select(Shop).where(Shop.is_active.is_(True)).order_by(*newest_first).limit(21)),
+            expected_indexes=('ix_shops_created_at_id',)),
+        CatalogueQuery('index: next page after a cursor', lambda: (
+            db.select(Shop).where(Shop.is_active.is_(True),
+                                  seek_condition((Shop.created_at, Shop.id), (since, 100), descending=True))
+            .order_by(*newest_first).limit(21)),
+            expected_indexes=('ix_shops_created_at_id',)),
+        CatalogueQuery('search: shops in a bounding box', lambda: (
+            db.select(Shop.id).where(Shop.is_active.is_(True),
+                                     Shop.latitude.between(39.9, 40.1), Shop.longitude.between(-75.1, -74.9))),
+            expected_indexes=('ix_shops_latitude_longitude',)),
+        CatalogueQuery('view_shop: available products', lambda: (
+            db.select(Product).where(Product.shop_id == 1, Product.is_available.is_(True))
+            .order_by(Product.id).limit(200)),
+            expected_indexes=('ix_products_shop_id_is_available',)),
+        CatalogueQuery('view_shop: reviews, newest first', lambda: (
+            db.select(Review).where(Review.shop_id == 1)
+            .order_by(Review.created_at.desc(), Review.id.desc()).limit(21)),
+            expected_indexes=('ix_reviews_shop_id_created_at',)),
+        CatalogueQuery('add_review: existing review check', lambda: (
+            db.select(Review.id).where(Review.buyer_id == 1, Review.shop_id == 1)),
+            expected_indexes=('ix_reviews_buyer_id_shop_id',)),
+        CatalogueQuery('api: shops by category', lambda: (
+            db.select(Shop.id).where(Shop.is_active.is_(True), Shop.products.any(Product.category == 'eggs'))
+            .order_by(Shop.id).limit(500)),
+            expected_indexes=('ix_products_shop_id_is_available',),
+            # Walks shops in id order and stops at the page limit
+            allowed_scans=('shops',)),
+        CatalogueQuery('api: shops after cursor', lambda: (
+            db.select(Shop.id).where(Shop.is_active.is_(True), Shop.id > 100).order_by(Shop.id).limit(500)),
+            expected_indexes=(PRIMARY_KEY,)),
+        CatalogueQuery('sync: changed shops', lambda: db.select(Shop).where(Shop.updated_at >= since),
+                       expected_indexes=('ix_shops_updated_at',)),
+        CatalogueQuery('sync: changed products', lambda: db.select(Product).where(Product.updated_at >= since),
+                       expected_indexes=('ix_products_updated_at',)),
+        CatalogueQuery('sync: tombstones', lambda: (
+            db.select(DeletionLog.entity, DeletionLog.entity_id).where(DeletionLog.deleted_at >= since)),
+            expected_indexes=('ix_deletion_log_deleted_at',)),
+        CatalogueQuery('sync: full snapshot of products', lambda: (
+            db.select(Product).join(Shop).where(Shop.is_active.is_(True))),
+            expected_indexes=(PRIMARY_KEY,), allowed_scans=('products',)),
+        # Served by the unique constraint's automatic index, whose name SQLite chooses
+        CatalogueQuery('auth: user by username', lambda: db.select(User).where(User.username == 'someone')),
+        CatalogueQuery('geocode cache lookup', lambda: (
+            db.select(Location).where(Location.lookup_key == 'key')),
+            expected_indexes=('ix_locations_lookup_key',)),
+    ]
+
+
+class IndexAdvisor:
+    """Runs EXPLAIN QUERY PLAN over the query catalogue and reports plans that miss their indexes.
+
+    A plan is flagged when it scans a table in full, sorts or de-duplicates
+    rows in a temporary B-tree, or does not use the indexes its catalogue
+    entry expects. Only SQLite is supported; plans on other databases
+    depend on table statistics and need EXPLAIN against production-sized
+    data instead.
+    """
+
+    def __init__(self, app=None):
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Register the CLI commands."""
+        app.cli.add_command(index_cli)
+
+    @staticmethod
+    def explain(statement) -> List[str]:
+        """Return the plan detail lines for a statement."""
+        from models import db
+
+        connection = db.session.connection()
+        if connection.dialect.name != 'sqlite':
+            raise RuntimeError('The index advisor only supports SQLite')
+        compiled = statement.compile(dialect=connection.dialect, compile_kwargs={'render_postcompile': True})
+        # Parameter values do not change the plan, so placeholders are left unbound
+        parameters = (None,) * len(compiled.positiontup or ())
+        rows = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {compiled}', parameters)
+        return [row[-1] for row in rows]
+
+    @staticmethod
+    def full_scans(plan: Sequence[str]) -> List[str]:
+        tables = []
+        for detail in plan:
+            match = FULL_SCAN_RE.match(detail.strip())
+            if match:
+                tables.append(match.group(1))
+        return tables
+
+    @staticmethod
+    def temp_btrees(plan: Sequence[str]) -> List[str]:
+        return [detail.strip() for detail in plan if TEMP_BTREE_RE.match(detail.strip())]
+
+    @staticmethod
+    def indexes_used(plan: Sequence[str]) -> List[str]:
+        used = []
+        for detail in plan:
+            for match in INDEX_USED_RE.finditer(detail):
+                used.append(match.group(1) or match.group(2))
+        return used
+
+    def review(self, entry: CatalogueQuery, plan: Sequence[str]) -> List[str]:
+        """Describe what is wrong with one query's plan; empty if it is healthy."""
+        problems = [f'full scan of {table}' for table in self.full_scans(plan) if table not in entry.allowed_scans]
+        if not entry.allow_temp_btree:
+            problems.extend(detail.lower() for detail in self.temp_btrees(plan))
+        used = self.indexes_used(plan)
+        for index in entry.expected_indexes:
+            if index not in used:
+                problems.append(f"expected {index}, used {', '.join(used) or 'no index'}")
+        return problems
+
+    def check(self, catalogue: Sequence[CatalogueQuery] = None) -> List[Finding]:
+        """Explain every catalogue query and return its plan problems."""
+        findings = []
+        for entry in catalogue if catalogue is not None else query_catalogue():
+            plan = self.explain(entry.build())
+            findings.extend(Finding(entry.name, problem, plan) for problem in self.review(entry, plan))
+        return findings
+
+
+# Global index advisor instance
+index_advisor = IndexAdvisor()
+
+
+@index_cli.command('check')
+@click.option('--verbose', '-v', is_flag=True, help='Print the plan of every query.')
+def check_indexes_command(verbose):
+    """Flag catalogue queries that scan, sort or pick the wrong index. Exits 1 if any do."""
+    if verbose:
+        for entry in query_catalogue():
+            click.echo(entry.name)
+            for detail in index_advisor.explain(entry.build()):
+                click.echo(f'    {detail}')
+
+    findings = index_advisor.check()
+    for finding in findings:
+        click.echo(f"'{finding.query}': {finding.problem}", err=True)
+        for detail in finding.plan:
+            click.echo(f'    {detail}', err=True)
+    if findings:
+        raise SystemExit(1)
+    click.echo('Every catalogue query uses its indexes.')
@@ -1,7 +1,13 @@
 import math
 import requests
-from typing import Tuple, Optional, List, Dict
+from typing import Tuple, Optional, List, Dict, Sequence
 from flask import current_app
+from services.geocoder_client import geocoder_client
+
+try:
+    import numpy as np
+except ImportError:  # Listed in requirements.txt; without it batch distances fall back to pure Python
+    np = None
 
 
 class LocationService:
@@ -32,61 +38,150 @@ class LocationService:
         radius = LocationService.EARTH_RADIUS_KM if unit == 'km' else LocationService.EARTH_RADIUS_MILES
         return radius * c
     
+    @staticmethod
+    def calculate_distances(lat: float, lon: float, latitudes: Sequence[float], longitudes: Sequence[float], unit: str = 'km'):
+        """Calculate Haversine distances from one point to many in a single call.
+        
+        Returns a NumPy array when NumPy is installed, otherwise a list.
+        """
+        radius = LocationService.EARTH_RADIUS_KM if unit == 'km' else LocationService.EARTH_RADIUS_MILES
+        
+        if np is not None:
+            lat_rad = math.radians(lat)
+            lats_rad = np.radians(np.asarray(latitudes, dtype=np.float64))
+            lons_rad = np.radians(np.asarray(longitudes, dtype=np.float64))
+            
+            a = (np.sin((lats_rad - lat_rad) / 2) ** 2 +
+                 math.cos(lat_rad) * np.cos(lats_rad) * np.sin((lons_rad - math.radians(lon)) / 2) ** 2)
+            return radius * 2 * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+        
+        lat_rad = math.radians(lat)
+        lon_rad = math.radians(lon)
+        cos_lat = math.cos(lat_rad)
+        sin, cos, radians = math.sin, math.cos, math.radians
+        
+        distances = []
+        for other_lat, other_lon in zip(latitudes, longitudes):
+            other_lat_rad = radians(other_lat)
+            a = (sin((other_lat_rad - lat_rad) / 2) ** 2 +
+                 cos_lat * cos(other_lat_rad) * sin((radians(other_lon) - lon_rad) / 2) ** 2)
+            distances.append(radius * 2 * math.asin(math.sqrt(min(a, 1.0))))
+        return distances
+    
     @staticmethod
     def get_nearby_shops(user_lat: float, user_lon: float, shops: List, max_distance: float = 50, unit: str = 'km') -> List[Dict]:
         """Get shops within specified distance, sorted by proximity."""
         
-        nearby_shops = []
-        
-        for shop in shops:
-            if shop.latitude and shop.longitude:
-                distance = LocationService.calculate_distance(
-                    user_lat, user_lon, shop.latitude, shop.longitude, unit
-                )
-                
-                if distance <= max_distance:
-                    shop_data = {
-                        'shop': shop,
-                        'distance': round(distance, 2),
-                        'unit': unit
-                    }
-                    nearby_shops.append(shop_data)
+        shops = [shop for shop in shops if shop.latitude and shop.longitude]
+        distances = LocationService.calculate_distances(
+            user_lat, user_lon,
+            [shop.latitude for shop in shops],
+            [shop.longitude for shop in shops],
+            unit
+        )
+        
+        nearby_shops = [
+            {'shop': shop, 'distance': round(float(distance), 2), 'unit': unit}
+            for shop, distance in zip(shops, distances)
+            if distance <= max_distance
+        ]
         
         # Sort by distance
         nearby_shops.sort(key=lambda x: x['distance'])
         return nearby_shops
     
+    @staticmethod
+    def bounding_box(lat: float, lon: float, radius: float, unit: str = 'km') -> Tuple[float, float, float, float]:
+        """Return (min_lat, max_lat, min_lon, max_lon) enclosing a circle of the given radius.
+        
+        Longitude degrees shrink with latitude, so the longitude span is widened by
+        1/cos(lat). When the box crosses the antimeridian min_lon is greater than
+        max_lon; near the poles the full longitude range is returned.
+        """
+        earth_radius = LocationService.EARTH_RADIUS_KM if unit == 'km' else LocationService.EARTH_RADIUS_MILES
+        lat_delta = math.degrees(radius / earth_radius)
+        
+        min_lat = max(-90.0, lat - lat_delta)
+        max_lat = min(90.0, lat + lat_delta)
+        
+        if min_lat <= -90.0 or max_lat >= 90.0:
+            return min_lat, max_lat, -180.0, 180.0
+        
+        # Use the latitude closest to a pole, where longitude degrees are shortest
+        cos_lat = math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+        lon_delta = lat_delta / cos_lat if cos_lat > 0 else 180.0
+        if lon_delta >= 180.0:
+            return min_lat, max_lat, -180.0, 180.0
+        
+        min_lon = lon - lon_delta
+        max_lon = lon + lon_delta
+        if min_lon < -180.0:
+            min_lon += 360.0
+        if max_lon > 180.0:
+            max_lon -= 360.0
+        
+        return min_lat, max_lat, min_lon, max_lon
+    
+    @staticmethod
+    def nearby_shops_query(lat: float, lon: float, radius: float, unit: str = 'km', query=None):
+        """Restrict a Shop query to the bounding box around a point.
+        
+        The box is a cheap SQL prefilter served by the shops latitude/longitude
+        index; callers refine the candidates with get_nearby_shops.
+        """
+        from models import Shop
+        
+        if query is None:
+            query = Shop.query.filter_by(is_active=True)
+        
+        min_lat, max_lat, min_lon, max_lon = LocationService.bounding_box(lat, lon, radius, unit)
+        query = query.filter(Shop.latitude.between(min_lat, max_lat))
+        
+        if min_lon <= max_lon:
+            if min_lon > -180.0 or max_lon < 180.0:
+                query = query.filter(Shop.longitude.between(min_lon, max_lon))
+        else:
+            query = query.filter((Shop.longitude >= min_lon) | (Shop.longitude <= max_lon))
+        
+        return query
+    
     @staticmethod
     def geocode_address(address: str) -> Optional[Tuple[float, float]]:
-        """Geocode address to latitude and longitude using a free service."""
+        """Geocode address to latitude and longitude using a free service.
+        
+        Towns and ZIP codes are answered by the offline gazetteer, and other
+        results, including misses, are served from the geocode cache when
+        possible so repeated addresses never reach the upstream service.
+        """
+        from services.gazetteer import gazetteer
+        from services.geocode_cache import geocode_cache
+        
+        coordinates = gazetteer.lookup(address)
+        if coordinates:
+            return coordinates
+        
+        key = geocode_cache.address_key(address)
+        hit, coordinates = geocode_cache.get(key)
+        if hit:
+            return coordinates
         
         try:
             # Using Nominatim (OpenStreetMap) - free geocoding service
-            url = "https://nominatim.openstreetmap.org/search"
-            params = {
-                'q': address,
-                'format': 'json',
-                'limit': 1,
-                'addressdetails': 1
-            }
-            
-            headers = {
-                'User-Agent': 'LocalBasket/1.0 (local-produce-app)'
-            }
-            
-            response = requests.get(url, params=params, headers=headers, timeout=10)
-            response.raise_for_status()
-            
-            data = response.json()
+            data = geocoder_client.search(address)
             
             if data:
                 location = data[0]
                 lat = float(location['lat'])
                 lon = float(location['lon'])
+                geocode_cache.set(key, (lat, lon), LocationService._address_details(location))
                 return lat, lon
             
+            geocode_cache.set(key, None, {'address': address})
+            
         except requests.exceptions.RequestException as e:
             current_app.logger.error(f"Geocoding request failed: {str(e)}")
+            # Offline: approximate with the address's town or ZIP code
+            return gazetteer.lookup(address, exact=False)
         except (KeyError, ValueError, IndexError) as e:
             current_app.logger.error(f"Geocoding response parsing failed: {str(e)}")
         
@@ -94,29 +189,26 @@ class LocationService:
     
     @staticmethod
     def reverse_geocode(lat: float, lon: float) -> Optional[str]:
-        """Reverse geocode coordinates to address."""
+        """Reverse geocode coordinates to address.
+        
+        Coordinates are rounded for the cache key so nearby lookups share an entry.
+        """
+        from services.geocode_cache import geocode_cache
+        
+        key = geocode_cache.reverse_key(lat, lon)
+        hit, address = geocode_cache.get(key)
+        if hit:
+            return address
         
         try:
-            url = "https://nominatim.openstreetmap.org/reverse"
-            params = {
-                'lat': lat,
-                'lon': lon,
-                'format': 'json',
-                'addressdetails': 1
-            }
-            
-            headers = {
-                'User-Agent': 'LocalBasket/1.0 (local-produce-app)'
-            }
-            
-            response = requests.get(url, params=params, headers=headers, timeout=10)
-            response.raise_for_status()
-            
-            data = response.json()
+            data = geocoder_client.reverse(lat, lon)
             
             if 'display_name' in data:
+                geocode_cache.set(key, data['display_name'], LocationService._address_details(data))
                 return data['display_name']
             
+            geocode_cache.set(key, None)
+            
         except requests.exceptions.RequestException as e:
             current_app.logger.error(f"Reverse geocoding request failed: {str(e)}")
         except (KeyError, ValueError) as e:
@@ -124,6 +216,19 @@ class LocationService:
         
         return None
     
+    @staticmethod
+    def _address_details(location: Dict) -> Dict:
+        """Extract the address parts of a Nominatim result for caching."""
+        details = location.get('address') or {}
+        return {
+            'address': location.get('display_name'),
+            'city': (details.get('city') or details.get('town') or
+                     details.get('village') or details.get('hamlet')),
+            'state': details.get('state'),
+            'zip_code': details.get('postcode'),
+            'country': details.get('country'),
+        }
+    
     @staticmethod
     def validate_coordinates(lat: float, lon: float) -> bool:
         """Validate latitude and longitude coordinates."""
@@ -0,0 +1,64 @@
+import struct
+import sys
+from array import array
+from typing import Dict, Iterable, List, Tuple
+
+MAGIC = b'LBM1'
+MIMETYPE = 'application/vnd.localbasket.markers'
+HEADER = struct.Struct('<4sI')
+
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values.tobytes()
+
+
+def encode_markers(rows: Iterable[Tuple[int, float, float, float, bool]]) -> bytes:
+    """Pack (id, latitude, longitude, rating, is_open) rows into a columnar little-endian buffer.
+
+    Layout: magic and uint32 count, then int32 ids, float32 latitudes,
+    float32 longitudes, uint8 ratings in tenths of a star and finally the
+    is_open flags packed eight to a byte. The 8-byte header keeps every
+    4-byte column aligned so a browser can view it as a typed array in place.
+    """
+    ids = array('i')
+    latitudes = array('f')
+    longitudes = array('f')
+    ratings = bytearray()
+    flags = bytearray()
+
+    for index, (shop_id, lat, lon, rating, is_open) in enumerate(rows):
+        ids.append(shop_id)
+        latitudes.append(lat)
+        longitudes.append(lon)
+        ratings.append(max(0, min(50, round((rating or 0) * 10))))
+        if index % 8 == 0:
+            flags.append(0)
+        if is_open:
+            flags[-1] |= 1 << (index % 8)
+
+    return b''.join((HEADER.pack(MAGIC, len(ids)), _little_endian(ids), _little_endian(latitudes),
+                     _little_endian(longitudes), bytes(ratings), bytes(flags)))
+
+
+def decode_markers(data: bytes) -> List[Dict]:
+    """Unpack a buffer from encode_markers; the reference for the decoder in map.js."""
+    magic, count = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError('Not a marker buffer')
+
+    offset = HEADER.size
+    ids = struct.unpack_from(f'<{count}i', data, offset)
+    latitudes = struct.unpack_from(f'<{count}f', data, offset + 4 * count)
+    longitudes = struct.unpack_from(f'<{count}f', data, offset + 8 * count)
+    ratings = data[offset + 12 * count:offset + 13 * count]
+    flags = data[offset + 13 * count:]
+
+    return [{
+        'id': ids[i],
+        'latitude': latitudes[i],
+        'longitude': longitudes[i],
+        'rating': ratings[i] / 10,
+        'is_open': bool(flags[i // 8] >> (i % 8) & 1),
+    } for i in range(count)]
@@ -0,0 +1,89 @@
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, List, NamedTuple, Optional, Sequence
+
+from sqlalchemy import and_, or_
+
+
+class KeysetPage(NamedTuple):
+    items: List[Any]
+    next_cursor: Optional[str]
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not cursor serializable')
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encode keyset values as an opaque URL-safe cursor."""
+    raw = json.dumps(list(values), default=_json_default, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> list:
+    """Decode a cursor from encode_cursor; raises ValueError if it is malformed."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (TypeError, UnicodeDecodeError, json.JSONDecodeError, base64.binascii.Error) as e:
+        raise ValueError('Invalid cursor') from e
+    if not isinstance(values, list):
+        raise ValueError('Invalid cursor')
+    return values
+
+
+def _coerce(column, value):
+    """Turn a decoded cursor value back into the column's Python type."""
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    return python_type(value)
+
+
+def seek_condition(columns: Sequence, values: Sequence[Any], descending: bool = False):
+    """Build the WHERE clause selecting rows strictly after values in (columns...) order.
+
+    Expanded to a >= x AND ((a > x) OR (a = x AND b > y) ...) rather than a
+    row-value comparison so every backend can seek the index on the leading
+    column; the redundant a >= x bound is what lets SQLite use it as a range.
+    """
+    clauses = []
+    for position, column in enumerate(columns):
+        beyond = column < values[position] if descending else column > values[position]
+        equal = [columns[index] == values[index] for index in range(position)]
+        clauses.append(and_(*equal, beyond))
+    leading = columns[0] <= values[0] if descending else columns[0] >= values[0]
+    return and_(leading, or_(*clauses))
+
+
+def keyset_paginate(query, columns: Sequence, cursor: Optional[str] = None,
+                    limit: int = 20, descending: bool = False) -> KeysetPage:
+    """Return one page of a query ordered by columns, starting after the cursor.
+
+    The last column must be unique (normally the primary key) so the order
+    is total. One extra row is fetched to tell whether there is a next
+    page. Raises ValueError for a malformed cursor.
+    """
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != len(columns):
+            raise ValueError('Invalid cursor')
+        try:
+            values = [_coerce(column, value) for column, value in zip(columns, values)]
+        except (TypeError, ValueError) as e:
+            raise ValueError('Invalid cursor') from e
+        query = query.filter(seek_condition(columns, values, descending))
+
+    order = [column.desc() if descending else column.asc() for column in columns]
+    rows = query.order_by(*order).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([getattr(rows[-1], column.key) for column in columns])
+    return KeysetPage(rows, next_cursor)
@@ -0,0 +1,100 @@
+from collections import deque
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+class _Node:
+    __slots__ = ('children', 'values', 'count')
+
+    def __init__(self):
+        self.children: Dict[str, '_Node'] = {}
+        # Insertion-ordered set; a dict keeps membership checks O(1) for popular keys
+        self.values: Dict[Any, None] = {}
+        # Values stored in this node and everything below it
+        self.count = 0
+
+
+class PrefixIndex:
+    """Character trie mapping string keys to one or more hashable values.
+
+    Supports exact lookups, iteration over a prefix (shortest keys first),
+    counting the values under a prefix and removal of individual values.
+    """
+
+    def __init__(self):
+        self._root = _Node()
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def _find(self, key: str) -> Optional[_Node]:
+        node = self._root
+        for char in key:
+            node = node.children.get(char)
+            if node is None:
+                return None
+        return node
+
+    def insert(self, key: str, value: Any):
+        """Associate a value with a key; duplicate values are ignored."""
+        path = [self._root]
+        for char in key:
+            child = path[-1].children.get(char)
+            if child is None:
+                child = path[-1].children[char] = _Node()
+            path.append(child)
+
+        node = path[-1]
+        if value not in node.values:
+            node.values[value] = None
+            self._size += 1
+            for ancestor in path:
+                ancestor.count += 1
+
+    def remove(self, key: str, value: Any) -> bool:
+        """Remove a value from a key, pruning empty branches. Returns True if it was present."""
+        path = [self._root]
+        for char in key:
+            node = path[-1].children.get(char)
+            if node is None:
+                return False
+            path.append(node)
+
+        node = path[-1]
+        if value not in node.values:
+            return False
+        del node.values[value]
+        self._size -= 1
+        for ancestor in path:
+            ancestor.count -= 1
+
+        for depth in range(len(key), 0, -1):
+            node = path[depth]
+            if node.values or node.children:
+                break
+            del path[depth - 1].children[key[depth - 1]]
+        return True
+
+    def get(self, key: str) -> List[Any]:
+        """Return the values stored under exactly this key."""
+        node = self._find(key)
+        return list(node.values) if node else []
+
+    def count(self, prefix: str = '') -> int:
+        """Return the number of values under a prefix without walking them."""
+        node = self._find(prefix)
+        return node.count if node else 0
+
+    def items(self, prefix: str = '') -> Iterator[Tuple[str, Any]]:
+        """Yield (key, value) pairs under a prefix, shortest keys first."""
+        node = self._find(prefix)
+        if node is None:
+            return
+
+        queue = deque([(prefix, node)])
+        while queue:
+            key, node = queue.popleft()
+            for value in node.values:
+                yield key, value
+            for char in sorted(node.children):
+                queue.append((key + char, node.children[char]))
@@ -0,0 +1,104 @@
+import heapq
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from services.pagination import encode_cursor
+
+
+class RankedShop(NamedTuple):
+    shop: object
+    score: float
+    distance: Optional[float]
+
+
+class RankedPage(NamedTuple):
+    items: List[RankedShop]
+    total: int
+    next_cursor: Optional[str]
+
+
+class ShopRanker:
+    """Scores search candidates with a weighted blend of signals and keeps the best page.
+
+    Each signal is scaled to 0..1: text relevance relative to the best text
+    match, distance as 1 / (1 + distance / SEARCH_DISTANCE_SCALE), the
+    average rating out of five, and whether the shop is open. Signals that
+    are unavailable for a query (no text, no location) score zero for every
+    shop and so do not affect the order. Pages are keyset paginated on
+    (score, id), and only the best per_page candidates after the cursor are
+    kept, in a bounded heap, so any page costs O(N log k) rather than a
+    full sort.
+    """
+
+    DEFAULT_WEIGHTS = {'text': 0.5, 'distance': 0.3, 'rating': 0.15, 'open': 0.05}
+    DEFAULT_DISTANCE_SCALE = 5.0  # distance at which the distance signal halves
+
+    # Single-signal weights for the explicit sort orders on the search form
+    SORT_WEIGHTS = {
+        'distance': {'distance': 1.0},
+        'rating': {'rating': 1.0},
+        'relevance': {'text': 1.0},
+    }
+
+    def __init__(self, app=None):
+        self.weights = dict(self.DEFAULT_WEIGHTS)
+        self.distance_scale = self.DEFAULT_DISTANCE_SCALE
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Read the blend weights from SEARCH_RANK_WEIGHTS and SEARCH_DISTANCE_SCALE."""
+        self.weights = dict(self.DEFAULT_WEIGHTS, **app.config.get('SEARCH_RANK_WEIGHTS', {}))
+        self.distance_scale = float(app.config.get('SEARCH_DISTANCE_SCALE', self.DEFAULT_DISTANCE_SCALE))
+
+    def weights_for(self, sort: Optional[str]) -> Dict[str, float]:
+        return self.SORT_WEIGHTS.get(sort, self.weights)
+
+    def rank(self, shops: Sequence, per_page: int = 20, after: Optional[Tuple[float, int]] = None,
+             text_scores: Optional[Dict[int, float]] = None,
+             distances: Optional[Dict[int, float]] = None,
+             sort: Optional[str] = None) -> RankedPage:
+        """Return the page of shops following the (score, id) of after, best first.
+
+        Shops only need id, average_rating and is_open, so column rows work
+        as well as Shop objects. Ties go to the lower id.
+        """
+        weights = self.weights_for(sort)
+        w_text = weights.get('text', 0.0)
+        w_distance = weights.get('distance', 0.0)
+        w_rating = weights.get('rating', 0.0) / 5
+        w_open = weights.get('open', 0.0)
+        text_scores = text_scores or {}
+        distances = distances or {}
+        best_text = max(text_scores.values(), default=0.0)
+        if best_text > 0:
+            w_text /= best_text
+        else:
+            w_text = 0.0
+        scale = self.distance_scale
+
+        def scored():
+            for shop in shops:
+                distance = distances.get(shop.id)
+                score = (w_text * text_scores.get(shop.id, 0.0) +
+                         w_rating * shop.average_rating +
+                         (w_open if shop.is_open else 0.0))
+                if distance is not None:
+                    score += w_distance / (1 + distance / scale)
+                yield score, -shop.id, shop, distance
+
+        candidates = scored()
+        if after is not None:
+            bound = (after[0], -after[1])
+            candidates = (item for item in candidates if item[:2] < bound)
+
+        top = heapq.nlargest(per_page + 1, candidates, key=lambda item: item[:2])
+        next_cursor = None
+        if len(top) > per_page:
+            top = top[:per_page]
+            next_cursor = encode_cursor([top[-1][0], -top[-1][1]])
+        items = [RankedShop(shop, score, distance) for score, _, shop, distance in top]
+        return RankedPage(items, len(shops), next_cursor)
+
+
+# Global ranking instance
+shop_ranker = ShopRanker()
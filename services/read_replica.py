@@ -0,0 +1,118 @@
+import random
+import time
+from functools import wraps
+from typing import List
+
+from flask import current_app, g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+# SQLALCHEMY_BINDS keys starting with this are read replicas of the default database
+REPLICA_BIND_PREFIX = 'replica'
+PRIMARY_UNTIL_KEY = '_primary_until'
+
+
+class RoutingSession(Session):
+    """Session that reads from a replica while the current request allows it.
+
+    Flushes and INSERT/UPDATE/DELETE statements always go to the primary,
+    as does every statement once the request has written.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and not getattr(clause, 'is_dml', False):
+            replica = replica_router.replica_engine()
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class ReadReplicaRouter:
+    """Sends the queries of read-only GET views to a read replica.
+
+    Replicas are the SQLALCHEMY_BINDS entries whose key starts with
+    "replica"; each request decorated with read_only picks one at random.
+    A request that writes remembers the time in the Flask session, and
+    that browser reads from the primary for READ_REPLICA_STICKY_SECONDS
+    afterwards so it sees its own writes despite replication lag. Without
+    replica binds every query uses the primary as before.
+    """
+
+    DEFAULT_STICKY_SECONDS = 10
+
+    def __init__(self, app=None):
+        self.sticky_seconds = self.DEFAULT_STICKY_SECONDS
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Find the replica binds and register the write tracking hooks."""
+        from models import db
+
+        self.sticky_seconds = float(app.config.get('READ_REPLICA_STICKY_SECONDS', self.DEFAULT_STICKY_SECONDS))
+        with app.app_context():
+            binds = sorted(key for key in db.engines if key and key.startswith(REPLICA_BIND_PREFIX))
+        app.extensions['read_replica_binds'] = binds
+
+        for identifier, listener in (('after_flush', self._after_flush),
+                                     ('do_orm_execute', self._after_bulk_write)):
+            if not event.contains(db.session, identifier, listener):
+                event.listen(db.session, identifier, listener)
+        app.after_request(self._remember_write)
+        app.teardown_request(self._reset)
+
+    @staticmethod
+    def replica_binds() -> List[str]:
+        return current_app.extensions.get('read_replica_binds', [])
+
+    def replica_engine(self):
+        """The replica engine for the current request, or None to use the primary."""
+        if not has_request_context() or g.get('_wrote'):
+            return None
+        bind = g.get('_replica_bind')
+        if bind is None:
+            return None
+        from models import db
+        return db.engines[bind]
+
+    def using_replica(self) -> bool:
+        return self.replica_engine() is not None
+
+    def recently_wrote(self) -> bool:
+        return session.get(PRIMARY_UNTIL_KEY, 0) > time.time()
+
+    def read_only(self, view):
+        """Decorate a view whose GET requests only read, so they may use a replica."""
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            binds = self.replica_binds()
+            if binds and request.method in ('GET', 'HEAD') and not self.recently_wrote():
+                g._replica_bind = random.choice(binds)
+            return view(*args, **kwargs)
+        return wrapper
+
+    @staticmethod
+    def _mark_write():
+        if has_request_context():
+            g._wrote = True
+
+    def _after_flush(self, db_session, flush_context):
+        self._mark_write()
+
+    def _after_bulk_write(self, orm_execute_state):
+        if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+            self._mark_write()
+
+    def _remember_write(self, response):
+        if g.get('_wrote') and self.replica_binds():
+            session[PRIMARY_UNTIL_KEY] = time.time() + self.sticky_seconds
+        return response
+
+    @staticmethod
+    def _reset(exception=None):
+        g.pop('_replica_bind', None)
+        g.pop('_wrote', None)
+
+
+# Global read replica router instance
+replica_router = ReadReplicaRouter()
@@ -0,0 +1,292 @@
+import hashlib
+import json
+import math
+import pickle
+import threading
+from functools import wraps
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+
+from services.catalog_version import catalog_version
+from services.geocode_cache import TTLCache
+from services.read_replica import replica_router
+
+try:
+    import redis
+except ImportError:  # redis is optional; without it the cache is per process
+    redis = None
+
+ALL_SHOPS_TAG = 'shops'
+
+
+class MemoryBackend:
+    """In-process store implementing the shared backend interface.
+
+    Used as the local tier, and as a stand-in for the shared backend in
+    development and tests.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300):
+        self.entries = TTLCache(maxsize, ttl)
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key: str) -> Any:
+        return self.entries.get(key)[1]
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        self.entries.set(key, value, ttl)
+
+    def get_counters(self, keys: Sequence[str]) -> List[int]:
+        with self._lock:
+            return [self._counters.get(key, 0) for key in keys]
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def clear(self):
+        self.entries.clear()
+        with self._lock:
+            self._counters.clear()
+
+
+class RedisBackend:
+    """Shared backend on a Redis server, so every worker sees the same entries and tags."""
+
+    def __init__(self, url: str, prefix: str = 'local-basket:cache:'):
+        if redis is None:
+            raise RuntimeError('The redis package is required for RESPONSE_CACHE_SHARED_URL')
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key: str) -> Any:
+        data = self.client.get(self.prefix + key)
+        return pickle.loads(data) if data is not None else None
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=int(ttl) if ttl else None)
+
+    def get_counters(self, keys: Sequence[str]) -> List[int]:
+        if not keys:
+            return []
+        return [int(value or 0) for value in self.client.mget([self.prefix + key for key in keys])]
+
+    def incr(self, key: str) -> int:
+        return self.client.incr(self.prefix + key)
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + '*'):
+            self.client.delete(key)
+
+
+class ResponseCache:
+    """Cache of rendered GET responses with tag-based invalidation.
+
+    Responses are kept in a bounded in-process LRU and, when configured, in a
+    shared backend behind it. Every entry records the version of each tag it
+    depends on ("shop:3", "category:eggs", "region:40:-75", ...) when it was
+    rendered; invalidating a tag bumps its version, so stale entries simply
+    stop matching. Tag versions live in the shared backend when there is one,
+    which makes invalidation visible to every worker. Without one, tag
+    versions only see this process's writes, so entries also record the
+    catalog version and are dropped once any worker has written.
+
+    Only anonymous responses are cached, since pages embed the logged-in user.
+    """
+
+    DEFAULT_SIZE = 512
+    DEFAULT_TTL = 300
+    DEFAULT_REGION_SIZE = 1.0  # degrees
+    MAX_REGION_TAGS = 64
+    IGNORED_ARGS = ('csrf_token',)
+    UNCACHED_HEADERS = ('Content-Length', 'Set-Cookie', 'X-Cache')
+
+    def __init__(self, app=None):
+        self.enabled = True
+        self.ttl = self.DEFAULT_TTL
+        self.region_size = self.DEFAULT_REGION_SIZE
+        self.local = MemoryBackend(self.DEFAULT_SIZE, self.DEFAULT_TTL)
+        self.tag_store = self.local
+        self.shared = None
+        self._stats_lock = threading.Lock()
+        self.reset_stats()
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Initialize response cache with Flask app."""
+        self.enabled = app.config.get('RESPONSE_CACHE_ENABLED', True)
+        self.ttl = app.config.get('RESPONSE_CACHE_TTL', self.DEFAULT_TTL)
+        self.region_size = app.config.get('RESPONSE_CACHE_REGION_SIZE', self.DEFAULT_REGION_SIZE)
+        self.local = MemoryBackend(app.config.get('RESPONSE_CACHE_SIZE', self.DEFAULT_SIZE), self.ttl)
+
+        shared_url = app.config.get('RESPONSE_CACHE_SHARED_URL')
+        self.use_shared_backend(RedisBackend(shared_url) if shared_url else None)
+        self.reset_stats()
+
+    def use_shared_backend(self, backend):
+        """Put a shared backend (or None) behind the local LRU."""
+        self.shared = backend
+        self.tag_store = backend if backend is not None else self.local
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self._stats = {'hits': 0, 'local_hits': 0, 'shared_hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the local LRU occupancy."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        stats['size'] = len(self.local)
+        stats['maxsize'] = self.local.entries.maxsize
+        stats['shared'] = self.shared is not None
+        return stats
+
+    def _count(self, *names: str):
+        with self._stats_lock:
+            for name in names:
+                self._stats[name] += 1
+
+    def clear(self):
+        self.local.clear()
+        if self.shared is not None:
+            self.shared.clear()
+
+    # Tags
+
+    @staticmethod
+    def shop_tag(shop_id: int) -> str:
+        return f"shop:{shop_id}"
+
+    @staticmethod
+    def category_tag(category: str) -> str:
+        return f"category:{category}"
+
+    def region_tag(self, lat: float, lon: float) -> str:
+        return f"region:{math.floor(lat / self.region_size)}:{math.floor(lon / self.region_size)}"
+
+    def region_tags(self, west: float, south: float, east: float, north: float) -> List[str]:
+        """Return the region tags covering a bounding box, or the all-shops tag if it is too large."""
+        size = self.region_size
+        rows = range(math.floor(south / size), math.floor(north / size) + 1)
+        if west <= east:
+            cols = list(range(math.floor(west / size), math.floor(east / size) + 1))
+        else:
+            cols = list(range(math.floor(west / size), math.floor(180 / size) + 1)) + \
+                list(range(math.floor(-180 / size), math.floor(east / size) + 1))
+        if len(rows) * len(cols) > self.MAX_REGION_TAGS:
+            return [ALL_SHOPS_TAG]
+        return [f"region:{row}:{col}" for row in rows for col in cols]
+
+    def shop_tags(self, shop) -> List[str]:
+        """Return every tag a write to this shop, its products or its reviews affects."""
+        from models import db, Product
+
+        categories = db.session.execute(
+            db.select(Product.category).where(Product.shop_id == shop.id).distinct()
+        ).scalars()
+        tags = [ALL_SHOPS_TAG, self.shop_tag(shop.id)]
+        if shop.latitude is not None and shop.longitude is not None:
+            tags.append(self.region_tag(shop.latitude, shop.longitude))
+        tags.extend(self.category_tag(category) for category in categories)
+        return tags
+
+    def invalidate(self, *tags: str):
+        """Invalidate every cached response that depends on any of the tags."""
+        for tag in dict.fromkeys(tags):
+            self.tag_store.incr('tag:' + tag)
+            self._count('invalidations')
+
+    def _tag_versions(self, tags: Sequence[str]) -> List[int]:
+        versions = self.tag_store.get_counters(['tag:' + tag for tag in tags])
+        if self.shared is None:
+            versions.append(catalog_version.get()[0])
+        return versions
+
+    # Responses
+
+    def cache_key(self) -> str:
+        """Derive a key from the endpoint, its view arguments and the query string."""
+        args = sorted((name, value) for name, value in request.args.items(multi=True)
+                      if name not in self.IGNORED_ARGS)
+        raw = json.dumps([request.endpoint, sorted((request.view_args or {}).items()), args], default=str)
+        return 'response:' + hashlib.sha1(raw.encode()).hexdigest()
+
+    def _cacheable_request(self) -> bool:
+        return (self.enabled and request.method == 'GET' and
+                not current_user.is_authenticated and not session.get('_flashes'))
+
+    def _lookup(self, key: str):
+        entry = self.local.get(key)
+        tier = 'local_hits'
+        if entry is None and self.shared is not None:
+            entry = self.shared.get(key)
+            tier = 'shared_hits'
+            if entry is not None:
+                self.local.set(key, entry)
+
+        if entry is None:
+            return None
+        tags, versions, payload = entry
+        if self._tag_versions(tags) != versions:
+            return None
+        self._count('hits', tier)
+        return payload
+
+    def _store(self, key: str, tags: Sequence[str], versions: List[int], response):
+        headers = [(name, value) for name, value in response.headers.items()
+                   if name not in self.UNCACHED_HEADERS]
+        entry = (list(tags), versions, (response.get_data(), response.status_code, headers))
+        ttl = self.ttl
+        if replica_router.using_replica():
+            # A lagging replica may have rendered data older than the tag versions
+            ttl = min(ttl, replica_router.sticky_seconds)
+        self.local.set(key, entry, ttl)
+        if self.shared is not None:
+            self.shared.set(key, entry, ttl)
+
+    def cached(self, tags: Callable[..., Iterable[str]], unless: Optional[Callable[[], bool]] = None):
+        """Decorate a GET view to cache its anonymous responses.
+
+        tags is called with the view arguments inside the request and returns
+        the tags the response depends on. When unless returns True the
+        request bypasses the cache. Streamed responses are never stored.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if not self._cacheable_request() or (unless is not None and unless()):
+                    return view(*args, **kwargs)
+
+                key = self.cache_key()
+                payload = self._lookup(key)
+                if payload is not None:
+                    body, status, headers = payload
+                    response = current_app.response_class(body, status=status, headers=headers)
+                    response.headers['X-Cache'] = 'HIT'
+                    return response
+
+                self._count('misses')
+                response_tags = list(dict.fromkeys(tags(*args, **kwargs)))
+                # Snapshot versions before rendering so a concurrent write invalidates this entry
+                versions = self._tag_versions(response_tags)
+                response = make_response(view(*args, **kwargs))
+                if response.status_code == 200 and not response.is_streamed:
+                    self._store(key, response_tags, versions, response)
+                response.headers['X-Cache'] = 'MISS'
+                return response
+            return wrapper
+        return decorator
+
+
+# Global response cache instance
+response_cache = ResponseCache()
@@ -0,0 +1,182 @@
+import heapq
+import itertools
+import re
+import threading
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from services.prefix_index import PrefixIndex
+
+WORD_RE = re.compile(r'[^\W_]+')
+
+Key = Tuple[str, int]
+
+
+class SearchIndex:
+    """In-memory typeahead index over shop names, product names and categories.
+
+    Every word of a name or category is a key in a prefix trie pointing at the
+    shop or product it came from, together with the serialized result, so a
+    query is a few trie walks and never touches the database. Products of
+    inactive shops are not indexed.
+    """
+
+    MAX_CANDIDATES = 2000
+
+    def __init__(self):
+        self._trie = PrefixIndex()
+        self._docs: Dict[Key, dict] = {}
+        self._words: Dict[Key, List[str]] = {}
+        self._names: Dict[Key, str] = {}
+        self._shop_products: Dict[int, Set[int]] = {}
+        self._lock = threading.RLock()
+        self._built = False
+
+    def init_app(self, app):
+        """Reset the index for a new application; it is rebuilt lazily on first query."""
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._trie = PrefixIndex()
+            self._docs = {}
+            self._words = {}
+            self._names = {}
+            self._shop_products = {}
+            self._built = False
+
+    @staticmethod
+    def tokenize(text: Optional[str]) -> List[str]:
+        return WORD_RE.findall((text or '').casefold())
+
+    @staticmethod
+    def shop_document(shop) -> dict:
+        return {
+            'type': 'shop',
+            'id': shop.id,
+            'name': shop.name,
+            'description': shop.description,
+            'address': shop.address,
+            'rating': shop.average_rating,
+            'is_open': shop.is_open,
+        }
+
+    @staticmethod
+    def product_document(product) -> dict:
+        return {
+            'type': 'product',
+            'id': product.id,
+            'shop_id': product.shop_id,
+            'name': product.name,
+            'category': product.category,
+            'price': product.price,
+            'unit': product.unit,
+            'icon_class': product.icon_class,
+            'is_available': product.is_available,
+        }
+
+    def _add(self, key: Key, document: dict, *texts: Optional[str]):
+        self._remove(key)
+        words = list(dict.fromkeys(word for text in texts for word in self.tokenize(text)))
+        for word in words:
+            self._trie.insert(word, key)
+        self._docs[key] = document
+        self._words[key] = words
+        self._names[key] = ' '.join(self.tokenize(document['name']))
+
+    def _remove(self, key: Key):
+        for word in self._words.pop(key, ()):
+            self._trie.remove(word, key)
+        self._docs.pop(key, None)
+        self._names.pop(key, None)
+
+    def _index_shop(self, shop, products):
+        self._add(('shop', shop.id), self.shop_document(shop), shop.name)
+        product_ids = set()
+        for product in products:
+            self._add(('product', product.id), self.product_document(product), product.name, product.category)
+            product_ids.add(product.id)
+        self._shop_products[shop.id] = product_ids
+
+    def _drop_shop(self, shop_id: int, keep_products: Set[int] = frozenset()):
+        self._remove(('shop', shop_id))
+        for product_id in self._shop_products.pop(shop_id, set()) - keep_products:
+            self._remove(('product', product_id))
+
+    def ensure_built(self):
+        """Build the index from active shops and their products if it has not been built yet."""
+        if self._built:
+            return
+
+        from models import Shop, Product
+
+        with self._lock:
+            if self._built:
+                return
+            products_by_shop: Dict[int, list] = {}
+            for product in Product.query.join(Shop).filter(Shop.is_active.is_(True)):
+                products_by_shop.setdefault(product.shop_id, []).append(product)
+            for shop in Shop.query.filter_by(is_active=True):
+                self._index_shop(shop, products_by_shop.get(shop.id, []))
+            self._built = True
+
+    def sync_shop(self, shop):
+        """Re-index a shop and its products after a committed write, dropping removed products."""
+        if not self._built:
+            return
+
+        from models import Product
+
+        with self._lock:
+            if not shop.is_active:
+                self._drop_shop(shop.id)
+                return
+            products = Product.query.filter_by(shop_id=shop.id).all()
+            self._drop_shop(shop.id, keep_products={product.id for product in products})
+            self._index_shop(shop, products)
+
+    def _matches(self, terms: List[str]) -> Iterator[Key]:
+        """Yield every document with a word starting with each term.
+
+        Only the rarest term's postings are walked; the other terms are
+        checked against each candidate's own words.
+        """
+        counts = [self._trie.count(term) for term in terms]
+        anchor_index = min(range(len(terms)), key=counts.__getitem__)
+        if counts[anchor_index] == 0:
+            return
+        anchor = terms[anchor_index]
+        others = terms[:anchor_index] + terms[anchor_index + 1:]
+        seen = set()
+        for _, key in self._trie.items(anchor):
+            if key in seen:
+                continue
+            seen.add(key)
+            words = self._words[key]
+            if all(any(word.startswith(term) for word in words) for term in others):
+                yield key
+
+    def search(self, query: str, limit: int = 10) -> List[dict]:
+        """Return the best matches for a typed query; every term must prefix a word.
+
+        Results whose name starts with the query come first, then shorter
+        names, then shops before products.
+        """
+        terms = self.tokenize(query)
+        if not terms:
+            return []
+
+        self.ensure_built()
+
+        with self._lock:
+            phrase = ' '.join(terms)
+            ranked = []
+            # The cap applies to documents matching every term, so no real match is cut early
+            for key in itertools.islice(self._matches(terms), self.MAX_CANDIDATES):
+                name = self._names[key]
+                ranked.append(((not name.startswith(phrase), len(name), key[0] != 'shop', key[1]), key))
+
+            return [dict(self._docs[key]) for _, key in heapq.nsmallest(limit, ranked)]
+
+
+# Global typeahead index instance
+search_index = SearchIndex()
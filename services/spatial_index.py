@@ -0,0 +1,243 @@
+import heapq
+import itertools
+import math
+import threading
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+class _KDNode:
+    __slots__ = ('point', 'shop_id', 'axis', 'left', 'right', 'lower', 'upper', 'alive')
+
+    def __init__(self, point, shop_id, axis):
+        self.point = point
+        self.shop_id = shop_id
+        self.axis = axis
+        self.left = None
+        self.right = None
+        self.lower = list(point)
+        self.upper = list(point)
+        self.alive = True
+
+
+class KDTree:
+    """KD-tree over shop locations for k-nearest-neighbour queries.
+
+    Coordinates are stored as 3D points on the unit sphere, so straight-line
+    (chord) distance orders shops exactly like great-circle distance and the
+    antimeridian needs no special casing. Inserts descend the existing tree
+    and deletes leave tombstones; the tree is rebuilt once they make up a
+    large share of the nodes.
+    """
+
+    REBUILD_RATIO = 0.25
+
+    def __init__(self):
+        self._root: Optional[_KDNode] = None
+        self._nodes: Dict[int, _KDNode] = {}
+        self._stale = 0
+        self._lock = threading.RLock()
+        self._built = False
+
+    def init_app(self, app):
+        """Reset the tree for a new application; it is rebuilt lazily on first query."""
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._root = None
+            self._nodes = {}
+            self._stale = 0
+            self._built = False
+
+    def __len__(self):
+        return len(self._nodes)
+
+    @staticmethod
+    def to_point(lat: float, lon: float) -> Tuple[float, float, float]:
+        """Convert latitude/longitude to a point on the unit sphere."""
+        lat_rad = math.radians(lat)
+        lon_rad = math.radians(lon)
+        cos_lat = math.cos(lat_rad)
+        return cos_lat * math.cos(lon_rad), cos_lat * math.sin(lon_rad), math.sin(lat_rad)
+
+    @staticmethod
+    def chord_to_km(chord: float) -> float:
+        """Convert a unit-sphere chord length to a great-circle distance in km."""
+        from services.location_service import LocationService
+
+        return 2 * LocationService.EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+
+    def _build(self, nodes: List[_KDNode], depth: int = 0) -> Optional[_KDNode]:
+        if not nodes:
+            return None
+
+        axis = depth % 3
+        nodes.sort(key=lambda node: node.point[axis])
+        middle = len(nodes) // 2
+        node = nodes[middle]
+        node.axis = axis
+        node.left = self._build(nodes[:middle], depth + 1)
+        node.right = self._build(nodes[middle + 1:], depth + 1)
+
+        node.lower = list(node.point)
+        node.upper = list(node.point)
+        for child in (node.left, node.right):
+            if child is not None:
+                for i in range(3):
+                    node.lower[i] = min(node.lower[i], child.lower[i])
+                    node.upper[i] = max(node.upper[i], child.upper[i])
+        return node
+
+    def build(self, points):
+        """Replace the tree contents with an iterable of (shop_id, lat, lon)."""
+        with self._lock:
+            nodes = {shop_id: _KDNode(self.to_point(lat, lon), shop_id, 0) for shop_id, lat, lon in points}
+            self._nodes = nodes
+            self._root = self._build(list(nodes.values()))
+            self._stale = 0
+            self._built = True
+
+    def ensure_built(self):
+        """Build the tree from active shops if it has not been built yet."""
+        if self._built:
+            return
+
+        from models import Shop
+
+        with self._lock:
+            if self._built:
+                return
+            rows = (Shop.query
+                    .filter_by(is_active=True)
+                    .with_entities(Shop.id, Shop.latitude, Shop.longitude)
+                    .all())
+            self.build((row.id, row.latitude, row.longitude) for row in rows
+                       if row.latitude is not None and row.longitude is not None)
+
+    def _rebuild(self):
+        nodes = list(self._nodes.values())
+        for node in nodes:
+            node.left = node.right = None
+        self._root = self._build(nodes)
+        self._stale = 0
+
+    def insert(self, shop_id: int, lat: float, lon: float):
+        """Add or move a shop without rebuilding the whole tree."""
+        with self._lock:
+            self._remove(shop_id)
+
+            node = _KDNode(self.to_point(lat, lon), shop_id, 0)
+            self._nodes[shop_id] = node
+            if self._root is None:
+                self._root = node
+                return
+
+            parent = self._root
+            while True:
+                for i in range(3):
+                    parent.lower[i] = min(parent.lower[i], node.point[i])
+                    parent.upper[i] = max(parent.upper[i], node.point[i])
+                side = 'left' if node.point[parent.axis] < parent.point[parent.axis] else 'right'
+                child = getattr(parent, side)
+                if child is None:
+                    node.axis = (parent.axis + 1) % 3
+                    setattr(parent, side, node)
+                    break
+                parent = child
+
+            self._maybe_rebuild()
+
+    def update(self, shop_id: int, lat: float, lon: float):
+        self.insert(shop_id, lat, lon)
+
+    def _remove(self, shop_id: int) -> bool:
+        node = self._nodes.pop(shop_id, None)
+        if node is None:
+            return False
+        node.alive = False
+        self._stale += 1
+        return True
+
+    def remove(self, shop_id: int) -> bool:
+        """Tombstone a shop. Returns True if it was present."""
+        with self._lock:
+            removed = self._remove(shop_id)
+            self._maybe_rebuild()
+            return removed
+
+    def _maybe_rebuild(self):
+        if self._stale > max(16, len(self._nodes) * self.REBUILD_RATIO):
+            self._rebuild()
+
+    def sync_shop(self, shop):
+        """Insert, move or drop a shop according to its current state."""
+        if not self._built:
+            return
+
+        if shop.is_active and shop.latitude is not None and shop.longitude is not None:
+            self.update(shop.id, shop.latitude, shop.longitude)
+        else:
+            self.remove(shop.id)
+
+    @staticmethod
+    def _box_distance(point, lower, upper) -> float:
+        total = 0.0
+        for i in range(3):
+            if point[i] < lower[i]:
+                total += (lower[i] - point[i]) ** 2
+            elif point[i] > upper[i]:
+                total += (point[i] - upper[i]) ** 2
+        return total
+
+    def _iter_nearest(self, query) -> Iterator[Tuple[int, float]]:
+        """Yield (shop_id, chord_distance) for every shop in increasing distance order.
+
+        Inserts move bounds and attach children and rebuilds relink the whole
+        tree, so the caller must hold the lock until it stops iterating.
+        """
+        root = self._root
+        if root is None:
+            return
+
+        counter = itertools.count()
+        heap = [(self._box_distance(query, root.lower, root.upper), next(counter), root, False)]
+
+        while heap:
+            distance, _, node, is_point = heapq.heappop(heap)
+            if is_point:
+                if node.alive:
+                    yield node.shop_id, math.sqrt(distance)
+                continue
+
+            point_distance = sum((query[i] - node.point[i]) ** 2 for i in range(3))
+            heapq.heappush(heap, (point_distance, next(counter), node, True))
+            for child in (node.left, node.right):
+                if child is not None:
+                    heapq.heappush(heap, (self._box_distance(query, child.lower, child.upper),
+                                          next(counter), child, False))
+
+    def nearest(self, lat: float, lon: float, k: int,
+                after: Optional[Tuple[float, int]] = None) -> List[Tuple[int, float]]:
+        """Return the next k (shop_id, chord_distance) pairs ordered by (distance, shop_id).
+
+        after is the (chord_distance, shop_id) of the last item of the previous
+        page, which makes the order stable for keyset pagination.
+        """
+        self.ensure_built()
+
+        results = []
+        with self._lock:
+            for shop_id, distance in self._iter_nearest(self.to_point(lat, lon)):
+                if after is not None and (distance, shop_id) <= after:
+                    continue
+                # Keep collecting shops tied with the k-th so ties are ordered by id
+                if len(results) >= k and distance > results[-1][1]:
+                    break
+                results.append((shop_id, distance))
+
+        results.sort(key=lambda item: (item[1], item[0]))
+        return results[:k]
+
+
+# Global shop k-nearest-neighbour index instance
+shop_kdtree = KDTree()
@@ -0,0 +1,145 @@
+import json
+import random
+import re
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Collapse expanded IN lists so "IN (?, ?)" and "IN (?, ?, ?)" share a shape
+IN_LIST_RE = re.compile(r'\(\s*(?:\?|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|:\w+))+\s*\)')
+WHITESPACE_RE = re.compile(r'\s+')
+
+
+class RequestStats:
+    """SQL activity of one request."""
+
+    __slots__ = ('count', 'duration', 'shapes')
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes: Counter = Counter()
+
+    def repeated(self, threshold: int) -> Dict[str, int]:
+        """Statement shapes run at least threshold times, most frequent first."""
+        return {shape: count for shape, count in self.shapes.most_common() if count >= threshold}
+
+
+class SQLInstrumentation:
+    """Per-request query count, database time and N+1 detection.
+
+    Cursor events on every engine time each statement of a sampled request.
+    Statements are grouped by shape (the SQL text with bound parameters,
+    which is already free of literal values, with IN lists collapsed), and
+    a shape run SQL_N_PLUS_ONE_THRESHOLD or more times in one request is
+    reported as a probable N+1. Sampled responses get a Server-Timing
+    header and one JSON log line. Streamed responses are logged when the
+    server closes them, so the queries that feed the body are counted,
+    and get no header. Unsampled requests cost a dict lookup per
+    statement, so production can keep this on with a low
+    SQL_INSTRUMENTATION_SAMPLE_RATE.
+    """
+
+    DEFAULT_SAMPLE_RATE = 1.0
+    DEFAULT_THRESHOLD = 5
+
+    def __init__(self, app=None):
+        self.sample_rate = self.DEFAULT_SAMPLE_RATE
+        self.threshold = self.DEFAULT_THRESHOLD
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Register the request hooks and the engine-wide cursor events."""
+        if not app.config.get('SQL_INSTRUMENTATION_ENABLED', True):
+            return
+        self.sample_rate = float(app.config.get('SQL_INSTRUMENTATION_SAMPLE_RATE', self.DEFAULT_SAMPLE_RATE))
+        self.threshold = int(app.config.get('SQL_N_PLUS_ONE_THRESHOLD', self.DEFAULT_THRESHOLD))
+
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        # Listening on Engine covers every engine and bind the app creates
+        if not event.contains(Engine, 'before_cursor_execute', self._before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+            event.listen(Engine, 'handle_error', self._handle_error)
+
+    @staticmethod
+    def current() -> Optional[RequestStats]:
+        """Stats for the current request, or None outside a sampled request."""
+        if not has_request_context():
+            return None
+        return g.get('_sql_stats')
+
+    @staticmethod
+    def shape(statement: str) -> str:
+        return IN_LIST_RE.sub('(?)', WHITESPACE_RE.sub(' ', statement).strip())
+
+    def _start_request(self):
+        sampled = self.sample_rate >= 1 or random.random() < self.sample_rate
+        g._sql_stats = RequestStats() if sampled else None
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if self.current() is not None:
+            conn.info.setdefault('_sql_started', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        stats = self.current()
+        if stats is None:
+            return
+        started = conn.info.get('_sql_started')
+        if not started:
+            return
+        stats.duration += time.perf_counter() - started.pop()
+        stats.count += 1
+        stats.shapes[self.shape(statement)] += 1
+
+    @staticmethod
+    def _handle_error(exception_context):
+        # A failed statement never reaches after_cursor_execute
+        connection = exception_context.connection
+        if connection is not None and connection.info.get('_sql_started'):
+            connection.info['_sql_started'].pop()
+
+    def _finish_request(self, response):
+        stats = self.current()
+        if stats is None:
+            return response
+
+        record = {
+            'event': 'sql',
+            'method': request.method,
+            'endpoint': request.endpoint,
+            'path': request.path,
+            'status': response.status_code,
+        }
+        logger = current_app.logger
+        if response.is_streamed:
+            # A streamed body runs its queries after this hook, so it keeps
+            # counting until the server closes the response; the headers are
+            # already gone by then, so it gets no Server-Timing
+            response.call_on_close(lambda: self._report(logger, record, stats))
+            return response
+
+        g._sql_stats = None
+        response.headers.add('Server-Timing', f'db;dur={stats.duration * 1000:.1f};desc="{stats.count} queries"')
+        self._report(logger, record, stats)
+        return response
+
+    def _report(self, logger, record: dict, stats: RequestStats):
+        """Log the request's totals as one JSON line, as a warning if it looks like an N+1."""
+        record = dict(record, queries=stats.count, db_ms=round(stats.duration * 1000, 2))
+        repeated = stats.repeated(self.threshold)
+        if repeated:
+            record['n_plus_one'] = [{'statement': shape, 'count': count} for shape, count in repeated.items()]
+            logger.warning(json.dumps(record))
+        else:
+            logger.info(json.dumps(record))
+
+
+# Global SQL instrumentation instance
+sql_instrumentation = SQLInstrumentation()
@@ -0,0 +1,201 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import event
+
+sync_cli = AppGroup('sync', help='Manage the delta sync deletion log.')
+
+
+class SyncService:
+    """Delta sync of shops and products for offline clients.
+
+    Clients keep a copy of the catalog and pass back the token from their
+    last sync; they then receive only the rows whose updated_at moved since,
+    plus tombstones for deletions, which are recorded in the deletion_log
+    table by a session hook. Tokens hold the server time the previous sync
+    started, and each sync re-reads a short overlap window before it so rows
+    committed late by a concurrent transaction are not missed. Clients apply
+    rows as upserts, so seeing a row twice is harmless.
+
+    A full snapshot is served in pages of SYNC_PAGE_SIZE rows, shops first
+    and then products, in id order. While pages remain the token also holds
+    a keyset cursor (the entity and last id sent) and the response has
+    more set; the token of the last page holds only the time the snapshot
+    started, so the next delta picks up whatever changed while it was paged.
+    """
+
+    DEFAULT_OVERLAP = 5  # seconds
+    DEFAULT_TOMBSTONE_DAYS = 30
+    DEFAULT_PAGE_SIZE = 500
+
+    def __init__(self, app=None):
+        self.overlap = timedelta(seconds=self.DEFAULT_OVERLAP)
+        self.tombstone_ttl = timedelta(days=self.DEFAULT_TOMBSTONE_DAYS)
+        self.page_size = self.DEFAULT_PAGE_SIZE
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Register the deletion hook and CLI commands."""
+        from models import db
+
+        self.overlap = timedelta(seconds=app.config.get('SYNC_OVERLAP_SECONDS', self.DEFAULT_OVERLAP))
+        self.tombstone_ttl = timedelta(days=app.config.get('SYNC_TOMBSTONE_DAYS', self.DEFAULT_TOMBSTONE_DAYS))
+        self.page_size = max(int(app.config.get('SYNC_PAGE_SIZE', self.DEFAULT_PAGE_SIZE)), 1)
+        if not event.contains(db.session, 'after_flush', self._record_deletions):
+            event.listen(db.session, 'after_flush', self._record_deletions)
+        app.cli.add_command(sync_cli)
+
+    @staticmethod
+    def _entities():
+        from models import Shop, Product
+        return {Shop: 'shop', Product: 'product'}
+
+    def _record_deletions(self, session, flush_context):
+        # session.deleted still holds this flush's deletions, cascades included
+        entities = self._entities()
+        tombstones = [{'entity': entities[type(obj)], 'entity_id': obj.id, 'deleted_at': datetime.utcnow()}
+                      for obj in session.deleted if type(obj) in entities]
+        if tombstones:
+            from models import db, DeletionLog
+            session.connection().execute(db.insert(DeletionLog.__table__), tombstones)
+
+    @staticmethod
+    def encode_token(started_at: datetime, cursor: Optional[Tuple[str, int]] = None) -> str:
+        token = started_at.strftime('%Y%m%dT%H%M%S.%f')
+        if cursor:
+            token += '-%s-%d' % cursor
+        return token
+
+    def decode_token(self, token: str) -> Tuple[datetime, Optional[Tuple[str, int]]]:
+        """Parse a sync token into its time and snapshot cursor; raises ValueError if it is malformed."""
+        parts = token.split('-')
+        if len(parts) not in (1, 3):
+            raise ValueError(f'Malformed sync token: {token!r}')
+        started_at = datetime.strptime(parts[0], '%Y%m%dT%H%M%S.%f')
+        if len(parts) == 1:
+            return started_at, None
+        entity, last_id = parts[1], int(parts[2])
+        if entity not in self._entities().values():
+            raise ValueError(f'Unknown sync entity: {entity!r}')
+        return started_at, (entity, last_id)
+
+    @staticmethod
+    def serialize_shop(shop) -> Dict[str, Any]:
+        return {
+            'id': shop.id,
+            'name': shop.name,
+            'address': shop.address,
+            'latitude': shop.latitude,
+            'longitude': shop.longitude,
+            'rating': shop.average_rating,
+            'is_open': shop.is_open,
+            'is_active': shop.is_active,
+        }
+
+    @staticmethod
+    def serialize_product(product) -> Dict[str, Any]:
+        return {
+            'id': product.id,
+            'shop_id': product.shop_id,
+            'name': product.name,
+            'category': product.category,
+            'price': product.price,
+            'unit': product.unit,
+            'icon_class': product.icon_class,
+            'is_available': product.is_available,
+        }
+
+    def changes(self, since: Optional[datetime] = None,
+                cursor: Optional[Tuple[str, int]] = None) -> Dict[str, Any]:
+        """Return the catalog changes since a decoded token, or a snapshot page without one.
+
+        Deactivated shops and unavailable products are included in deltas so
+        clients can drop them. A token older than the tombstone retention
+        gets a full snapshot, since deletions may have been purged. A cursor
+        continues the snapshot started at since.
+        """
+        from models import db, Shop, Product, DeletionLog
+
+        if cursor:
+            return self._snapshot_page(since, cursor)
+
+        started_at = datetime.utcnow()
+        if since is None or since < started_at - self.tombstone_ttl:
+            return self._snapshot_page(started_at, ('shop', 0))
+
+        window_start = since - self.overlap
+        shops = Shop.query.filter(Shop.updated_at >= window_start)
+        products = Product.query.filter(Product.updated_at >= window_start)
+        deleted = {'shops': [], 'products': []}
+        tombstones = db.session.execute(
+            db.select(DeletionLog.entity, DeletionLog.entity_id)
+            .where(DeletionLog.deleted_at >= window_start)
+            .order_by(DeletionLog.id)
+        )
+        for entity, entity_id in tombstones:
+            deleted[f'{entity}s'].append(entity_id)
+
+        return {
+            'token': self.encode_token(started_at),
+            'full': False,
+            'more': False,
+            'shops': [self.serialize_shop(shop) for shop in shops.order_by(Shop.id)],
+            'products': [self.serialize_product(product) for product in products.order_by(Product.id)],
+            'deleted': deleted,
+        }
+
+    def _snapshot_page(self, started_at: datetime, cursor: Tuple[str, int]) -> Dict[str, Any]:
+        """One page of active shops and their products, after the cursor in id order."""
+        from models import Shop, Product
+
+        entity, last_id = cursor
+        shops, products, next_cursor = [], [], None
+        if entity == 'shop':
+            shops = (Shop.query.filter(Shop.is_active.is_(True), Shop.id > last_id)
+                     .order_by(Shop.id).limit(self.page_size + 1).all())
+            if len(shops) > self.page_size:
+                shops = shops[:self.page_size]
+                next_cursor = ('shop', shops[-1].id)
+            entity, last_id = 'product', 0
+
+        budget = self.page_size - len(shops)
+        if next_cursor is None:
+            # Fetch one row past the budget to tell whether another page follows
+            products = (Product.query.join(Shop)
+                        .filter(Shop.is_active.is_(True), Product.id > last_id)
+                        .order_by(Product.id).limit(budget + 1).all())
+            if len(products) > budget:
+                products = products[:budget]
+                next_cursor = ('product', products[-1].id if products else last_id)
+
+        return {
+            'token': self.encode_token(started_at, next_cursor),
+            'full': True,
+            'more': next_cursor is not None,
+            'shops': [self.serialize_shop(shop) for shop in shops],
+            'products': [self.serialize_product(product) for product in products],
+            'deleted': {'shops': [], 'products': []},
+        }
+
+    def purge_tombstones(self) -> int:
+        """Delete tombstones older than the retention period. Returns the number removed."""
+        from models import db, DeletionLog
+
+        cutoff = datetime.utcnow() - self.tombstone_ttl
+        count = DeletionLog.query.filter(DeletionLog.deleted_at < cutoff).delete(synchronize_session=False)
+        db.session.commit()
+        return count
+
+
+# Global sync service instance
+sync_service = SyncService()
+
+
+@sync_cli.command('purge')
+def purge_tombstones_command():
+    """Delete deletion log entries older than SYNC_TOMBSTONE_DAYS."""
+    count = sync_service.purge_tombstones()
+    click.echo(f"Purged {count} tombstones.")
@@ -0,0 +1,77 @@
+/**
+ * Infinite scroll for keyset-paginated lists
+ *
+ * Lists end with a .load-more element whose data-next-url returns the next
+ * batch of items as an HTML fragment, ending with its own .load-more when
+ * there is more. Without JavaScript the element's link loads the next page.
+ */
+
+class InfiniteScroll {
+  constructor(root = document) {
+    this.observer = 'IntersectionObserver' in window
+      ? new IntersectionObserver(entries => this.handleIntersection(entries), { rootMargin: '400px 0px' })
+      : null;
+    this.watch(root);
+  }
+
+  /**
+   * Start watching every load-more element under a node
+   * @param {ParentNode} root - Node to search
+   */
+  watch(root) {
+    root.querySelectorAll('.load-more[data-next-url]').forEach(element => {
+      if (this.observer) {
+        this.observer.observe(element);
+      }
+      const link = element.querySelector('a');
+      if (link) {
+        link.addEventListener('click', event => {
+          event.preventDefault();
+          this.loadMore(element);
+        });
+      }
+    });
+  }
+
+  handleIntersection(entries) {
+    entries.forEach(entry => {
+      if (entry.isIntersecting) {
+        this.loadMore(entry.target);
+      }
+    });
+  }
+
+  /**
+   * Replace a load-more element with the next batch of items
+   * @param {HTMLElement} element - The load-more element
+   */
+  async loadMore(element) {
+    if (element.dataset.loading) {
+      return;
+    }
+    element.dataset.loading = 'true';
+    if (this.observer) {
+      this.observer.unobserve(element);
+    }
+
+    try {
+      const response = await fetch(element.dataset.nextUrl, { credentials: 'same-origin' });
+      if (!response.ok) {
+        throw new Error(`HTTP ${response.status}`);
+      }
+      const template = document.createElement('template');
+      template.innerHTML = await response.text();
+      const parent = element.parentNode;
+      const nodes = Array.from(template.content.childNodes);
+      element.replaceWith(...nodes);
+      this.watch(parent);
+    } catch (error) {
+      console.error('Failed to load more items:', error);
+      delete element.dataset.loading;
+    }
+  }
+}
+
+document.addEventListener('DOMContentLoaded', () => {
+  window.infiniteScroll = new InfiniteScroll();
+});
@@ -6,10 +6,21 @@ class MapService {
   constructor() {
     this.map = null;
     this.markers = [];
+    this.clusterMarkers = [];
     this.userMarker = null;
     this.mapContainer = null;
     this.defaultCenter = { lat: 40.7128, lng: -74.0060 }; // New York City
     this.defaultZoom = 10;
+    this.catalogStorageKey = 'localBasketCatalog';
+    this.syncTimer = null;
+    // Markers are fetched for the viewport plus this fraction of its size on every side
+    this.viewportPadding = 0.5;
+    this.loadedBounds = null;
+    this.loadedZoom = null;
+    // Below this zoom the map shows server-side clusters instead of one marker per shop
+    this.clusterMaxZoom = 13;
+    this.followViewport = true;
+    this.loadRequest = 0;
   }
 
   /**
@@ -61,8 +72,11 @@ class MapService {
         this.onMapClick(event);
       });
 
-      // Load shops on map
-      await this.loadShops();
+      // Markers are loaded per viewport, starting with the first idle event
+      this.map.addListener('idle', Utils.debounce(() => this.onMapIdle(), 250));
+
+      // Keep the loaded markers current with small deltas
+      this.startCatalogSync();
       
       // Try to center on user location
       this.centerOnUserLocation();
@@ -97,19 +111,41 @@ class MapService {
   }
 
   /**
-   * Load shops on map
+   * Load shops on map: clusters when zoomed out, one marker per shop when zoomed in
    * @returns {Promise<void>}
    */
   async loadShops() {
+    const request = ++this.loadRequest;
+    this.followViewport = true;
     try {
-      const response = await fetch('/api/shops');
-      const shops = await response.json();
-      
-      this.clearMarkers();
-      
-      shops.forEach(shop => {
-        this.addShopMarker(shop);
-      });
+      const area = this.getLoadArea();
+      const zoom = this.getClusterZoom();
+      if (area && zoom !== null) {
+        const response = await fetch(`/api/shops/clusters?bbox=${area.join(',')}&zoom=${zoom}`);
+        const { clusters } = await response.json();
+        // A later pan or filter has started its own load
+        if (request !== this.loadRequest) return;
+
+        this.clearMarkers();
+        clusters.forEach(cluster => {
+          if (cluster.count === 1) {
+            this.addShopMarker({ id: cluster.shop_id, latitude: cluster.latitude, longitude: cluster.longitude });
+          } else {
+            this.addClusterMarker(cluster);
+          }
+        });
+      } else {
+        const response = await fetch(`/api/shops/markers${area ? `?bbox=${area.join(',')}` : ''}`);
+        const shops = MapService.decodeMarkers(await response.arrayBuffer());
+        if (request !== this.loadRequest) return;
+
+        this.clearMarkers();
+        shops.forEach(shop => {
+          this.addShopMarker(shop);
+        });
+      }
+      this.loadedBounds = area;
+      this.loadedZoom = zoom;
       
     } catch (error) {
       console.error('Failed to load shops:', error);
@@ -117,6 +153,137 @@ class MapService {
     }
   }
 
+  /**
+   * Decode the columnar marker buffer served by /api/shops/markers
+   * Layout (little-endian): 'LBM1', uint32 count, int32 ids, float32 latitudes,
+   * float32 longitudes, uint8 ratings in tenths, is_open bits packed eight per byte
+   * @param {ArrayBuffer} buffer - Response body
+   * @returns {Array<Object>} Shops with id, latitude, longitude, rating and is_open
+   */
+  static decodeMarkers(buffer) {
+    const header = new DataView(buffer, 0, 8);
+    const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+    if (magic !== 'LBM1') {
+      throw new Error('Unexpected marker feed format');
+    }
+
+    const count = header.getUint32(4, true);
+    const ids = new Int32Array(buffer, 8, count);
+    const latitudes = new Float32Array(buffer, 8 + 4 * count, count);
+    const longitudes = new Float32Array(buffer, 8 + 8 * count, count);
+    const ratings = new Uint8Array(buffer, 8 + 12 * count, count);
+    const flags = new Uint8Array(buffer, 8 + 13 * count);
+
+    const shops = new Array(count);
+    for (let i = 0; i < count; i++) {
+      shops[i] = {
+        id: ids[i],
+        latitude: latitudes[i],
+        longitude: longitudes[i],
+        rating: ratings[i] / 10,
+        is_open: ((flags[i >> 3] >> (i & 7)) & 1) === 1
+      };
+    }
+    return shops;
+  }
+
+  /**
+   * Fetch the name and address of a shop decoded from the marker feed
+   * @param {Object} shop - Shop data, completed in place
+   * @returns {Promise<Object>} The shop
+   */
+  async loadShopDetails(shop) {
+    if (shop.name !== undefined) return shop;
+
+    // Markers from clusters do not know whether the shop is open either
+    const response = await fetch(`/api/shops?ids=${shop.id}&fields=name,address,rating,is_open`);
+    const [details] = await response.json();
+    return Object.assign(shop, details);
+  }
+
+  /**
+   * Get the visible map area
+   * @returns {Array<number>|null} [west, south, east, north], or null before the map has bounds
+   */
+  getViewport() {
+    const bounds = this.map && this.map.getBounds ? this.map.getBounds() : null;
+    if (!bounds) return null;
+
+    const sw = bounds.getSouthWest();
+    const ne = bounds.getNorthEast();
+    return [sw.lng(), sw.lat(), ne.lng(), ne.lat()];
+  }
+
+  /**
+   * Get the area to fetch markers for: the viewport grown by viewportPadding,
+   * so small pans stay inside what is already loaded
+   * @returns {Array<number>|null} [west, south, east, north], or null before the map has bounds
+   */
+  getLoadArea() {
+    const viewport = this.getViewport();
+    if (!viewport) return null;
+
+    const [west, south, east, north] = viewport;
+    const width = (east - west + 360) % 360 || 360;
+    const latPad = (north - south) * this.viewportPadding;
+    const lngPad = width * this.viewportPadding;
+    const area = [west - lngPad, Math.max(-90, south - latPad), east + lngPad, Math.min(90, north + latPad)];
+    if (width + 2 * lngPad >= 360) {
+      area[0] = -180;
+      area[2] = 180;
+    } else {
+      area[0] = MapService.wrapLongitude(area[0]);
+      area[2] = MapService.wrapLongitude(area[2]);
+    }
+    return area;
+  }
+
+  /**
+   * Wrap a longitude into [-180, 180)
+   * @param {number} lng - Longitude
+   * @returns {number} Wrapped longitude
+   */
+  static wrapLongitude(lng) {
+    return ((lng + 540) % 360) - 180;
+  }
+
+  /**
+   * Check whether an area lies inside another; either may cross the antimeridian
+   * @param {Array<number>} outer - [west, south, east, north]
+   * @param {Array<number>} inner - [west, south, east, north]
+   * @returns {boolean} True if inner is covered by outer
+   */
+  static areaContains(outer, inner) {
+    if (inner[1] < outer[1] || inner[3] > outer[3]) return false;
+    const outerWidth = (outer[2] - outer[0] + 360) % 360 || 360;
+    const innerWidth = (inner[2] - inner[0] + 360) % 360 || 360;
+    const offset = (inner[0] - outer[0] + 360) % 360;
+    return outerWidth >= 360 || offset + innerWidth <= outerWidth;
+  }
+
+  /**
+   * Get the zoom level to request clusters for
+   * @returns {number|null} The map zoom, or null when it is high enough for individual markers
+   */
+  getClusterZoom() {
+    const zoom = this.map && this.map.getZoom ? this.map.getZoom() : undefined;
+    return zoom !== undefined && zoom < this.clusterMaxZoom ? Math.round(zoom) : null;
+  }
+
+  /**
+   * Reload markers once the map settles after a pan or zoom, unless the new
+   * viewport is still inside the area already loaded
+   */
+  onMapIdle() {
+    if (!this.followViewport) return;
+
+    // Clusters are computed per zoom level, so any zoom change while clustered needs new ones
+    const viewport = this.getViewport();
+    if (viewport && this.loadedBounds && MapService.areaContains(this.loadedBounds, viewport) &&
+        this.getClusterZoom() === this.loadedZoom) return;
+    this.loadShops();
+  }
+
   /**
    * Add shop marker to map
    * @param {Object} shop - Shop data
@@ -127,25 +294,58 @@ class MapService {
     const marker = new google.maps.Marker({
       position: { lat: shop.latitude, lng: shop.longitude },
       map: this.map,
-      title: shop.name,
+      title: shop.name || '',
       icon: {
         url: this.getShopIcon(shop),
         scaledSize: new google.maps.Size(40, 40)
       }
     });
 
-    const infoWindow = new google.maps.InfoWindow({
-      content: this.createInfoWindowContent(shop)
-    });
+    const infoWindow = new google.maps.InfoWindow();
 
-    marker.addListener('click', () => {
+    marker.addListener('click', async () => {
       this.closeAllInfoWindows();
+      // Markers from the binary feed carry no text; fetch it on first open
+      await this.loadShopDetails(shop);
+      marker.setTitle(shop.name);
+      marker.setIcon({ url: this.getShopIcon(shop), scaledSize: new google.maps.Size(40, 40) });
+      infoWindow.setContent(this.createInfoWindowContent(shop));
       infoWindow.open(this.map, marker);
     });
 
     this.markers.push({ marker, infoWindow, shop });
   }
 
+  /**
+   * Add a marker standing for several shops; clicking it zooms in on them
+   * @param {Object} cluster - Cluster from /api/shops/clusters
+   */
+  addClusterMarker(cluster) {
+    if (!this.map) return;
+
+    const marker = new google.maps.Marker({
+      position: { lat: cluster.latitude, lng: cluster.longitude },
+      map: this.map,
+      title: `${cluster.count} shops`,
+      label: { text: String(cluster.count), color: '#fff', fontWeight: 'bold' },
+      icon: {
+        path: google.maps.SymbolPath.CIRCLE,
+        scale: 14 + 3 * Math.log10(cluster.count),
+        fillColor: '#198754',
+        fillOpacity: 0.9,
+        strokeColor: '#fff',
+        strokeWeight: 2
+      }
+    });
+
+    marker.addListener('click', () => {
+      this.map.setCenter(marker.getPosition());
+      this.map.setZoom(this.map.getZoom() + 2);
+    });
+
+    this.clusterMarkers.push(marker);
+  }
+
   /**
    * Get shop icon based on status
    * @param {Object} shop - Shop data
@@ -246,6 +446,8 @@ class MapService {
       marker.setMap(null);
     });
     this.markers = [];
+    this.clusterMarkers.forEach(marker => marker.setMap(null));
+    this.clusterMarkers = [];
   }
 
   /**
@@ -270,10 +472,12 @@ class MapService {
    * @param {number} maxDistance - Maximum distance in km
    */
   async filterByDistance(maxDistance) {
+    // The distance filter shows its own result set until it is cleared
+    this.followViewport = false;
+    const request = ++this.loadRequest;
     try {
       const userLocation = await GeolocationService.getUserLocation();
-      const response = await fetch('/api/shops');
-      const shops = await response.json();
+      const shops = await this.fetchShopPages('/api/shops?fields=id,name,latitude,longitude,address,rating,is_open');
       
       const filteredShops = shops.filter(shop => {
         const distance = GeolocationService.calculateDistance(
@@ -284,6 +488,7 @@ class MapService {
         );
         return distance <= maxDistance;
       });
+      if (request !== this.loadRequest) return;
       
       this.clearMarkers();
       filteredShops.forEach(shop => {
@@ -295,14 +500,34 @@ class MapService {
     }
   }
 
+  /**
+   * Fetch every page of a /api/shops listing by following X-Next-Cursor
+   * @param {string} url - /api/shops URL with filters
+   * @returns {Promise<Array>} All shops
+   */
+  async fetchShopPages(url) {
+    const shops = [];
+    let cursor = null;
+    do {
+      const separator = url.includes('?') ? '&' : '?';
+      const response = await fetch(cursor ? `${url}${separator}cursor=${encodeURIComponent(cursor)}` : url);
+      shops.push(...await response.json());
+      cursor = response.headers.get('X-Next-Cursor');
+    } while (cursor);
+    return shops;
+  }
+
   /**
    * Search shops on map
    * @param {string} query - Search query
    */
   async searchShops(query) {
+    // Search results replace the viewport markers until the search is cleared
+    this.followViewport = false;
+    const request = ++this.loadRequest;
     try {
-      const response = await fetch(`/api/shops?search=${encodeURIComponent(query)}`);
-      const shops = await response.json();
+      const shops = await this.fetchShopPages(`/api/shops?search=${encodeURIComponent(query)}`);
+      if (request !== this.loadRequest) return;
       
       this.clearMarkers();
       shops.forEach(shop => {
@@ -361,6 +586,155 @@ class MapService {
     }
   }
 
+  /**
+   * Read the local catalog copy kept up to date by syncCatalog
+   * @returns {Object} Sync token with shops and products keyed by id
+   */
+  loadCatalogState() {
+    try {
+      const state = JSON.parse(localStorage.getItem(this.catalogStorageKey));
+      if (state && state.token) return state;
+    } catch (error) {
+      console.warn('Discarding unreadable catalog copy:', error);
+    }
+    return { token: null, shops: {}, products: {} };
+  }
+
+  /**
+   * Persist the local catalog copy
+   * @param {Object} state - Catalog state
+   */
+  saveCatalogState(state) {
+    try {
+      localStorage.setItem(this.catalogStorageKey, JSON.stringify(state));
+    } catch (error) {
+      console.warn('Could not store catalog copy:', error);
+    }
+  }
+
+  /**
+   * Fetch the changes since the last sync from /api/sync and merge them into the local copy
+   * @returns {Promise<Object>} The delta that was applied
+   */
+  async syncCatalog() {
+    const state = this.loadCatalogState();
+    const delta = await this.fetchSyncPage(state.token);
+
+    const shops = delta.full ? {} : state.shops;
+    const products = delta.full ? {} : state.products;
+    // A full snapshot comes in pages; keep the copy unsaved until the last one
+    let page = delta;
+    for (;;) {
+      MapService.mergeSyncPage(page, shops, products);
+      if (!page.more) break;
+      page = await this.fetchSyncPage(page.token);
+    }
+
+    this.saveCatalogState({ token: page.token, shops, products });
+    // Markers were loaded fresh on startup, so only changes after the first sync matter
+    if (state.token && !delta.full) {
+      this.applyShopChanges(delta);
+    }
+    return delta;
+  }
+
+  /**
+   * Fetch one page of changes from /api/sync
+   * @param {string|null} token - Token from the previous page or sync
+   * @returns {Promise<Object>} The page
+   */
+  async fetchSyncPage(token) {
+    const query = token ? `?since=${encodeURIComponent(token)}` : '';
+    const response = await fetch(`/api/sync${query}`);
+    if (!response.ok) {
+      throw new Error(`Catalog sync failed with status ${response.status}`);
+    }
+    return response.json();
+  }
+
+  /**
+   * Merge one /api/sync page into the shops and products of a catalog copy
+   * @param {Object} page - Response from /api/sync
+   * @param {Object} shops - Shops keyed by id
+   * @param {Object} products - Products keyed by id
+   */
+  static mergeSyncPage(page, shops, products) {
+    page.shops.forEach(shop => {
+      if (shop.is_active) {
+        shops[shop.id] = shop;
+      } else {
+        delete shops[shop.id];
+      }
+    });
+    page.products.forEach(product => {
+      products[product.id] = product;
+    });
+    page.deleted.shops.forEach(id => delete shops[id]);
+    page.deleted.products.forEach(id => delete products[id]);
+  }
+
+  /**
+   * Update, add or remove markers for the shops in a sync delta
+   * @param {Object} delta - Response from /api/sync
+   */
+  applyShopChanges(delta) {
+    if (!this.map) return;
+
+    // Cluster counts and centroids are computed on the server, so fetch them again
+    if (this.loadedZoom !== null && this.followViewport) {
+      if (delta.shops.length || delta.deleted.shops.length) this.loadShops();
+      return;
+    }
+
+    const removed = new Set(delta.deleted.shops);
+    delta.shops.forEach(shop => {
+      if (!shop.is_active) removed.add(shop.id);
+    });
+    this.markers = this.markers.filter(({ marker, shop }) => {
+      if (!removed.has(shop.id)) return true;
+      marker.setMap(null);
+      return false;
+    });
+
+    const bounds = this.map.getBounds ? this.map.getBounds() : null;
+    delta.shops.filter(shop => shop.is_active).forEach(shop => {
+      const entry = this.markers.find(item => item.shop.id === shop.id);
+      if (entry) {
+        Object.assign(entry.shop, shop);
+        entry.marker.setPosition({ lat: shop.latitude, lng: shop.longitude });
+        entry.marker.setTitle(shop.name);
+        entry.marker.setIcon({
+          url: this.getShopIcon(shop),
+          scaledSize: new google.maps.Size(40, 40)
+        });
+      } else if (!bounds || bounds.contains({ lat: shop.latitude, lng: shop.longitude })) {
+        this.addShopMarker(shop);
+      }
+    });
+  }
+
+  /**
+   * Poll /api/sync and apply deltas, also accepting deltas fetched by the service worker
+   * @param {number} interval - Poll interval in milliseconds
+   */
+  startCatalogSync(interval = 60000) {
+    if (this.syncTimer) return;
+
+    const sync = () => this.syncCatalog().catch(error => {
+      console.warn('Catalog sync failed:', error.message);
+    });
+    sync();
+    this.syncTimer = setInterval(sync, interval);
+
+    if ('serviceWorker' in navigator) {
+      navigator.serviceWorker.addEventListener('message', event => {
+        if (event.data && event.data.type === 'CATALOG_DELTA' && !event.data.delta.full) {
+          this.applyShopChanges(event.data.delta);
+        }
+      });
+    }
+  }
+
   /**
    * Initialize map controls
    */
@@ -5,6 +5,7 @@
 
 const CACHE_NAME = 'local-basket-v1';
 const OFFLINE_URL = '/offline';
+const SYNC_STATE_URL = '/sync-state';
 
 // Files to cache immediately
 const PRECACHE_FILES = [
@@ -15,6 +16,7 @@ const PRECACHE_FILES = [
   '/static/js/geolocation.js',
   '/static/js/map.js',
   '/static/js/forms.js',
+  '/static/js/infinite-scroll.js',
   '/static/manifest.json',
   '/offline'
 ];
@@ -360,23 +362,63 @@ self.addEventListener('periodicsync', event => {
   }
 });
 
+/**
+ * Fetch one page of changes from /api/sync, or null if the request failed
+ */
+async function fetchSyncPage(token) {
+  const query = token ? `?since=${encodeURIComponent(token)}` : '';
+  const response = await fetch(`/api/sync${query}`);
+  return response.ok ? response.json() : null;
+}
+
 /**
  * Sync shop updates
+ * Keeps a catalog copy in the cache current with /api/sync deltas and
+ * forwards each delta to open pages
  */
 async function syncShopUpdates() {
   console.log('[SW] Syncing shop updates');
   
   try {
-    const response = await fetch('/api/shops/updates');
-    if (response.ok) {
-      const updates = await response.json();
-      
-      // Cache updated shop data
-      const cache = await caches.open(CACHE_NAME);
-      updates.forEach(update => {
-        cache.put(`/shop/${update.id}`, new Response(JSON.stringify(update)));
+    const cache = await caches.open(CACHE_NAME);
+    const stored = await cache.match(SYNC_STATE_URL);
+    const state = stored ? await stored.json() : { token: null, shops: {}, products: {} };
+    
+    const delta = await fetchSyncPage(state.token);
+    if (!delta) {
+      return;
+    }
+    
+    const shops = delta.full ? {} : state.shops;
+    const products = delta.full ? {} : state.products;
+    // A full snapshot comes in pages; only store the copy once all have arrived
+    let page = delta;
+    for (;;) {
+      page.shops.forEach(shop => {
+        if (shop.is_active) {
+          shops[shop.id] = shop;
+        } else {
+          delete shops[shop.id];
+        }
+      });
+      page.products.forEach(product => {
+        products[product.id] = product;
       });
+      page.deleted.shops.forEach(id => delete shops[id]);
+      page.deleted.products.forEach(id => delete products[id]);
+      if (!page.more) break;
+      page = await fetchSyncPage(page.token);
+      if (!page) {
+        return;
+      }
     }
+    
+    await cache.put(SYNC_STATE_URL, new Response(JSON.stringify({ token: page.token, shops, products }), {
+      headers: { 'Content-Type': 'application/json' }
+    }));
+    
+    const clients = await self.clients.matchAll({ type: 'window' });
+    clients.forEach(client => client.postMessage({ type: 'CATALOG_DELTA', delta }));
   } catch (error) {
     console.error('[SW] Shop updates sync failed:', error);
   }
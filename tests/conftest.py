@@ -0,0 +1,68 @@
+import pytest
+from app import create_app
+from models import db
+
+
+@pytest.fixture
+def app():
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_user(app):
+    from models import User
+
+    def make_user(username, is_seller=False, password='password123'):
+        user = User(username=username, email=f'{username}@example.com', full_name=username.title(),
+                    is_seller=is_seller)
+        user.set_password(password)
+        db.session.add(user)
+        db.session.commit()
+        return user
+
+    return make_user
+
+
+@pytest.fixture
+def login(client):
+    def login(user, password='password123'):
+        return client.post('/login', data={'email': user.email, 'password': password})
+
+    return login
+
+
+@pytest.fixture
+def max_queries(app):
+    """Context manager failing the test if the block runs more than limit SQL statements.
+
+    Yields the list of statements so a test can inspect them.
+    """
+    from contextlib import contextmanager
+    from sqlalchemy import event
+
+    @contextmanager
+    def max_queries(limit):
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+        assert len(statements) <= limit, \
+            f'{len(statements)} queries, expected at most {limit}:\n' + '\n'.join(statements)
+
+    return max_queries
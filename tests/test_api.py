@@ -0,0 +1,154 @@
+import json
+
+from models import db, User, Shop
+from services.marker_codec import decode_markers, MIMETYPE as MARKERS_MIMETYPE
+
+
+def add_shops(coordinates):
+    user = User(username='seller', email='seller@example.com', password_hash='x', full_name='Seller')
+    db.session.add(user)
+    db.session.flush()
+    shops = [Shop(name=f'Shop {i}', address=f'{i} Main St', latitude=lat, longitude=lon, user_id=user.id)
+             for i, (lat, lon) in enumerate(coordinates)]
+    db.session.add_all(shops)
+    db.session.commit()
+    return shops
+
+
+def test_nearby_pages_through_shops_in_distance_order(app, client):
+    add_shops([(40.0 + i * 0.01, -75.0) for i in range(25)])
+
+    seen = []
+    distances = []
+    cursor = None
+    while True:
+        url = '/api/shops/nearby?lat=40.0&lng=-75.0&k=10' + (f'&cursor={cursor}' if cursor else '')
+        body = client.get(url).get_json()
+        seen.extend(shop['name'] for shop in body['shops'])
+        distances.extend(shop['distance'] for shop in body['shops'])
+        cursor = body['next_cursor']
+        if not cursor:
+            break
+
+    assert seen == [f'Shop {i}' for i in range(25)]
+    assert distances == sorted(distances)
+
+
+def test_nearby_breaks_distance_ties_by_id(app, client):
+    add_shops([(40.0, -75.0)] * 5)
+
+    first = client.get('/api/shops/nearby?lat=40&lng=-75&k=3').get_json()
+    second = client.get(f"/api/shops/nearby?lat=40&lng=-75&k=3&cursor={first['next_cursor']}").get_json()
+
+    assert [shop['id'] for shop in first['shops'] + second['shops']] == [1, 2, 3, 4, 5]
+
+
+def test_nearby_rejects_bad_parameters(app, client):
+    assert client.get('/api/shops/nearby?lat=100&lng=0').status_code == 400
+    assert client.get('/api/shops/nearby?lat=1&lng=0&cursor=!!').status_code == 400
+
+
+def test_clusters_merge_at_low_zoom_and_split_at_high_zoom(app, client):
+    from models import Product
+
+    shops = add_shops([(40.0, -75.0), (40.001, -75.001), (45.0, -100.0)])
+    db.session.add_all([
+        Product(name='Eggs', price=3, unit='dozen', category='eggs', shop_id=shops[0].id),
+        Product(name='More eggs', price=3, unit='dozen', category='eggs', shop_id=shops[1].id),
+    ])
+    db.session.commit()
+
+    world = client.get('/api/shops/clusters?bbox=-180,-85,180,85&zoom=3').get_json()['clusters']
+    assert sorted(cluster['count'] for cluster in world) == [1, 2]
+    pair = next(cluster for cluster in world if cluster['count'] == 2)
+    assert pair['category'] == 'eggs'
+    assert pair['icon'] == 'fas fa-egg'
+
+    street = client.get('/api/shops/clusters?bbox=-75.01,39.99,-74.99,40.01&zoom=18').get_json()['clusters']
+    assert sorted(cluster['shop_id'] for cluster in street) == [shops[0].id, shops[1].id]
+
+    assert client.get('/api/shops/clusters?bbox=1,2,3&zoom=3').status_code == 400
+
+
+def test_clusters_pick_up_writes_made_outside_the_shop_routes(app, client):
+    shops = add_shops([(40.0, -75.0)])
+    url = '/api/shops/clusters?bbox=-180,-85,180,85&zoom=3'
+    assert [cluster['count'] for cluster in client.get(url).get_json()['clusters']] == [1]
+
+    db.session.add(Shop(name='Next door', address='2 Main St', latitude=40.001, longitude=-75.001,
+                        user_id=shops[0].user_id))
+    db.session.commit()
+    assert [cluster['count'] for cluster in client.get(url).get_json()['clusters']] == [2]
+
+
+def test_shops_default_fields_are_unchanged(app, client):
+    add_shops([(40.0, -75.0)])
+
+    shop, = client.get('/api/shops').get_json()
+    assert set(shop) == {'id', 'name', 'latitude', 'longitude', 'address', 'rating', 'is_open'}
+    assert shop['rating'] == 0
+
+
+def test_shops_filters_projection_and_pagination(app, client):
+    from models import Product
+
+    shops = add_shops([(40.0 + i * 0.1, -75.0) for i in range(6)])
+    shops[1].is_open = True
+    shops[2].name = 'Honey Hollow'
+    db.session.add(Product(name='Jam', price=4, unit='jar', category='preserves', shop_id=shops[3].id))
+    db.session.commit()
+
+    assert [shop['id'] for shop in client.get('/api/shops?bbox=-76,40.05,-74,40.25').get_json()] == [2, 3]
+    assert [shop['id'] for shop in client.get('/api/shops?open_only=1').get_json()] == [2]
+    assert [shop['id'] for shop in client.get('/api/shops?category=preserves').get_json()] == [4]
+    assert [shop['id'] for shop in client.get('/api/shops?search=honey').get_json()] == [3]
+    assert client.get('/api/shops?fields=name').get_json()[0] == {'id': 1, 'name': 'Shop 0'}
+    assert client.get('/api/shops?fields=password_hash').status_code == 400
+
+    first = client.get('/api/shops?limit=4&fields=id')
+    assert [shop['id'] for shop in first.get_json()] == [1, 2, 3, 4]
+    second = client.get(f"/api/shops?limit=4&fields=id&cursor={first.headers['X-Next-Cursor']}")
+    assert [shop['id'] for shop in second.get_json()] == [5, 6]
+    assert 'X-Next-Cursor' not in second.headers
+
+
+def test_shops_stream_ndjson_rows(app, client):
+    add_shops([(40.0 + i * 0.01, -75.0) for i in range(7)])
+    as_json = client.get('/api/shops?fields=id,name')
+
+    for url, headers in (('/api/shops?fields=id,name&stream=1', {}),
+                         ('/api/shops?fields=id,name', {'Accept': 'application/x-ndjson'})):
+        response = client.get(url, headers=headers)
+        assert response.mimetype == 'application/x-ndjson'
+        assert response.is_streamed
+        lines = response.get_data(as_text=True).splitlines()
+        assert [json.loads(line) for line in lines] == as_json.get_json()
+
+    etags = set()
+    for accept in ('application/json', 'application/x-ndjson'):
+        response = client.get('/api/shops', headers={'Accept': accept})
+        etags.add(response.headers['ETag'])
+        response.close()
+    assert len(etags) == 2
+
+
+def test_marker_feed_round_trips_and_is_smaller_than_json(app, client):
+    shops = add_shops([(40.0 + i * 0.001, -75.0 - i * 0.001) for i in range(200)])
+    for shop in shops[::3]:
+        shop.is_open = True
+    shops[5].rating_sum, shops[5].review_count = 9, 2
+    db.session.commit()
+
+    response = client.get('/api/shops/markers?bbox=-76,39,-74,41')
+    assert response.mimetype == MARKERS_MIMETYPE
+    markers = decode_markers(response.data)
+
+    expected = client.get('/api/shops?bbox=-76,39,-74,41').get_json()
+    assert [marker['id'] for marker in markers] == [shop['id'] for shop in expected]
+    assert [marker['is_open'] for marker in markers] == [shop['is_open'] for shop in expected]
+    assert markers[5]['rating'] == 4.5
+    assert abs(markers[199]['latitude'] - expected[199]['latitude']) < 1e-5
+    assert len(response.data) * 5 < len(client.get('/api/shops?fields=id,latitude,longitude,rating,is_open').data)
+
+    assert decode_markers(client.get('/api/shops/markers?ids=1,2&open_only=1').data)[0]['id'] == 1
+    assert client.get('/api/shops/markers?bbox=nope').status_code == 400
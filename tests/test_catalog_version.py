@@ -0,0 +1,93 @@
+import time
+from datetime import datetime, timedelta
+
+from models import db, CatalogState, Product, Shop
+from services.catalog_version import catalog_version
+from tests.test_routes import make_shop
+
+
+def test_catalog_writes_bump_the_version(app, make_user):
+    shop = make_shop(make_user('seller', is_seller=True))
+    after_insert, modified = catalog_version.get()
+    assert after_insert >= 1 and modified is not None
+
+    db.session.add(Product(name='Eggs', price=4.0, unit='dozen', category='eggs', shop_id=shop.id))
+    db.session.commit()
+    after_product, _ = catalog_version.get()
+    assert after_product > after_insert
+
+    Shop.add_rating(shop.id, 4)
+    db.session.commit()
+    assert catalog_version.get()[0] > after_product
+
+
+def test_rolled_back_and_unrelated_writes_keep_the_version(app, make_user):
+    shop = make_shop(make_user('seller', is_seller=True))
+    version, _ = catalog_version.get()
+
+    shop.name = 'Renamed'
+    db.session.flush()
+    db.session.rollback()
+    make_user('buyer')
+
+    assert catalog_version.get()[0] == version
+
+
+def test_api_shops_answers_matching_etag_with_304(app, client, make_user):
+    shop = make_shop(make_user('seller', is_seller=True))
+
+    first = client.get('/api/shops')
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    assert not etag.startswith('W/')
+
+    cached = client.get('/api/shops', headers={'If-None-Match': etag})
+    assert cached.status_code == 304
+    assert cached.data == b''
+    assert cached.headers['ETag'] == etag
+
+    shop.is_open = True
+    db.session.commit()
+    refreshed = client.get('/api/shops', headers={'If-None-Match': etag})
+    assert refreshed.status_code == 200
+    assert refreshed.headers['ETag'] != etag
+    assert refreshed.get_json()[0]['is_open'] is True
+
+
+def test_last_modified_is_withheld_until_the_writes_second_is_over(app, client, make_user):
+    seller = make_user('seller', is_seller=True)
+    # Keep the write and the first request inside one second
+    if datetime.utcnow().microsecond > 800000:
+        time.sleep(0.25)
+    shop = make_shop(seller)
+    now = datetime.utcnow().replace(microsecond=0)
+
+    # A later write in the same second would share this date, so no 304 on it
+    fresh = client.get('/api/shops', headers={'If-Modified-Since': now.strftime('%a, %d %b %Y %H:%M:%S GMT')})
+    assert fresh.status_code == 200
+    assert 'Last-Modified' not in fresh.headers
+
+    state = db.session.get(CatalogState, catalog_version.STATE_ID)
+    state.updated_at = now - timedelta(seconds=10, microseconds=-500)
+    db.session.commit()
+    settled = client.get('/api/shops')
+    assert settled.headers['Last-Modified'] == (now - timedelta(seconds=10)).strftime('%a, %d %b %Y %H:%M:%S GMT')
+    assert client.get('/api/shops', headers={'If-Modified-Since': settled.headers['Last-Modified']}).status_code == 304
+
+    shop.name = 'Renamed'
+    db.session.commit()
+    assert client.get('/api/shops', headers={'If-Modified-Since': settled.headers['Last-Modified']}).status_code == 200
+
+
+def test_shop_page_etag_depends_on_the_user(app, client, make_user, login):
+    shop = make_shop(make_user('seller', is_seller=True))
+
+    anonymous = client.get(f'/shop/{shop.id}')
+    assert anonymous.status_code == 200
+    assert 'private' in anonymous.headers['Cache-Control']
+    assert client.get(f'/shop/{shop.id}',
+                      headers={'If-None-Match': anonymous.headers['ETag']}).status_code == 304
+
+    login(make_user('buyer'))
+    response = client.get(f'/shop/{shop.id}', headers={'If-None-Match': anonymous.headers['ETag']})
+    assert response.status_code == 200
@@ -0,0 +1,58 @@
+import pytest
+from flask import Flask
+
+from app import create_app
+from config import Config, TestingConfig
+from models import db
+from services.db_tuning import DatabaseTuning, db_tuning
+
+
+def test_file_databases_get_wal_and_pragmas(tmp_path, monkeypatch):
+    monkeypatch.setattr(TestingConfig, 'SQLALCHEMY_DATABASE_URI', f"sqlite:///{tmp_path / 'tuned.db'}")
+    app = create_app('testing')
+    with app.app_context():
+        settings = DatabaseTuning.current(db.session.connection())
+        db.session.remove()
+        db.engine.dispose()
+
+    assert settings == {'journal_mode': 'wal', 'synchronous': 1, 'cache_size': -64000,
+                        'mmap_size': 256 * 1024 * 1024, 'busy_timeout': 5000}
+
+
+def test_memory_databases_skip_file_settings(app):
+    settings = DatabaseTuning.current(db.session.connection())
+    assert settings['journal_mode'] == 'memory'
+    assert (settings['cache_size'], settings['busy_timeout']) == (-64000, 5000)
+
+
+def test_pool_options_only_for_server_databases():
+    server = Flask(__name__)
+    server.config.from_object(Config)
+    server.config['SQLALCHEMY_DATABASE_URI'] = 'postgresql://basket@db/basket'
+    server.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'pool_size': 2}
+    server.config['SQLALCHEMY_BINDS'] = {'replica_0': 'postgresql://basket@replica/basket',
+                                         'replica_1': 'sqlite:///replica.db'}
+    Config.init_app(server)
+    assert server.config['SQLALCHEMY_ENGINE_OPTIONS'] == {
+        'pool_size': 2, 'max_overflow': 10, 'pool_timeout': 30, 'pool_recycle': 1800, 'pool_pre_ping': True}
+    assert server.config['SQLALCHEMY_BINDS'] == {
+        'replica_0': {'url': 'postgresql://basket@replica/basket', 'pool_size': 5, 'max_overflow': 10,
+                      'pool_timeout': 30, 'pool_recycle': 1800, 'pool_pre_ping': True},
+        'replica_1': 'sqlite:///replica.db'}
+
+    local = Flask(__name__)
+    local.config.from_object(Config)
+    local.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///basket.db'
+    Config.init_app(local)
+    assert 'SQLALCHEMY_ENGINE_OPTIONS' not in local.config
+
+
+def test_pragma_values_are_validated():
+    with pytest.raises(ValueError):
+        DatabaseTuning.pragmas({'SQLITE_JOURNAL_MODE': 'WAL; DROP TABLE shops'})
+
+
+def test_benchmark_runs_readers_alongside_writers(tmp_path):
+    result = db_tuning.benchmark(str(tmp_path / 'bench.db'), DatabaseTuning.pragmas(Config.__dict__),
+                                 readers=2, writers=1, seconds=0.2)
+    assert result.reads > 0 and result.writes > 0 and result.busy == 0
@@ -0,0 +1,90 @@
+import re
+
+from models import db, Product, Shop
+from services.facet_index import bitmap_ids, facet_index, to_bitmap
+from tests.test_routes import make_shop
+
+
+def add_products(shop, *categories):
+    db.session.add_all([Product(name=f'{category} {index}', price=2.0, unit='each', category=category,
+                                shop_id=shop.id) for index, category in enumerate(categories)])
+    db.session.commit()
+
+
+def rate(shop, *ratings):
+    shop.rating_sum = sum(ratings)
+    shop.review_count = len(ratings)
+    db.session.commit()
+
+
+def test_bitmaps_round_trip():
+    ids = [0, 1, 7, 8, 63, 64, 1000]
+    assert list(bitmap_ids(to_bitmap(ids))) == ids
+    assert to_bitmap([]) == 0 and list(bitmap_ids(0)) == []
+
+
+def test_facet_counts_exclude_their_own_selection(app, make_user):
+    farm = make_shop(make_user('farm', is_seller=True), name='Farm', is_open=True)
+    dairy = make_shop(make_user('dairy', is_seller=True), name='Dairy')
+    orchard = make_shop(make_user('orchard', is_seller=True), name='Orchard', is_open=True)
+    make_shop(make_user('gone', is_seller=True), name='Gone', is_active=False)
+    add_products(farm, 'eggs', 'eggs', 'vegetables')
+    add_products(dairy, 'dairy', 'eggs')
+    add_products(orchard, 'fruits')
+    rate(farm, 5, 4)
+    rate(dairy, 3)
+
+    all_ids = [shop.id for shop in Shop.query]
+    facets = facet_index.facets(all_ids)
+    assert facets['shop_ids'] == {farm.id, dairy.id, orchard.id}
+    assert facets['categories'] == {'eggs': 2, 'vegetables': 1, 'dairy': 1, 'fruits': 1}
+    assert facets['ratings'] == {4: 1, 3: 2, 2: 2, 1: 2}
+    assert facets['availability'] == {'open': 2, 'closed': 1}
+
+    facets = facet_index.facets(all_ids, category='eggs', open_only=True)
+    assert facets['shop_ids'] == {farm.id} and facets['total'] == 1
+    assert facets['categories'] == {'eggs': 1, 'vegetables': 1, 'fruits': 1}
+    assert facets['availability'] == {'open': 1, 'closed': 1}
+
+    assert facet_index.facets([dairy.id, orchard.id], min_rating=4)['shop_ids'] == set()
+    assert facet_index.shop_categories(farm.id) == {'eggs', 'vegetables'}
+
+
+def test_writes_outside_this_process_rebuild_the_index(app, make_user):
+    shop = make_shop(make_user('farm', is_seller=True))
+    add_products(shop, 'eggs')
+    assert facet_index.facets([shop.id])['categories'] == {'eggs': 1}
+
+    # Nothing tells the index about these writes; the catalog version does
+    Product.query.filter_by(shop_id=shop.id).update({'category': 'honey'})
+    shop.is_open = True
+    db.session.commit()
+    facets = facet_index.facets([shop.id])
+    assert facets['categories'] == {'honey': 1}
+    assert facets['availability'] == {'open': 1, 'closed': 0}
+
+    shop.is_active = False
+    db.session.commit()
+    assert facet_index.facets([shop.id])['total'] == 0
+
+
+def test_shops_added_by_another_worker_are_searchable(app, client, make_user):
+    add_products(make_shop(make_user('farm', is_seller=True), name='Egg Farm'), 'eggs')
+    assert 'Egg Farm' in client.get('/search?category=eggs').get_data(as_text=True)
+
+    add_products(make_shop(make_user('late', is_seller=True), name='Late Farm'), 'eggs')
+    page = client.get('/search?category=eggs&sort=rating').get_data(as_text=True)
+    assert 'Egg Farm' in page and 'Late Farm' in page
+
+
+def test_search_page_has_no_duplicates_and_shows_counts(app, client, make_user):
+    farm = make_shop(make_user('farm', is_seller=True), name='Egg Farm')
+    add_products(farm, 'eggs', 'eggs', 'eggs')
+    other = make_shop(make_user('other', is_seller=True), name='Veg Stand')
+    add_products(other, 'vegetables')
+
+    page = client.get('/search?category=eggs').get_data(as_text=True)
+    assert page.count('Egg Farm') == 1
+    assert 'Veg Stand' not in page
+    assert re.search(r'Vegetables\s*<span class="badge bg-secondary rounded-pill">1</span>', page)
+    assert re.search(r'Eggs\s*<span class="badge bg-secondary rounded-pill">1</span>', page)
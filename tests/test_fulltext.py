@@ -0,0 +1,94 @@
+import pytest
+from sqlalchemy import text
+
+from models import db, Product
+from services.fulltext import FTS_TABLE, SQLiteFTS5Backend, fulltext_search
+from tests.test_routes import make_shop
+
+
+@pytest.fixture(params=['fts5', 'like'])
+def backend(request, app):
+    fulltext_search.backend_name = request.param
+    yield request.param
+    fulltext_search.backend_name = None
+
+
+@pytest.fixture
+def catalog(app, make_user):
+    orchard = make_shop(make_user('orchard', is_seller=True), name='Hillside Orchard',
+                        description='Family farm with apples and pears.')
+    dairy = make_shop(make_user('dairy', is_seller=True), name='Meadow Dairy',
+                      description='Raw milk, butter and <b>fresh</b> cheese.')
+    bakery = make_shop(make_user('bakery', is_seller=True), name='Corner Bakery')
+    db.session.add_all([
+        Product(name='Sourdough Loaf', description='Baked with orchard apples', price=6, unit='each',
+                category='bread', shop_id=bakery.id),
+        Product(name='Honeycrisp Apples', price=3, unit='lb', category='fruits', shop_id=orchard.id),
+        Product(name='Basil', price=2, unit='bunch', category='leafy_greens', shop_id=dairy.id),
+    ])
+    db.session.commit()
+    return orchard, dairy, bakery
+
+
+def test_matches_descriptions_products_and_categories(backend, catalog):
+    orchard, dairy, bakery = catalog
+    assert {hit.shop_id for hit in fulltext_search.search('apples')} == {orchard.id, bakery.id}
+    assert [hit.shop_id for hit in fulltext_search.search('butter')] == [dairy.id]
+    assert [hit.shop_id for hit in fulltext_search.search('leafy')] == [dairy.id]
+    assert [hit.shop_id for hit in fulltext_search.search('sourdough loaf')] == [bakery.id]
+    assert fulltext_search.search('sourdough butter') == []
+
+
+def test_name_matches_outrank_description_matches(backend, catalog):
+    orchard, _, bakery = catalog
+    assert [hit.shop_id for hit in fulltext_search.search('orchard')] == [orchard.id, bakery.id]
+
+
+def test_snippets_are_escaped_and_highlighted(backend, catalog):
+    _, dairy, _ = catalog
+    snippet = fulltext_search.search('cheese')[0].snippet
+    assert '<mark>cheese</mark>' in snippet.lower()
+    assert '&lt;b&gt;fresh&lt;/b&gt;' in snippet
+
+
+def test_index_follows_writes(backend, catalog):
+    orchard, dairy, bakery = catalog
+    assert fulltext_search.search('bagels') == []
+
+    bakery.description = 'Bagels every morning'
+    apples = Product.query.filter_by(name='Honeycrisp Apples').one()
+    db.session.delete(apples)
+    db.session.commit()
+
+    assert [hit.shop_id for hit in fulltext_search.search('bagel')] == [bakery.id]
+    assert [hit.shop_id for hit in fulltext_search.search('honeycrisp')] == []
+
+
+def test_query_syntax_is_never_interpreted(app, catalog):
+    for query in ('"', 'apples OR', 'NEAR(apples', 'col:apples', '*', 'apples AND NOT'):
+        fulltext_search.search(query)
+    assert SQLiteFTS5Backend.match_expression(['say "hi"', 'or']) == '"say ""hi""" "or"*'
+
+
+def test_search_page_ranks_and_shows_snippets(app, client, catalog):
+    orchard, _, bakery = catalog
+    page = client.get('/search?query=orchard').get_data(as_text=True)
+    assert page.index('Hillside Orchard') < page.index('Corner Bakery')
+    assert 'Baked with <mark>orchard</mark> apples' in page
+    assert 'Meadow Dairy' not in page
+
+
+
+def test_search_never_creates_the_index(app, catalog):
+    orchard, _, bakery = catalog
+    db.session.execute(text(f'DROP TABLE {FTS_TABLE}'))
+    db.session.commit()
+    fulltext_search._backends.clear()
+
+    # A database without the index, such as a read replica, is searched with LIKE
+    assert {hit.shop_id for hit in fulltext_search.search('apples')} == {orchard.id, bakery.id}
+    assert not SQLiteFTS5Backend().exists(db.session.connection())
+
+    fulltext_search.rebuild()
+    assert [hit.shop_id for hit in fulltext_search.search('sourdough')] == [bakery.id]
+    assert SQLiteFTS5Backend().exists(db.session.connection())
@@ -0,0 +1,52 @@
+import pytest
+import requests
+
+from services.gazetteer import gazetteer
+from services.geocoder_client import geocoder_client
+from services.location_service import LocationService
+
+ROWS = [
+    {'city': 'Springfield', 'state': 'IL', 'zip': '62701', 'lat': '39.80', 'lon': '-89.64'},
+    {'city': 'Springfield', 'state': 'MO', 'zip': '65801', 'lat': '37.21', 'lon': '-93.29'},
+    {'city': 'Shelbyville', 'state': 'IL', 'zip': '62565', 'lat': '39.41', 'lon': '-88.79'},
+]
+
+
+def test_lookup_towns_and_zip_codes(app):
+    assert gazetteer.load_rows(ROWS) == 3
+
+    assert gazetteer.lookup('Springfield, IL') == (39.80, -89.64)
+    assert gazetteer.lookup('springfield mo 65801') == (37.21, -93.29)
+    assert gazetteer.lookup('62565, USA') == (39.41, -88.79)
+    # Ambiguous names and street addresses are left to the network geocoder
+    assert gazetteer.lookup('Springfield') is None
+    assert gazetteer.lookup('1 Main St, Shelbyville, IL') is None
+    assert gazetteer.lookup('1 Main St, Shelbyville, IL', exact=False) == (39.41, -88.79)
+
+
+def test_towns_with_several_zip_codes_resolve_to_their_centroid(app):
+    gazetteer.load_rows(ROWS + [
+        {'city': 'Springfield', 'state': 'IL', 'zip': '62702', 'lat': '39.82', 'lon': '-89.64'},
+        {'city': 'Springfield', 'state': 'IL', 'zip': '62703', 'lat': '39.78', 'lon': '-89.64'},
+        {'city': 'Franklin', 'state': 'IL', 'zip': '62638', 'lat': '39.62', 'lon': '-90.04'},
+        {'city': 'Franklin', 'state': 'IL', 'zip': '60131', 'lat': '41.93', 'lon': '-87.87'},
+    ])
+
+    assert gazetteer.lookup('Springfield, IL') == pytest.approx((39.80, -89.64))
+    # The ZIP code is the smaller area, so it wins over the town
+    assert gazetteer.lookup('Springfield, IL 62702') == (39.82, -89.64)
+    # Two towns of the same name far apart in one state stay ambiguous
+    assert gazetteer.lookup('Franklin, IL') is None
+    assert gazetteer.lookup('Franklin, IL 62638') == (39.62, -90.04)
+
+
+def test_geocode_address_prefers_gazetteer_and_works_offline(app, monkeypatch):
+    gazetteer.load_rows(ROWS)
+
+    def offline(address):
+        raise requests.exceptions.ConnectionError('no network')
+
+    monkeypatch.setattr(geocoder_client, 'search', offline)
+
+    assert LocationService.geocode_address('Shelbyville, IL') == (39.41, -88.79)
+    assert LocationService.geocode_address('12 Oak Rd, Springfield, IL 62701') == (39.80, -89.64)
@@ -0,0 +1,92 @@
+from app import create_app
+from config import TestingConfig
+from models import db, Location, User
+from services.geocode_cache import GeocodeCache, TTLCache, geocode_cache
+from services.geocoder_client import geocoder_client
+from services.location_service import LocationService
+
+
+def test_ttl_cache_evicts_lru_and_expired_entries():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert cache.get('b') == (False, None)
+    assert cache.get('a') == (True, 1)
+
+    cache.set('d', 4, ttl=-1)
+    assert cache.get('d') == (False, None)
+
+
+def test_normalize_address():
+    assert (GeocodeCache.normalize_address('  123 Main St.,  Springfield ,IL ')
+            == GeocodeCache.normalize_address('123 main st, springfield, il'))
+
+
+def test_geocode_address_is_cached_in_memory_and_database(app, monkeypatch):
+    calls = []
+
+    def fake_search(address):
+        calls.append(address)
+        return [{'lat': '40.1', 'lon': '-75.2', 'display_name': '1 Main St',
+                 'address': {'town': 'Springfield', 'state': 'PA', 'postcode': '19064'}}]
+
+    monkeypatch.setattr(geocoder_client, 'search', fake_search)
+
+    assert LocationService.geocode_address('1 Main St, Springfield') == (40.1, -75.2)
+    assert LocationService.geocode_address('1 main st,  springfield') == (40.1, -75.2)
+    assert len(calls) == 1
+
+    # A fresh process only has the database tier
+    geocode_cache.clear()
+    assert LocationService.geocode_address('1 Main St, Springfield') == (40.1, -75.2)
+    assert len(calls) == 1
+
+
+def test_geocode_misses_are_cached(app, monkeypatch):
+    calls = []
+
+    def fake_search(address):
+        calls.append(address)
+        return []
+
+    monkeypatch.setattr(geocoder_client, 'search', fake_search)
+
+    assert LocationService.geocode_address('nowhere at all') is None
+    geocode_cache.clear()
+    assert LocationService.geocode_address('Nowhere at all') is None
+    assert len(calls) == 1
+
+
+def test_reverse_geocode_uses_rounded_coordinates(app, monkeypatch):
+    calls = []
+
+    def fake_reverse(lat, lon):
+        calls.append((lat, lon))
+        return {'display_name': '1 Main St, Springfield'}
+
+    monkeypatch.setattr(geocoder_client, 'reverse', fake_reverse)
+
+    assert LocationService.reverse_geocode(40.100001, -75.200001) == '1 Main St, Springfield'
+    assert LocationService.reverse_geocode(40.100002, -75.200002) == '1 Main St, Springfield'
+    assert len(calls) == 1
+
+
+def test_cache_writes_leave_the_callers_transaction_alone(tmp_path, monkeypatch):
+    monkeypatch.setattr(TestingConfig, 'SQLALCHEMY_DATABASE_URI', f"sqlite:///{tmp_path / 'geocode.db'}")
+    monkeypatch.setattr(geocoder_client, 'search', lambda address: [{'lat': '40.1', 'lon': '-75.2'}])
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(username='pending', email='pending@example.com', full_name='Pending',
+                            password_hash='unused'))
+
+        assert LocationService.geocode_address('1 Main St, Springfield') == (40.1, -75.2)
+        db.session.rollback()
+
+        assert User.query.count() == 0
+        assert Location.query.filter(Location.lookup_key.isnot(None)).count() == 1
+        db.session.remove()
+        db.engine.dispose()
@@ -0,0 +1,143 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from services.geocoder_client import (
+    CircuitBreaker, GeocoderClient, GeocoderUnavailable, SingleFlight, TokenBucket
+)
+
+
+class StubNominatim:
+    """Local stand-in for Nominatim that records every request it serves."""
+
+    def __init__(self, delay=0.0, status=200):
+        self.delay = delay
+        self.status = status
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                stub.requests.append(self.path)
+                time.sleep(stub.delay)
+                body = json.dumps([{'lat': '40.0', 'lon': '-75.0'}]).encode()
+                self.send_response(stub.status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    server = StubNominatim()
+    yield server
+    server.close()
+
+
+def make_client(stub, **config):
+    client = GeocoderClient()
+    client.base_url = stub.url
+    client._configure(rate=config.get('rate', 1000), pool_size=4, user_agent='test',
+                      failure_threshold=config.get('failure_threshold', 2),
+                      reset_timeout=config.get('reset_timeout', 60),
+                      slow_call_threshold=config.get('slow_call_threshold', 5))
+    return client
+
+
+def test_search_reuses_pooled_session(stub):
+    client = make_client(stub)
+
+    assert client.search('1 Main St') == [{'lat': '40.0', 'lon': '-75.0'}]
+    assert client.search('2 Main St') == [{'lat': '40.0', 'lon': '-75.0'}]
+    assert len(stub.requests) == 2
+    assert stub.requests[0].startswith('/search?')
+
+
+def test_concurrent_identical_requests_are_coalesced(stub):
+    stub.delay = 0.2
+    client = make_client(stub)
+    results = []
+
+    threads = [threading.Thread(target=lambda: results.append(client.search('same address')))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == 5
+    assert len(stub.requests) == 1
+
+
+def test_circuit_opens_after_failures_and_fails_fast(stub):
+    stub.status = 503
+    client = make_client(stub)
+
+    for _ in range(2):
+        with pytest.raises(Exception):
+            client.search('broken')
+
+    with pytest.raises(GeocoderUnavailable):
+        client.search('broken')
+    assert len(stub.requests) == 2
+
+
+def test_slow_calls_open_the_circuit(stub):
+    stub.delay = 0.05
+    client = make_client(stub, failure_threshold=1, slow_call_threshold=0.01)
+
+    client.search('slow')
+    with pytest.raises(GeocoderUnavailable):
+        client.search('slow again')
+
+
+def test_circuit_half_opens_after_reset_timeout():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record(False)
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert not breaker.allow()  # only one trial call at a time
+    breaker.record(True)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_token_bucket_spaces_out_calls_and_rejects_long_waits():
+    bucket = TokenBucket(rate=20)
+    started = time.monotonic()
+    for _ in range(3):
+        assert bucket.acquire()
+    assert time.monotonic() - started >= 0.09
+
+    slow_bucket = TokenBucket(rate=0.1)
+    assert slow_bucket.acquire(timeout=0)
+    assert not slow_bucket.acquire(timeout=0.5)
+
+
+def test_single_flight_propagates_errors():
+    flight = SingleFlight()
+
+    def fail():
+        raise ValueError('boom')
+
+    with pytest.raises(ValueError):
+        flight.do('key', fail)
+    assert flight.do('key', lambda: 42) == 42
@@ -0,0 +1,52 @@
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Product, Review, Shop
+from services.index_advisor import CatalogueQuery, index_advisor
+from tests.test_routes import make_shop
+
+
+def test_catalogue_queries_use_indexes(app):
+    assert index_advisor.check() == []
+
+
+def test_unindexed_filters_are_flagged(app):
+    catalogue = [
+        CatalogueQuery('products by category', lambda: db.select(Product).where(Product.category == 'eggs')),
+        CatalogueQuery('export', lambda: db.select(Product), allowed_scans=('products',)),
+    ]
+    finding, = index_advisor.check(catalogue)
+    assert (finding.query, finding.problem) == ('products by category', 'full scan of products')
+    assert finding.plan == ['SCAN products']
+
+
+def test_sorts_and_unexpected_indexes_are_flagged(app):
+    catalogue = [
+        CatalogueQuery('reviews by rating', lambda: (
+            db.select(Review).where(Review.shop_id == 1).order_by(Review.rating)),
+            expected_indexes=('ix_reviews_shop_id_created_at',)),
+        CatalogueQuery('shops near a point', lambda: (
+            db.select(Shop.id).where(Shop.is_active.is_(True), Shop.latitude.between(39.9, 40.1))),
+            expected_indexes=('ix_shops_is_active',)),
+    ]
+    sort, wrong_index = index_advisor.check(catalogue)
+    assert sort.problem == 'use temp b-tree for order by'
+    assert wrong_index.problem == 'expected ix_shops_is_active, used ix_shops_latitude_longitude'
+
+
+def test_cli_exits_cleanly_without_findings(app):
+    result = app.test_cli_runner().invoke(args=['indexes', 'check'])
+    assert result.exit_code == 0
+    assert 'Every catalogue query uses its indexes.' in result.output
+
+
+def test_database_allows_one_review_per_buyer(app, make_user):
+    shop = make_shop(make_user('seller', is_seller=True))
+    buyer = make_user('buyer')
+    db.session.add(Review(rating=5, buyer_id=buyer.id, shop_id=shop.id))
+    db.session.commit()
+
+    db.session.add(Review(rating=1, buyer_id=buyer.id, shop_id=shop.id))
+    with pytest.raises(IntegrityError):
+        db.session.commit()
+    db.session.rollback()
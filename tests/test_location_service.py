@@ -0,0 +1,56 @@
+import pytest
+import services.location_service as location_module
+from services.location_service import LocationService
+
+
+@pytest.fixture(params=['numpy', 'python'])
+def backend(request, monkeypatch):
+    if request.param == 'numpy':
+        # numpy is in requirements.txt, so its path must not be skipped quietly
+        assert location_module.np is not None
+    else:
+        monkeypatch.setattr(location_module, 'np', None)
+    return request.param
+
+
+def test_calculate_distances_matches_scalar(backend):
+    lats = [40.0, 40.5, -33.9, 51.5]
+    lons = [-75.0, -74.0, 151.2, -0.1]
+
+    distances = LocationService.calculate_distances(40.7, -74.0, lats, lons, 'miles')
+
+    for lat, lon, distance in zip(lats, lons, distances):
+        assert distance == pytest.approx(LocationService.calculate_distance(40.7, -74.0, lat, lon, 'miles'))
+
+
+def test_bounding_box_contains_circle():
+    min_lat, max_lat, min_lon, max_lon = LocationService.bounding_box(60.0, 10.0, 50)
+
+    assert min_lat < 60.0 < max_lat
+    # A degree of longitude is about half as long at 60 degrees latitude
+    assert (max_lon - min_lon) == pytest.approx(2 * (max_lat - min_lat), rel=0.05)
+    assert LocationService.calculate_distance(60.0, 10.0, 60.0, max_lon) >= 50
+
+
+def test_bounding_box_wraps_antimeridian_and_poles():
+    min_lat, max_lat, min_lon, max_lon = LocationService.bounding_box(0.0, 179.9, 50)
+    assert min_lon > max_lon
+
+    assert LocationService.bounding_box(89.9, 0.0, 50)[2:] == (-180.0, 180.0)
+
+
+def test_nearby_shops_query_prefilters_in_sql(app):
+    from models import db, User, Shop
+
+    user = User(username='seller', email='seller@example.com', password_hash='x', full_name='Seller')
+    db.session.add(user)
+    db.session.flush()
+    db.session.add_all([
+        Shop(name='Inside', address='a', latitude=0.0, longitude=179.95, user_id=user.id),
+        Shop(name='Wrapped', address='b', latitude=0.0, longitude=-179.95, user_id=user.id),
+        Shop(name='Outside', address='c', latitude=0.0, longitude=170.0, user_id=user.id),
+    ])
+    db.session.commit()
+
+    names = {shop.name for shop in LocationService.nearby_shops_query(0.0, 179.99, 20).all()}
+    assert names == {'Inside', 'Wrapped'}
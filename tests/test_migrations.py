@@ -0,0 +1,39 @@
+import os
+import sqlite3
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def flask_db(database, *args):
+    # Alembic reconfigures logging, so migrations run in their own process
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{database}', FLASK_APP='app.py', FLASK_CONFIG='development')
+    return subprocess.run([sys.executable, '-m', 'flask', 'db', *args], cwd=ROOT, env=env,
+                          capture_output=True, text=True, check=True)
+
+
+def test_duplicate_reviews_keep_the_newest_and_are_backed_up(tmp_path):
+    database = tmp_path / 'migrated.db'
+    flask_db(database, 'upgrade', '5d2e8b7f90a4')
+    with sqlite3.connect(database) as connection:
+        connection.executescript("""
+            INSERT INTO users (id, username, email, password_hash, full_name) VALUES
+                (1, 'seller', 'seller@example.com', 'unused', 'Seller'),
+                (2, 'buyer', 'buyer@example.com', 'unused', 'Buyer');
+            INSERT INTO shops (id, name, address, latitude, longitude, user_id, rating_sum, review_count)
+                VALUES (1, 'Green Acres', '1 Farm Rd', 40.0, -75.0, 1, 9, 3);
+            INSERT INTO reviews (id, rating, comment, buyer_id, shop_id, created_at) VALUES
+                (1, 2, 'First', 2, 1, '2024-01-01 00:00:00'),
+                (2, 5, 'Latest', 2, 1, '2024-03-01 00:00:00'),
+                (3, 2, 'Second', 2, 1, '2024-02-01 00:00:00');
+        """)
+
+    result = flask_db(database, 'upgrade')
+    assert 'Removed 2 duplicate reviews across 1 shops' in result.stderr
+
+    with sqlite3.connect(database) as connection:
+        assert connection.execute('SELECT comment FROM reviews').fetchall() == [('Latest',)]
+        assert connection.execute('SELECT rating_sum, review_count FROM shops').fetchone() == (5, 1)
+        backup = connection.execute('SELECT comment FROM reviews_duplicates_backup ORDER BY id').fetchall()
+        assert backup == [('First',), ('Second',)]
@@ -0,0 +1,85 @@
+import re
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import db, Review, Shop
+from services.pagination import decode_cursor, encode_cursor, keyset_paginate
+from tests.test_routes import make_shop
+
+
+def next_url(page):
+    match = re.search(r'data-next-url="([^"]+)"', page)
+    return match.group(1).replace('&amp;', '&') if match else None
+
+
+def test_cursors_round_trip_datetimes_and_reject_garbage():
+    when = datetime(2024, 5, 1, 12, 30, 15, 250)
+    assert decode_cursor(encode_cursor([when, 7])) == [when.isoformat(), 7]
+    for cursor in ('nonsense', encode_cursor([1])[:-2] + '!!'):
+        with pytest.raises(ValueError):
+            decode_cursor(cursor)
+
+
+def test_keyset_walks_ties_on_created_at_without_gaps(app, make_user):
+    created = datetime(2024, 1, 1)
+    for index in range(7):
+        # Pairs of shops share a timestamp, so the id tie-breaker matters
+        make_shop(make_user(f'seller{index}', is_seller=True), name=f'Shop {index}',
+                  created_at=created + timedelta(minutes=index // 2))
+
+    seen, cursor = [], None
+    while True:
+        page = keyset_paginate(Shop.query, (Shop.created_at, Shop.id), cursor=cursor, limit=3, descending=True)
+        seen.extend(shop.name for shop in page.items)
+        if page.next_cursor is None:
+            break
+        cursor = page.next_cursor
+    assert seen == ['Shop 6', 'Shop 5', 'Shop 4', 'Shop 3', 'Shop 2', 'Shop 1', 'Shop 0']
+
+    with pytest.raises(ValueError):
+        keyset_paginate(Shop.query, (Shop.created_at, Shop.id), cursor=encode_cursor(['soon', 1]))
+
+
+def test_index_scrolls_through_shops_in_batches(app, client, make_user):
+    app.config['ITEMS_PER_PAGE'] = 2
+    for index in range(3):
+        make_shop(make_user(f'seller{index}', is_seller=True), name=f'Farm {index}')
+
+    page = client.get('/').get_data(as_text=True)
+    assert 'Farm 2' in page and 'Farm 1' in page and 'Farm 0' not in page
+
+    fragment = client.get(next_url(page)).get_data(as_text=True)
+    assert 'Farm 0' in fragment and 'Farm 1' not in fragment
+    assert next_url(fragment) is None and '<html' not in fragment
+    assert client.get('/?cursor=bogus').status_code == 400
+
+
+def test_shop_reviews_are_paged(app, client, make_user):
+    app.config['ITEMS_PER_PAGE'] = 2
+    shop = make_shop(make_user('seller', is_seller=True))
+    for index in range(3):
+        buyer = make_user(f'buyer{index}')
+        db.session.add(Review(rating=4, comment=f'Comment {index}', buyer_id=buyer.id, shop_id=shop.id,
+                              created_at=datetime(2024, 1, 1) + timedelta(days=index)))
+    db.session.commit()
+
+    page = client.get(f'/shop/{shop.id}').get_data(as_text=True)
+    assert 'Comment 2' in page and 'Comment 1' in page and 'Comment 0' not in page
+
+    fragment = client.get(next_url(page)).get_data(as_text=True)
+    assert 'Comment 0' in fragment and 'Comment 1' not in fragment
+
+
+def test_api_shops_is_always_paged(app, client, make_user, monkeypatch):
+    monkeypatch.setattr('routes.api.SHOPS_MAX_LIMIT', 2)
+    for index in range(3):
+        make_shop(make_user(f'seller{index}', is_seller=True), name=f'Farm {index}')
+
+    first = client.get('/api/shops?fields=id')
+    assert len(first.get_json()) == 2
+    second = client.get(f"/api/shops?fields=id&cursor={first.headers['X-Next-Cursor']}")
+    assert len(second.get_json()) == 1 and 'X-Next-Cursor' not in second.headers
+
+    streamed = client.get('/api/shops?fields=id&stream=1')
+    assert len(streamed.get_data(as_text=True).splitlines()) == 3
@@ -0,0 +1,62 @@
+"""Query budgets per endpoint; each fixture holds enough rows that an N+1 would blow the budget."""
+import pytest
+
+from models import db, Product, Review, User
+from tests.test_routes import make_shop
+
+
+def add_user(username):
+    """A user who never signs in, so skip the deliberately slow password hash."""
+    user = User(username=username, email=f'{username}@example.com', full_name=username.title(),
+                password_hash='unused')
+    db.session.add(user)
+    db.session.flush()
+    return user
+
+
+@pytest.fixture
+def catalog(app, make_user):
+    buyer = make_user('buyer')
+    shops = []
+    for index in range(6):
+        shop = make_shop(add_user(f'seller{index}'), name=f'Farm {index}')
+        db.session.add_all([Product(name=f'Eggs {index}-{number}', price=4, unit='dozen', category='eggs',
+                                    shop_id=shop.id) for number in range(3)])
+        db.session.add(Review(rating=4, comment='Great', buyer_id=buyer.id, shop_id=shop.id))
+        shops.append(shop)
+    for index in range(6):
+        reviewer = add_user(f'reviewer{index}')
+        db.session.add(Review(rating=5, comment='Lovely', buyer_id=reviewer.id, shop_id=shops[0].id))
+    db.session.commit()
+    return buyer, shops[0].id
+
+
+@pytest.mark.parametrize('url, budget', [
+    ('/', 2),
+    # Search also reads the catalog version to check the facet index is current
+    ('/search', 4),
+    ('/search?query=eggs&category=eggs', 5),
+    ('/api/shops', 2),
+    ('/api/shops/nearby?lat=40&lng=-75', 2),
+])
+def test_anonymous_pages(client, catalog, max_queries, url, budget):
+    client.get(url)  # build the in-memory indexes outside the budget
+    with max_queries(budget):
+        assert client.get(url).status_code == 200
+
+
+def test_shop_page(client, catalog, max_queries):
+    _, shop_id = catalog
+    with max_queries(4):
+        page = client.get(f'/shop/{shop_id}').get_data(as_text=True)
+    assert page.count('reviewer') == 6
+
+
+def test_signed_in_pages(client, catalog, login, max_queries):
+    buyer, shop_id = catalog
+    login(buyer)
+    client.get('/map')  # consume the login flash
+
+    for url, budget in (('/', 3), (f'/shop/{shop_id}', 5), ('/profile', 2)):
+        with max_queries(budget):
+            assert client.get(url).status_code == 200
@@ -0,0 +1,67 @@
+import random
+import re
+from types import SimpleNamespace
+
+from services.pagination import decode_cursor
+from services.ranking import ShopRanker
+from tests.test_routes import make_shop
+
+
+def fake_shop(shop_id, rating=0.0, is_open=False):
+    return SimpleNamespace(id=shop_id, average_rating=rating, is_open=is_open)
+
+
+def test_blend_weighs_text_distance_rating_and_open():
+    ranker = ShopRanker()
+    shops = [fake_shop(1, rating=5), fake_shop(2, is_open=True), fake_shop(3)]
+    text_scores = {1: 2.0, 2: 8.0, 3: 10.0}
+    distances = {1: 0.0, 2: 40.0, 3: 40.0}
+
+    order = [item.shop.id for item in ranker.rank(shops, text_scores=text_scores, distances=distances).items]
+    assert order == [1, 3, 2]
+
+    by_text = ranker.rank(shops, text_scores=text_scores, distances=distances, sort='relevance')
+    assert [item.shop.id for item in by_text.items] == [3, 2, 1]
+    assert by_text.items[0].distance == 40.0
+
+    ranker.weights = {'open': 1.0}
+    assert ranker.rank(shops).items[0].shop.id == 2
+
+
+def test_keyset_pages_match_a_full_sort():
+    rng = random.Random(7)
+    shops = [fake_shop(shop_id, rating=rng.choice([0, 3, 4.5]), is_open=rng.random() < 0.5)
+             for shop_id in range(1, 501)]
+    distances = {shop.id: rng.uniform(0, 50) for shop in shops}
+    ranker = ShopRanker()
+
+    expected = sorted(shops, key=lambda shop: (-(0.15 * shop.average_rating / 5 + 0.05 * shop.is_open +
+                                                 0.3 / (1 + distances[shop.id] / 5)), shop.id))
+    seen = []
+    after = None
+    while True:
+        page = ranker.rank(shops, per_page=30, after=after, distances=distances)
+        seen.extend(item.shop for item in page.items)
+        assert page.total == 500
+        if page.next_cursor is None:
+            break
+        score, shop_id = decode_cursor(page.next_cursor)
+        after = (score, shop_id)
+    assert seen == expected
+
+
+def test_search_page_sorts_by_distance_and_pages_by_cursor(app, client, make_user):
+    app.config['ITEMS_PER_PAGE'] = 2
+    for index, name in enumerate(['Far Farm', 'Mid Farm', 'Near Farm']):
+        make_shop(make_user(f'seller{index}', is_seller=True), name=name, latitude=40.0 + (2 - index) * 0.1)
+
+    page = client.get('/search?sort=distance&lat=40.0&lng=-75.0').get_data(as_text=True)
+    assert page.index('Near Farm') < page.index('Mid Farm')
+    assert 'Far Farm' not in page and '3 found' in page
+    assert '6.9 mi' in page
+
+    next_url = re.search(r'data-next-url="([^"]+)"', page).group(1).replace('&amp;', '&')
+    fragment = client.get(next_url).get_data(as_text=True)
+    assert 'Far Farm' in fragment and 'Near Farm' not in fragment
+    assert 'data-next-url' not in fragment and '<html' not in fragment
+    assert client.get('/search?cursor=nonsense').status_code == 400
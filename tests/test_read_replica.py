@@ -0,0 +1,82 @@
+import shutil
+
+import pytest
+
+from app import create_app
+from config import TestingConfig
+from models import db, Review, Shop, User
+from services.marker_codec import decode_markers
+from services.read_replica import PRIMARY_UNTIL_KEY
+from tests.test_routes import make_shop
+
+
+@pytest.fixture
+def replica_app(tmp_path, monkeypatch):
+    """App on a primary SQLite file with a copy of it as the replica."""
+    primary, replica = tmp_path / 'primary.db', tmp_path / 'replica.db'
+    monkeypatch.setattr(TestingConfig, 'SQLALCHEMY_DATABASE_URI', f'sqlite:///{primary}')
+    monkeypatch.setattr(TestingConfig, 'SQLALCHEMY_BINDS', {'replica': f'sqlite:///{replica}'})
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        seller = User(username='seller', email='seller@example.com', full_name='Seller',
+                      is_seller=True, password_hash='unused')
+        db.session.add(seller)
+        db.session.commit()
+        make_shop(seller, name='Old Farm')
+        buyer = User(username='buyer', email='buyer@example.com', full_name='Buyer')
+        buyer.set_password('password123')
+        db.session.add(buyer)
+        db.session.commit()
+        seller_id = seller.id
+
+        # Take the replica's snapshot, then let the primary move ahead of it
+        db.session.remove()
+        db.engine.dispose()
+        shutil.copy(primary, replica)
+        db.session.add(Shop(name='New Farm', address='2 Farm Rd, Springfield', latitude=40.1,
+                            longitude=-75.1, user_id=seller_id))
+        db.session.commit()
+        db.session.remove()
+        yield app
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+    # init_app registers a metadata per bind key on the shared db object
+    db.metadatas.pop('replica', None)
+
+
+def shop_id(name):
+    return db.session.execute(db.select(Shop.id).where(Shop.name == name)).scalar_one()
+
+
+def test_read_only_pages_use_the_replica(replica_app):
+    client = replica_app.test_client()
+
+    page = client.get('/').get_data(as_text=True)
+    assert 'Old Farm' in page and 'New Farm' not in page
+    assert [shop['name'] for shop in client.get('/api/shops').get_json()] == ['Old Farm']
+    assert len(decode_markers(client.get('/api/shops/markers').data)) == 1
+    assert client.get(f"/shop/{shop_id('New Farm')}").status_code == 404
+    # Pages that are not marked read-only keep using the primary
+    assert client.get('/map').status_code == 200
+
+
+def test_own_writes_are_read_from_the_primary(replica_app):
+    client = replica_app.test_client()
+    client.post('/login', data={'email': 'buyer@example.com', 'password': 'password123'})
+    client.get('/map')
+
+    new_farm = shop_id('New Farm')
+    client.post(f'/shop/{new_farm}/review', data={'rating': 5, 'comment': 'Lovely eggs'})
+    page = client.get(f'/shop/{new_farm}').get_data(as_text=True)
+    assert 'Lovely eggs' in page
+    assert 'New Farm' in client.get('/').get_data(as_text=True)
+
+    # The review went to the primary only
+    with db.engines['replica'].connect() as replica:
+        assert replica.execute(db.select(db.func.count()).select_from(Review)).scalar() == 0
+
+    with client.session_transaction() as session:
+        session[PRIMARY_UNTIL_KEY] = 0
+    assert 'New Farm' not in client.get('/').get_data(as_text=True)
@@ -0,0 +1,112 @@
+import pytest
+
+from models import db, Product
+from services.response_cache import MemoryBackend, ResponseCache, response_cache
+from tests.test_routes import make_shop
+
+
+@pytest.fixture
+def cache(app):
+    response_cache.enabled = True
+    yield response_cache
+    response_cache.enabled = False
+
+
+def test_repeated_anonymous_request_is_served_from_cache(cache, client, make_user):
+    make_shop(make_user('seller', is_seller=True))
+
+    first = client.get('/api/shops?fields=id,name')
+    second = client.get('/api/shops?fields=id,name')
+    assert first.headers['X-Cache'] == 'MISS'
+    assert second.headers['X-Cache'] == 'HIT'
+    assert second.get_json() == first.get_json()
+    assert client.get('/api/shops?fields=id,name,address').headers['X-Cache'] == 'MISS'
+
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['size']) == (1, 2, 2)
+
+
+def test_stats_endpoint_is_only_served_in_debug_mode(app, client, monkeypatch):
+    assert client.get('/api/cache/stats').status_code == 404
+
+    monkeypatch.setattr(app, 'debug', True)
+    assert client.get('/api/cache/stats').get_json()['hits'] == 0
+
+
+def test_route_writes_invalidate_matching_tags_only(cache, client, make_user, login):
+    # Tags only stay fine-grained across workers with a shared backend
+    cache.use_shared_backend(MemoryBackend())
+    seller = make_user('seller', is_seller=True)
+    shop = make_shop(seller, latitude=40.5, longitude=-75.5)
+    nearby = '/api/shops?bbox=-76,40,-75,41'
+    far_away = '/api/shops?bbox=10,50,11,51'
+    for url in (nearby, far_away, f'/shop/{shop.id}'):
+        client.get(url)
+
+    login(seller)
+    client.post(f'/shop/{shop.id}/products/add', data={
+        'name': 'Eggs', 'price': '4.50', 'unit': 'dozen', 'category': 'eggs',
+        'icon_class': 'fas fa-egg', 'is_available': 'y'})
+    client.get('/logout')
+    client.get('/map')  # Consume the logout flash message
+
+    assert client.get(nearby).headers['X-Cache'] == 'MISS'
+    assert client.get(f'/shop/{shop.id}').headers['X-Cache'] == 'MISS'
+    assert client.get(far_away).headers['X-Cache'] == 'HIT'
+
+
+def test_logged_in_responses_are_not_cached(cache, client, make_user, login):
+    shop = make_shop(make_user('seller', is_seller=True))
+    login(make_user('buyer'))
+
+    client.get(f'/shop/{shop.id}')
+    assert 'X-Cache' not in client.get(f'/shop/{shop.id}').headers
+    assert cache.stats()['size'] == 0
+
+
+def test_shared_backend_serves_and_invalidates_across_workers(app, make_user):
+    shop = make_shop(make_user('seller', is_seller=True))
+    db.session.add(Product(name='Honey', price=9.0, unit='jar', category='honey', shop_id=shop.id))
+    db.session.commit()
+
+    shared = MemoryBackend()
+    workers = [ResponseCache(), ResponseCache()]
+    for worker in workers:
+        worker.use_shared_backend(shared)
+    calls = []
+
+    def view():
+        calls.append(1)
+        return 'rendered'
+
+    views = [worker.cached(lambda: [worker.category_tag('honey')])(view) for worker in workers]
+    with app.test_request_context('/api/shops?category=honey'):
+        assert views[0]().headers['X-Cache'] == 'MISS'
+        assert views[1]().headers['X-Cache'] == 'HIT'
+        assert workers[1].stats()['shared_hits'] == 1
+
+        workers[0].invalidate(*workers[0].shop_tags(shop))
+        assert views[1]().headers['X-Cache'] == 'MISS'
+    assert len(calls) == 2
+
+
+def test_region_tags_cover_the_bbox_and_wrap_the_antimeridian():
+    cache = ResponseCache()
+    assert cache.region_tags(-75.5, 40.2, -74.5, 40.8) == ['region:40:-76', 'region:40:-75']
+    assert cache.region_tags(179.5, 0.5, -179.5, 0.6) == ['region:0:179', 'region:0:180', 'region:0:-180']
+    assert cache.region_tags(-180, -90, 180, 90) == ['shops']
+    assert cache.region_tag(40.5, -75.5) in cache.region_tags(-76, 40, -75, 41)
+
+
+def test_local_cache_drops_entries_after_another_workers_write(cache, client, make_user):
+    shop = make_shop(make_user('seller', is_seller=True))
+    url = f'/shop/{shop.id}'
+    client.get(url)
+    assert client.get(url).headers['X-Cache'] == 'HIT'
+
+    # Another worker's write bumps the catalog version but not this process's tags
+    shop.name = 'Renamed Farm'
+    db.session.commit()
+    response = client.get(url)
+    assert response.headers['X-Cache'] == 'MISS'
+    assert 'Renamed Farm' in response.get_data(as_text=True)
@@ -0,0 +1,26 @@
+from models import db, Shop, Review
+
+
+def make_shop(owner, **overrides):
+    values = dict(name='Green Acres', address='1 Farm Rd, Springfield', latitude=40.0,
+                  longitude=-75.0, user_id=owner.id)
+    values.update(overrides)
+    shop = Shop(**values)
+    db.session.add(shop)
+    db.session.commit()
+    return shop
+
+
+def test_add_review_updates_stored_rating_aggregates(app, client, make_user, login):
+    shop = make_shop(make_user('seller', is_seller=True))
+
+    for name, rating in (('alice', 5), ('bob', 2)):
+        client.get('/logout')
+        login(make_user(name))
+        client.post(f'/shop/{shop.id}/review', data={'rating': str(rating), 'comment': 'ok'})
+
+    db.session.expire_all()
+    shop = db.session.get(Shop, shop.id)
+    assert (shop.rating_sum, shop.review_count) == (7, 2)
+    assert shop.average_rating == 3.5
+    assert shop.total_reviews == Review.query.filter_by(shop_id=shop.id).count()
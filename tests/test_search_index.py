@@ -0,0 +1,120 @@
+import time
+
+from models import db, Product, Shop
+from services.prefix_index import PrefixIndex
+from services.search_index import SearchIndex, search_index
+from tests.test_routes import make_shop
+
+
+def add_product(shop, name, category):
+    product = Product(name=name, price=3.0, unit='lb', category=category, shop_id=shop.id)
+    db.session.add(product)
+    db.session.commit()
+    return product
+
+
+def test_prefix_index_items_and_remove():
+    index = PrefixIndex()
+    index.insert('spring', 1)
+    index.insert('springfield', 2)
+    index.insert('shelby', 3)
+
+    assert list(index.items('spr')) == [('spring', 1), ('springfield', 2)]
+    assert [value for _, value in index.items('s')] == [3, 1, 2]
+    assert (index.count('s'), index.count('spr'), index.count('x')) == (3, 2, 0)
+    assert index.remove('spring', 1)
+    assert list(index.items('spr')) == [('springfield', 2)]
+    assert index.get('spring') == []
+    assert (index.count(), index.count('spr')) == (2, 1)
+
+
+def test_typeahead_matches_word_prefixes_of_names_and_categories(app, client, make_user):
+    shop = make_shop(make_user('seller', is_seller=True), name='Sunny Hill Farm')
+    add_product(shop, 'Heirloom Tomatoes', 'vegetables')
+    add_product(shop, 'Wildflower Honey', 'honey')
+
+    results = client.get('/api/search?q=hon').get_json()
+    assert [(result['type'], result['name']) for result in results] == [('product', 'Wildflower Honey')]
+    assert results[0]['shop_id'] == shop.id and results[0]['price'] == 3.0
+
+    assert [result['name'] for result in client.get('/api/search?q=veg').get_json()] == ['Heirloom Tomatoes']
+    assert [result['type'] for result in client.get('/api/search?q=hill+sun').get_json()] == ['shop']
+    assert client.get('/api/search?q=tomato+honey').get_json() == []
+    assert client.get('/api/search?q=').get_json() == []
+
+
+def test_ranking_prefers_name_prefix_then_short_names(app, make_user):
+    shop = make_shop(make_user('seller', is_seller=True), name='Berry Barn')
+    add_product(shop, 'Strawberry Jam', 'preserves')
+    add_product(shop, 'Berry Mix', 'fruits')
+    add_product(shop, 'Berry Lemonade Concentrate', 'beverages')
+
+    names = [result['name'] for result in search_index.search('berr', limit=3)]
+    assert names == ['Berry Mix', 'Berry Barn', 'Berry Lemonade Concentrate']
+
+
+def test_route_writes_update_the_index_incrementally(app, client, make_user, login):
+    seller = make_user('seller', is_seller=True)
+    shop = make_shop(seller)
+    product = add_product(shop, 'Brown Eggs', 'eggs')
+    assert search_index.search('brown')
+    login(seller)
+
+    client.post(f'/product/{product.id}/edit', data={
+        'name': 'Duck Eggs', 'price': '6', 'unit': 'dozen', 'category': 'eggs',
+        'icon_class': 'fas fa-egg', 'is_available': 'y'})
+    assert not search_index.search('brown')
+    assert [result['name'] for result in search_index.search('duck')] == ['Duck Eggs']
+
+    client.post(f'/product/{product.id}/delete')
+    assert not search_index.search('duck')
+
+    shop.is_active = False
+    db.session.commit()
+    search_index.sync_shop(shop)
+    assert not search_index.search('green')
+
+
+def test_queries_stay_fast_on_a_large_index(app):
+    index = SearchIndex()
+    index._built = True
+    shop = Shop(id=1, name='Bulk Farm', address='x', latitude=0, longitude=0, is_active=True,
+                rating_sum=0, review_count=0)
+    products = [Product(id=i, name=f'Product {i} apple{i % 50}', category='fruits', price=1, unit='lb', shop_id=1)
+                for i in range(5000)]
+    index._index_shop(shop, products)
+
+    started = time.perf_counter()
+    for query in ('apple1', 'prod', 'fru', 'apple42 product'):
+        assert len(index.search(query, limit=10)) == 10
+    assert (time.perf_counter() - started) / 4 < 0.05
+
+
+def test_candidate_cap_applies_after_every_term_matches(app, client, make_user, monkeypatch):
+    monkeypatch.setattr(SearchIndex, 'MAX_CANDIDATES', 2)
+    shop = make_shop(make_user('seller', is_seller=True), name='Bee Farm')
+    for name in ('Wildflower Honey', 'Clover Honey', 'Buckwheat Honey', 'Honey Crisp Apples'):
+        add_product(shop, name, 'honey')
+
+    results = client.get('/api/search?q=honey+cri').get_json()
+    assert [result['name'] for result in results] == ['Honey Crisp Apples']
+
+
+def test_matches_walk_only_the_rarest_terms_postings(app):
+    index = SearchIndex()
+    index._built = True
+    shop = Shop(id=1, name='Bulk Farm', address='x', latitude=0, longitude=0, is_active=True,
+                rating_sum=0, review_count=0)
+    products = [Product(id=i, name=f'Apples {i}', category='fruits', price=1, unit='lb', shop_id=1)
+                for i in range(1, 200)]
+    products.append(Product(id=200, name='Apples and Zucchini', category='vegetables', price=1, unit='lb', shop_id=1))
+    index._index_shop(shop, products)
+
+    walked = []
+    items = index._trie.items
+    index._trie.items = lambda prefix='': walked.append(prefix) or items(prefix)
+
+    assert [result['id'] for result in index.search('apples zu')] == [200]
+    assert walked == ['zu']
+    assert index.search('apples xylophone') == []
+    assert walked == ['zu']
@@ -0,0 +1,62 @@
+from services.location_service import LocationService
+
+
+def brute_force(points, lat, lon, radius):
+    results = []
+    for shop_id, shop_lat, shop_lon in points:
+        distance = LocationService.calculate_distance(lat, lon, shop_lat, shop_lon)
+        if distance <= radius:
+            results.append((shop_id, distance))
+    return sorted(results, key=lambda item: (item[1], item[0]))
+
+
+def test_kdtree_nearest_matches_brute_force_after_updates():
+    import random
+    from services.spatial_index import KDTree
+
+    rng = random.Random(7)
+    points = [(i, rng.uniform(39, 42), rng.uniform(-75, -72)) for i in range(400)]
+    tree = KDTree()
+    tree.build(points[:200])
+    for point in points[200:]:
+        tree.insert(*point)
+    for shop_id in range(0, 400, 3):
+        tree.remove(shop_id)
+    tree.update(1, 10.0, 10.0)
+
+    remaining = [point for point in points if point[0] % 3 and point[0] != 1]
+    expected = [shop_id for shop_id, _ in brute_force(remaining, 40.5, -73.5, 20000)[:15]]
+
+    assert [shop_id for shop_id, _ in tree.nearest(40.5, -73.5, 15)] == expected
+
+
+def test_kdtree_queries_stay_consistent_during_writes():
+    import random
+    import threading
+    from services.spatial_index import KDTree
+
+    rng = random.Random(11)
+    tree = KDTree()
+    tree.build((i, rng.uniform(39, 42), rng.uniform(-75, -72)) for i in range(300))
+    done = threading.Event()
+
+    def write():
+        writer_rng = random.Random(3)
+        while not done.is_set():
+            shop_id = writer_rng.randrange(300)
+            if writer_rng.random() < 0.3:
+                tree.remove(shop_id)
+            else:
+                tree.update(shop_id, writer_rng.uniform(39, 42), writer_rng.uniform(-75, -72))
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    try:
+        for _ in range(200):
+            results = tree.nearest(40.5, -73.5, 20)
+            distances = [distance for _, distance in results]
+            assert distances == sorted(distances)
+            assert len({shop_id for shop_id, _ in results}) == len(results)
+    finally:
+        done.set()
+        writer.join()
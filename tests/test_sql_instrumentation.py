@@ -0,0 +1,64 @@
+import json
+import logging
+
+from models import db, Shop
+from services.sql_instrumentation import SQLInstrumentation, sql_instrumentation
+from tests.test_routes import make_shop
+
+
+def test_server_timing_reports_queries(app, client, make_user):
+    make_shop(make_user('seller', is_seller=True))
+
+    timing = client.get('/api/shops').headers['Server-Timing']
+    assert timing.startswith('db;dur=')
+    assert timing.endswith('desc="2 queries"')
+
+
+def test_repeated_statements_are_logged_as_n_plus_one(app, client, make_user, caplog):
+    @app.route('/owners')
+    def owners():
+        # Deliberately lazy: one users query per shop
+        return ','.join(shop.owner.username for shop in Shop.query.all())
+
+    for index in range(6):
+        make_shop(make_user(f'seller{index}', is_seller=True), name=f'Farm {index}')
+    db.session.expunge_all()
+
+    with caplog.at_level(logging.INFO, logger=app.logger.name):
+        client.get('/owners')
+        client.get('/api/shops')
+
+    first, second = [json.loads(record.getMessage()) for record in caplog.records
+                     if record.getMessage().startswith('{"event": "sql"')]
+    assert (first['endpoint'], first['queries']) == ('owners', 7)
+    suspect, = first['n_plus_one']
+    assert suspect['count'] == 6 and 'FROM users' in suspect['statement']
+    assert 'n_plus_one' not in second and second['status'] == 200
+
+
+def test_unsampled_requests_are_not_instrumented(app, client):
+    sql_instrumentation.sample_rate = 0.0
+    try:
+        assert 'Server-Timing' not in client.get('/api/shops').headers
+    finally:
+        sql_instrumentation.sample_rate = 1.0
+
+
+def test_in_lists_share_a_shape():
+    assert SQLInstrumentation.shape('SELECT *\n  FROM shops WHERE id IN (?, ?, ?)') == \
+        SQLInstrumentation.shape('SELECT * FROM shops WHERE id IN (?,?)') == \
+        'SELECT * FROM shops WHERE id IN (?)'
+
+
+def test_streamed_responses_count_the_queries_behind_the_body(app, client, make_user, caplog):
+    make_shop(make_user('seller', is_seller=True))
+
+    with caplog.at_level(logging.INFO, logger=app.logger.name):
+        response = client.get('/api/shops?stream=1')
+        assert 'Server-Timing' not in response.headers
+        assert response.get_data(as_text=True).count('\n') == 1
+        response.close()
+
+    record, = [json.loads(record.getMessage()) for record in caplog.records
+               if record.getMessage().startswith('{"event": "sql"')]
+    assert record['path'] == '/api/shops' and record['queries'] == 2
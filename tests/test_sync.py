@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta
+
+from models import db, DeletionLog, Product, Shop
+from services.sync_service import sync_service
+from tests.test_routes import make_shop
+
+
+def add_product(shop, name, category='vegetables'):
+    product = Product(name=name, price=2.0, unit='lb', category=category, shop_id=shop.id)
+    db.session.add(product)
+    db.session.commit()
+    return product
+
+
+def backdate(*rows):
+    """Move rows out of the overlap window, as if they were written long before the last sync."""
+    for row in rows:
+        row.updated_at = datetime.utcnow() - timedelta(hours=1)
+    db.session.commit()
+
+
+def test_first_sync_is_a_full_snapshot(app, client, make_user):
+    seller = make_user('seller', is_seller=True)
+    shop = make_shop(seller)
+    make_shop(make_user('other', is_seller=True), name='Closed Down', is_active=False)
+    add_product(shop, 'Carrots')
+
+    body = client.get('/api/sync').get_json()
+    assert body['full'] is True
+    assert [item['name'] for item in body['shops']] == ['Green Acres']
+    assert [item['name'] for item in body['products']] == ['Carrots']
+    assert body['deleted'] == {'shops': [], 'products': []}
+    assert body['more'] is False
+    assert sync_service.decode_token(body['token'])[1] is None
+
+
+def test_full_snapshot_is_paged_with_a_cursor(app, client, make_user, monkeypatch):
+    monkeypatch.setattr(sync_service, 'page_size', 2)
+    shops = [make_shop(make_user(f'seller{i}', is_seller=True), name=f'Farm {i}') for i in range(3)]
+    for name in ('Carrots', 'Beans', 'Eggs'):
+        add_product(shops[0], name)
+
+    pages = [client.get('/api/sync').get_json()]
+    while pages[-1]['more']:
+        pages.append(client.get(f"/api/sync?since={pages[-1]['token']}").get_json())
+
+    assert [len(page['shops']) + len(page['products']) for page in pages] == [2, 2, 2]
+    assert all(page['full'] for page in pages)
+    assert [item['name'] for page in pages for item in page['shops']] == ['Farm 0', 'Farm 1', 'Farm 2']
+    assert [item['name'] for page in pages for item in page['products']] == ['Carrots', 'Beans', 'Eggs']
+    # Every page carries the snapshot's start time, and the last one has no cursor left
+    started = {sync_service.decode_token(page['token'])[0] for page in pages}
+    assert len(started) == 1
+    assert sync_service.decode_token(pages[-1]['token'])[1] is None
+
+    delta = client.get(f"/api/sync?since={pages[-1]['token']}").get_json()
+    assert delta['full'] is False and delta['more'] is False
+
+
+def test_delta_returns_changed_rows_and_tombstones(app, client, make_user):
+    seller = make_user('seller', is_seller=True)
+    shop = make_shop(seller)
+    other = make_shop(make_user('other', is_seller=True), name='Hill Farm')
+    carrots = add_product(shop, 'Carrots')
+    beans = add_product(shop, 'Beans')
+    backdate(shop, other, carrots, beans)
+    token = sync_service.encode_token(datetime.utcnow() - timedelta(minutes=30))
+
+    other.is_active = False
+    carrots.price = 2.5
+    beans_id = beans.id
+    db.session.delete(beans)
+    db.session.commit()
+
+    body = client.get(f'/api/sync?since={token}').get_json()
+    assert body['full'] is False
+    assert [(item['name'], item['is_active']) for item in body['shops']] == [('Hill Farm', False)]
+    assert [(item['name'], item['price']) for item in body['products']] == [('Carrots', 2.5)]
+    assert body['deleted'] == {'shops': [], 'products': [beans_id]}
+
+    again = client.get(f"/api/sync?since={body['token']}").get_json()
+    assert again['deleted']['products'] == [beans_id]  # still inside the overlap window
+    assert {item['id'] for item in again['shops']} <= {other.id}
+
+
+def test_cascaded_deletes_are_logged(app, make_user):
+    shop = make_shop(make_user('seller', is_seller=True))
+    product = add_product(shop, 'Eggs', 'eggs')
+    shop_id, product_id = shop.id, product.id
+
+    db.session.delete(shop)
+    db.session.commit()
+
+    logged = {(row.entity, row.entity_id) for row in DeletionLog.query}
+    assert logged == {('shop', shop_id), ('product', product_id)}
+    assert Shop.query.count() == 0
+
+
+def test_stale_or_invalid_tokens(app, client):
+    stale = sync_service.encode_token(datetime.utcnow() - timedelta(days=90))
+    assert client.get(f'/api/sync?since={stale}').get_json()['full'] is True
+    assert client.get('/api/sync?since=yesterday').status_code == 400
+    assert client.get(f"/api/sync?since={sync_service.encode_token(datetime.utcnow())}-user-3").status_code == 400
+
+    db.session.add(DeletionLog(entity='shop', entity_id=1, deleted_at=datetime.utcnow() - timedelta(days=60)))
+    db.session.commit()
+    assert sync_service.purge_tombstones() == 1